@@ -0,0 +1,288 @@
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+
+from parser import *
+from general import *
+
+#######################################
+# AST CACHE
+#######################################
+
+# The AST cache is the "__pycache__" of the @ language. After a file has been parsed in program mode,
+# its ListNode is written to __pycache__/<file>.atc next to the source, and later runs of the same,
+# unchanged file load the tree from there instead of lexing and parsing it again.
+#
+# An artifact starts with a fixed header (magic, format version, interpreter version, SHA-256 of the source),
+# followed by the tree as one marshal'ed flat list: every node is written after its children (post-order)
+# as an opcode and its scalar fields, so both writing and reading use an explicit stack and work for
+# trees of any depth. Large artifacts are read through mmap instead of being copied into memory first.
+
+CACHE_DIR = '__pycache__'
+CACHE_SUFFIX = '.atc'
+MAGIC = b'@ATC'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sH16s32s')
+MMAP_THRESHOLD = 1 << 20  # bytes
+
+OP_NUMBER = 0
+OP_BOOLEAN = 1
+OP_IDENTIFIER = 2
+OP_BINOP = 3
+OP_UNARYOP = 4
+OP_IF = 5
+OP_FOR = 6
+OP_FUNCTION_DEF = 7
+OP_FUNCTION_CALL = 8
+OP_LAMBDA = 9
+OP_LIST = 10
+OP_ERROR = 11  # only used by flat trees (flatast.py); programs with errors are never cached
+
+
+def cache_path(filename):
+    directory, basename = os.path.split(os.path.abspath(filename))
+    return os.path.join(directory, CACHE_DIR, basename + CACHE_SUFFIX)
+
+
+def source_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).digest()
+
+
+def make_header(text):
+    return HEADER.pack(MAGIC, FORMAT_VERSION, INTERPRETER_VERSION.encode('ascii'), source_hash(text))
+
+
+#######################################
+# ENCODING
+#######################################
+
+# encode_tree flattens a tree into the post-order code list. It returns None for trees that
+# contain an ErrorNode: programs with errors are simply parsed again on the next run. Only trees as the
+# parser built them are cached, so it gives None for the optimizer's nodes too.
+
+def encode_tree(root):
+    code = []
+    emit = code.extend
+    stack = [(root, False)]
+
+    while stack:
+        node, children_done = stack.pop()
+        if not children_done:
+            stack.append((node, True))
+            children = child_nodes(node)
+            if children is None or isinstance(node, (SharedNode, ScopeNode)):
+                return None
+            for child in reversed(children):
+                stack.append((child, False))
+            continue
+
+        if isinstance(node, NumberNode):
+            emit((OP_NUMBER, node.tok.value, node.tok.offset))
+        elif isinstance(node, BooleanNode):
+            emit((OP_BOOLEAN, node.tok.value, node.tok.offset))
+        elif isinstance(node, IdentifierNode):
+            emit((OP_IDENTIFIER, node.tok.value, node.tok.offset))
+        elif isinstance(node, BinOpNode):
+            emit((OP_BINOP, node.op_tok.type, node.op_tok.offset))
+        elif isinstance(node, UnaryOpNode):
+            emit((OP_UNARYOP, node.op_tok.type, node.op_tok.offset))
+        elif isinstance(node, IfNode):
+            emit((OP_IF, len(node.cases), node.else_case is not None))
+        elif isinstance(node, ForNode):
+            emit((OP_FOR, node.var_name_tok.value, node.var_name_tok.offset, node.step_value_node is not None))
+        elif isinstance(node, FunctionDefNode):
+            emit((OP_FUNCTION_DEF, node.name_tok.value, node.name_tok.offset, len(node.arg_name_toks)))
+            for arg_tok in node.arg_name_toks:
+                emit((arg_tok.value, arg_tok.offset))
+        elif isinstance(node, FunctionCallNode):
+            emit((OP_FUNCTION_CALL, len(node.arg_nodes)))
+        elif isinstance(node, LambdaNode):
+            emit((OP_LAMBDA, len(node.arg_name_toks)))
+            for arg_tok in node.arg_name_toks:
+                emit((arg_tok.value, arg_tok.offset))
+        else:
+            emit((OP_LIST, len(node.element_nodes), node.pos_start.idx, node.pos_end.idx))
+            for pos_start, pos_end in node.element_spans:
+                emit((pos_start.idx, pos_end.idx))
+
+    return code
+
+
+def child_nodes(node):
+    if isinstance(node, (NumberNode, BooleanNode, IdentifierNode)):
+        return ()
+    if isinstance(node, BinOpNode):
+        return (node.left_node, node.right_node)
+    if isinstance(node, UnaryOpNode):
+        return (node.node,)
+    if isinstance(node, IfNode):
+        children = [part for case in node.cases for part in case]
+        if node.else_case is not None:
+            children.append(node.else_case)
+        return children
+    if isinstance(node, ForNode):
+        children = [node.start_value_node, node.end_value_node]
+        if node.step_value_node is not None:
+            children.append(node.step_value_node)
+        children.append(node.body_node)
+        return children
+    if isinstance(node, (FunctionDefNode, LambdaNode)):
+        return (node.body_node,)
+    if isinstance(node, FunctionCallNode):
+        return (node.name_tok, *node.arg_nodes)
+    if isinstance(node, ListNode):
+        return node.element_nodes
+    if isinstance(node, (SharedNode, ScopeNode)):
+        return (node.node,)
+    return None
+
+
+#######################################
+# DECODING
+#######################################
+
+def decode_tree(code, src):
+    stack = []
+    push = stack.append
+    i = 0
+    end = len(code)
+
+    while i < end:
+        op = code[i]
+
+        if op == OP_NUMBER:
+            push(NumberNode(my_CompactToken(T_INT, code[i + 1], code[i + 2], src)))
+            i += 3
+        elif op == OP_IDENTIFIER:
+            push(IdentifierNode(my_CompactToken(T_IDENTIFIER, code[i + 1], code[i + 2], src)))
+            i += 3
+        elif op == OP_BINOP:
+            right = stack.pop()
+            left = stack.pop()
+            push(BinOpNode(left, my_CompactToken(code[i + 1], None, code[i + 2], src), right))
+            i += 3
+        elif op == OP_BOOLEAN:
+            push(BooleanNode(my_CompactToken(T_BOOLEAN, code[i + 1], code[i + 2], src)))
+            i += 3
+        elif op == OP_UNARYOP:
+            push(UnaryOpNode(my_CompactToken(code[i + 1], None, code[i + 2], src), stack.pop()))
+            i += 3
+        elif op == OP_IF:
+            case_count, has_else = code[i + 1], code[i + 2]
+            else_case = stack.pop() if has_else else None
+            parts = pop_many(stack, 2 * case_count)
+            push(IfNode([(parts[k], parts[k + 1]) for k in range(0, len(parts), 2)], else_case))
+            i += 3
+        elif op == OP_FOR:
+            var_name_tok = my_CompactToken(T_IDENTIFIER, code[i + 1], code[i + 2], src)
+            body = stack.pop()
+            step = stack.pop() if code[i + 3] else None
+            end_value = stack.pop()
+            start_value = stack.pop()
+            push(ForNode(var_name_tok, start_value, end_value, step, body))
+            i += 4
+        elif op == OP_FUNCTION_DEF:
+            name_tok = my_CompactToken(T_IDENTIFIER, code[i + 1], code[i + 2], src)
+            arg_count = code[i + 3]
+            i += 4
+            arg_name_toks, i = decode_arg_toks(code, i, arg_count, src)
+            push(FunctionDefNode(name_tok, arg_name_toks, stack.pop()))
+        elif op == OP_FUNCTION_CALL:
+            arg_nodes = pop_many(stack, code[i + 1])
+            push(FunctionCallNode(stack.pop(), arg_nodes))
+            i += 2
+        elif op == OP_LAMBDA:
+            arg_count = code[i + 1]
+            i += 2
+            arg_name_toks, i = decode_arg_toks(code, i, arg_count, src)
+            push(LambdaNode(arg_name_toks, stack.pop()))
+        elif op == OP_LIST:
+            element_count, start_idx, end_idx = code[i + 1], code[i + 2], code[i + 3]
+            i += 4
+            spans = []
+            for _ in range(element_count):
+                spans.append((SourcePosition(code[i], src), SourcePosition(code[i + 1], src)))
+                i += 2
+            element_nodes = pop_many(stack, element_count)
+            push(ListNode(element_nodes, SourcePosition(start_idx, src), SourcePosition(end_idx, src), spans))
+        else:
+            raise ValueError(f'Corrupt AST cache: unknown opcode {op!r}')
+
+    return stack.pop()
+
+
+def pop_many(stack, count):
+    if not count:
+        return []
+    items = stack[-count:]
+    del stack[-count:]
+    return items
+
+
+def decode_arg_toks(code, i, count, src):
+    toks = []
+    for _ in range(count):
+        toks.append(my_CompactToken(T_IDENTIFIER, code[i], code[i + 1], src))
+        i += 2
+    return toks, i
+
+
+#######################################
+# LOAD / STORE
+#######################################
+
+# load_program returns the cached ListNode for (filename, text), or None when there is no valid artifact.
+# store_program writes one; failures to write (read-only directory, ...) are ignored, as CPython does.
+
+def load_program(filename, text):
+    path = cache_path(filename)
+    try:
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < HEADER.size or file.read(HEADER.size) != make_header(text):
+                return None
+            if size >= MMAP_THRESHOLD:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    view = memoryview(mapped)[HEADER.size:]
+                    try:
+                        code = marshal.loads(view)
+                    finally:
+                        view.release()
+            else:
+                code = marshal.loads(file.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+    src = SourceFile(filename, text)
+    try:
+        with gc_paused():
+            program_node = decode_tree(code, src)
+    except (IndexError, ValueError):
+        return None
+    src.mark_statements(program_node.element_spans)
+    return program_node
+
+
+def store_program(filename, text, program_node):
+    with gc_paused():
+        code = encode_tree(program_node)
+    if code is None:
+        return False
+
+    path = cache_path(filename)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as file:
+            file.write(make_header(text))
+            marshal.dump(code, file)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+    return True
@@ -0,0 +1,120 @@
+from itertools import islice
+
+from runtime import *
+from interpreter import global_symbol_table
+from vectorize import NUMPY_AVAILABLE, NotVectorizable, VectorBody, check_bounds, np
+
+#######################################
+# BATCH APPLY
+#######################################
+
+# apply_function() calls one @ function for many rows of arguments from Python, without lexing and parsing a
+# call for every row as run() would. The function is looked up once; every row is passed to its execute(), so
+# functions of every engine can be applied.
+#
+# With vectorize=True the rows are taken a batch at a time, and a function whose body is plain arithmetic on its
+# parameters (see vectorize.py) is evaluated for the whole batch at once with NumPy, each parameter bound to the
+# column of its arguments. A batch whose arguments are not all integers, or all booleans, in one column, or whose
+# values could overflow, is called row by row instead, so the results are always those of execute().
+
+BATCH_SIZE = 4096
+
+
+def apply_function(func_name, rows, symbol_table=global_symbol_table, vectorize=False, batch_size=BATCH_SIZE):
+    # Yields the value of the function bound to func_name for every row of rows, an iterable of argument
+    # tuples or a 2-D NumPy array, in order. The first row whose call fails raises its error as a RuntimeFailure.
+    function = symbol_table.get(func_name)
+    if not hasattr(function, 'execute'):
+        raise ValueError(f"'{func_name}' is not a function")
+    if vectorize and not NUMPY_AVAILABLE:
+        raise ValueError("Vectorized batches need NumPy, which is not installed")
+
+    if not vectorize:
+        for row in rows:
+            yield call(function, row)
+        return
+
+    for batch in batches(rows, batch_size):
+        values = vectorized_batch(function, batch)
+        if values is None:
+            for row in batch:
+                yield call(function, row)
+        else:
+            yield from values
+
+
+def batches(rows, batch_size):
+    # Slices of a NumPy array, lists of rows otherwise
+    if isinstance(rows, np.ndarray):
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+        return
+
+    rows = iter(rows)
+    batch = list(islice(rows, batch_size))
+    while batch:
+        yield batch
+        batch = list(islice(rows, batch_size))
+
+
+def call(function, row):
+    # NumPy integers wrap around, @ integers do not: every argument is passed as the Python value it holds,
+    # whether the row is an array or a tuple or list of NumPy scalars
+    if np is None:
+        args = list(row)
+    elif isinstance(row, np.ndarray):
+        args = row.tolist()
+    else:
+        args = [value.item() if isinstance(value, np.generic) else value for value in row]
+    res = function.execute(args)
+    if res.error:
+        raise RuntimeFailure(res.error)
+    return res.value
+
+
+def vectorized_batch(function, batch):
+    # The values of the function for every row of batch computed with NumPy, or None when they cannot be
+    body_node = getattr(function, 'body_node', None)
+    arg_names = getattr(function, 'arg_names', None)
+    if body_node is None or arg_names is None:
+        return None
+    if isinstance(batch, np.ndarray):
+        if batch.ndim != 2 or batch.shape[1] != len(arg_names):
+            return None  # an arity error is reported by execute()
+        columns = [batch[:, k] for k in range(len(arg_names))]
+    else:
+        if any(len(row) != len(arg_names) for row in batch):
+            return None
+        columns = [[row[k] for row in batch] for k in range(len(arg_names))]
+
+    try:
+        arrays = {arg_name: column_array(column) for arg_name, column in zip(arg_names, columns)}
+        result, _, _ = VectorBody(arrays, function.symbol_table).evaluate(body_node)
+    except NotVectorizable:
+        return None
+
+    if isinstance(result, np.ndarray):
+        return result.tolist()
+    return [result] * len(batch)  # the body does not depend on the arguments
+
+
+def column_array(column):
+    # (array, low, high) of the arguments of one parameter, from a list or a column of a NumPy array
+    if isinstance(column, np.ndarray):
+        if column.dtype == np.bool_:
+            return column, 0, 1
+        if column.dtype.kind not in 'iu':
+            raise NotVectorizable()  # @ has no fractions
+        low, high = int(column.min()), int(column.max())
+        check_bounds(low, high)
+        return column.astype(np.int64), low, high
+
+    if all(type(value) is bool or type(value) is np.bool_ for value in column):
+        return np.array(column, dtype=np.bool_), 0, 1
+
+    column = [value.item() if isinstance(value, np.generic) else value for value in column]
+    if not all(type(value) is int for value in column):
+        raise NotVectorizable()  # a mix of numbers and booleans, or lists and functions
+    low, high = min(column), max(column)
+    check_bounds(low, high)
+    return np.array(column, dtype=np.int64), low, high
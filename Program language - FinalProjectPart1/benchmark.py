@@ -0,0 +1,487 @@
+import os
+import sys
+import time
+import tracemalloc
+
+from flatast import FlatTree
+from general import SourceFile, gc_paused
+from batch import apply_function
+from callsites import call_site_stats
+from interpreter import (ENGINES, LOOP_MODES, FlatInterpreter, Interpreter, LoopValues, SymbolTable, compile_program,
+                         make_evaluator, run)
+from lexer import my_Lexer, my_RegexLexer
+from memo import DEFAULT_MEMO_SIZE, memo_stats
+from optimizer import optimize_node
+from vectorize import NUMPY_AVAILABLE, np
+from parser import (BinOpNode, InvalidSyntaxError, IterativeParser, ParseError, Parser, T_AND, T_DIV, T_EQEQ,
+                    T_EQGREATERTHAN, T_EQLESSTHAN, T_GREATERTHAN, T_LESSTHAN, T_MODULO, T_MUL, T_NEQ, T_OR, T_PLUS,
+                    T_SUB)
+
+#######################################
+# HELPERS
+#######################################
+
+# Small timing helpers shared by the benchmarks below.
+# Every benchmark runs its workload a few times and reports the best run,
+# which is the least noisy number on a busy machine. Like timeit, the cycle collector is
+# paused while timing so that it does not bill one engine for the garbage of another.
+
+
+def best_time(func, repeat=3):
+    best = None
+    with gc_paused():
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best:
+                best = elapsed
+    return best
+
+
+def generated_source(repeat):
+    # One long line of @ code, shaped like the generated scripts we run in production
+    snippet = ('@IF@ fibonacci(n @-@ 1) @>=@ 10 @&@ @NOT@ @FALSE@ @THEN@ (@LAMBDA@ (x) @:@ x @*@ 2)(n) '
+               '@ELSEIF@ n @==@ -1 @THEN@ gcd(48, 18) @%@ 7 @ELSE@ power(2, 10) @/@ 3 @END@ ')
+    return snippet * repeat
+
+
+#######################################
+# BENCHMARKS
+#######################################
+
+def bench_lexer(repeat=20000):
+    text = generated_source(repeat)
+    print(f"Lexing {len(text)} characters")
+
+    for name, lexer_class in (('my_Lexer', my_Lexer), ('my_RegexLexer', my_RegexLexer)):
+        tokens, error = lexer_class('<bench>', text).make_tokens()
+        if error:
+            print(f"{name}: {error.as_string()}")
+            continue
+        elapsed = best_time(lambda: lexer_class('<bench>', text).make_tokens())
+        print(f"{name:>16}: {len(tokens)} tokens in {elapsed:.3f}s, {len(tokens) / elapsed:,.0f} tokens/s")
+
+
+def bench_token_memory(repeat=2000):
+    text = generated_source(repeat)
+
+    for name, lexer_class in (('my_Lexer', my_Lexer), ('my_RegexLexer', my_RegexLexer)):
+        lexer = lexer_class('<bench>', text)
+        tracemalloc.start()
+        tokens, error = lexer.make_tokens()
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if error:
+            print(f"{name}: {error.as_string()}")
+            continue
+        print(f"{name:>16}: {len(tokens)} {type(tokens[0]).__name__} objects, "
+              f"{allocated / len(tokens):.0f} bytes per token")
+
+
+class ChainParser(Parser):
+    # The previous one-method-per-level chain (chain_expression -> comparison -> term -> factor),
+    # where '+' and '*' share a level. Kept here as the reference bench_parser compares climb() with.
+
+    def chain_expression(self):
+        left = self.comparison()
+
+        while self.current_token != None and self.current_token.type in (T_AND, T_OR):
+            op_tok = self.current_token
+            self.advance()
+            right = self.comparison()
+            left = BinOpNode(left, op_tok, right)
+
+        return left
+
+    def comparison(self):
+        left = self.term()
+
+        while self.current_token != None and self.current_token.type in (
+                T_EQEQ, T_NEQ, T_GREATERTHAN, T_LESSTHAN, T_EQGREATERTHAN, T_EQLESSTHAN):
+            op_tok = self.current_token
+            self.advance()
+            right = self.term()
+            left = BinOpNode(left, op_tok, right)
+
+        return left
+
+    def term(self):
+        left = self.run(self.factor())
+
+        while self.current_token != None and self.current_token.type in (T_MUL, T_DIV, T_MODULO, T_PLUS, T_SUB):
+            op_tok = self.current_token
+            self.advance()
+
+            if self.current_token is None:
+                raise ParseError(InvalidSyntaxError(
+                    op_tok.pos_start, op_tok.pos_end,
+                    "Expected expression after operator"
+                ))
+
+            right = self.run(self.factor())
+            left = BinOpNode(left, op_tok, right)
+
+        return left
+
+
+def bench_parser(terms=100000):
+    workloads = (
+        ('sum', ' @+@ '.join(str(i % 97) for i in range(terms))),
+        ('mixed', ' '.join(f'{i % 97} @*@ x @+@ {i % 13} @<@ y @&@' for i in range(terms // 4)) + ' @TRUE@'),
+    )
+
+    for workload, text in workloads:
+        tokens, error = my_RegexLexer('<bench>', text).make_tokens()
+        print(f"{workload}: {len(tokens)} tokens")
+        parses = (
+            ('chain_expression', lambda parser: parser.chain_expression()),
+            ('binary_expression', lambda parser: parser.run(parser.binary_expression())),
+        )
+        for name, parse in parses:
+            elapsed = best_time(lambda: parse(ChainParser(tokens)))
+            print(f"{name:>18}: {elapsed:.3f}s, {len(tokens) / elapsed:,.0f} tokens/s")
+
+
+def bench_nesting(max_depth=64000):
+    # Nested parentheses and IFs; the time per level should stay flat as the depth grows
+    shapes = (
+        ('parens', lambda depth: '(' * depth + '1' + ')' * depth),
+        ('if', lambda depth: '@IF@ x @THEN@ ' * depth + '1' + ' @ELSE@ 2 @END@' * depth),
+    )
+
+    for shape, make_text in shapes:
+        depth = 1000
+        while depth <= max_depth:
+            tokens, error = my_RegexLexer('<bench>', make_text(depth)).make_tokens()
+            try:
+                Parser(tokens).parse()
+                recursive = 'ok'
+            except RecursionError:
+                recursive = 'RecursionError'
+            elapsed = best_time(lambda: IterativeParser(tokens).parse(), repeat=1)
+            print(f"{shape:>8} depth {depth:>6}: IterativeParser {elapsed:.3f}s "
+                  f"({elapsed / depth * 1e6:.1f} us per level), Parser: {recursive}")
+            depth *= 4
+
+
+def bench_ast(lines=5000):
+    text = '\n'.join([generated_source(1)] * lines)
+
+    with gc_paused():
+        tracemalloc.start()
+        program_node = compile_program('<bench>', text)
+        node_bytes, _ = tracemalloc.get_traced_memory()
+        tree = FlatTree.from_node(program_node, SourceFile('<bench>', text))
+        flat_bytes = tracemalloc.get_traced_memory()[0] - node_bytes
+        tracemalloc.stop()
+    print(f"{lines} lines, {len(tree)} nodes")
+    print(f"{'node objects':>16}: {node_bytes / 1e6:.1f} MB, {node_bytes / len(tree):.0f} bytes per node")
+    print(f"{'FlatTree':>16}: {flat_bytes / 1e6:.1f} MB, {flat_bytes / len(tree):.0f} bytes per node")
+
+    loop = '@FOR@ i @IN@ @RANGE@(0, 200) @DO@ @IF@ i @%@ 3 @==@ 0 @THEN@ i @*@ i @ELSE@ i @+@ 1 @END@ @END@'
+    text = '\n'.join([loop] * (lines // 10))
+    program_node = compile_program('<bench>', text)
+    tree = FlatTree.from_node(program_node, SourceFile('<bench>', text))
+    for name, evaluate in (('Interpreter', lambda: Interpreter(SymbolTable()).visit(program_node)),
+                           ('FlatInterpreter', lambda: FlatInterpreter(tree, SymbolTable()).visit(tree.node(tree.root)))):
+        print(f"{name:>16}: evaluated in {best_time(evaluate):.3f}s")
+
+
+def bench_calls(functions=1000, n=18):
+    # fib(n) in a session that has 0 and then `functions` other functions defined:
+    # the cost of a call must not depend on how many names the program defines
+    fib = '@DEF@ fib(n) @IS@ @IF@ n @<@ 2 @THEN@ n @ELSE@ fib(n @-@ 1) @+@ fib(n @-@ 2) @END@ @END@'
+    call = compile_program('<bench>', f'fib({n})').element_nodes[0]
+
+    for defined in (0, functions):
+        # Function names are letters only, so spell the counter with letters
+        names = (''.join(chr(ord('a') + int(digit)) for digit in str(i)) for i in range(defined))
+        text = '\n'.join([f'@DEF@ helper{name}(x) @IS@ x @+@ 1 @END@' for name in names] + [fib])
+        interpreter = Interpreter(SymbolTable())
+        interpreter.visit(compile_program('<bench>', text))
+        elapsed = best_time(lambda: interpreter.visit(call))
+        print(f"fib({n}) with {defined:>5} other functions defined: {elapsed:.3f}s")
+
+
+ENGINE_WORKLOADS = (
+    ('fib(20)', '@DEF@ fib(n) @IS@ @IF@ n @<@ 2 @THEN@ n @ELSE@ fib(n @-@ 1) @+@ fib(n @-@ 2) @END@ @END@', 'fib(20)'),
+    ('loop', '@DEF@ f(x) @IS@ x @*@ x @%@ 7 @END@',
+     '@FOR@ i @IN@ @RANGE@(0, 100000) @DO@ @IF@ i @%@ 3 @==@ 0 @THEN@ f(i) @ELSE@ i @+@ 1 @END@ @END@'),
+    # Every call of recursion_tests.txt, 1000 times over
+    ('recursion_tests x1000', open('recursion_tests.txt').read().replace('\n\n', '\n'),
+     '@FOR@ i @IN@ @RANGE@(0, 1000) @DO@ '
+     'factorial(5) @+@ fibonacci(6) @+@ gcd(48, 18) @+@ power(2, 10) @+@ sumton(10) @END@'),
+)
+
+
+def bench_engines():
+    # The same programs on every execution engine; the definitions are run once, the last statement is timed
+    for workload, definitions, statement in ENGINE_WORKLOADS:
+        print(workload)
+        program_node = compile_program('<bench>', f'{definitions}\n{statement}')
+        *definition_nodes, statement_node = program_node.element_nodes
+        for engine in ENGINES:
+            evaluate = make_evaluator(engine, SymbolTable())
+            for definition_node in definition_nodes:
+                evaluate(definition_node)
+            elapsed = best_time(lambda: evaluate(statement_node))
+            print(f"{engine:>16}: {elapsed:.3f}s")
+
+
+def bench_tail(depth=1000000):
+    # An accumulator-style sumton, tail-recursive to the given depth; engines without tail calls run out of stack
+    definition = ('@DEF@ sumacc(n, acc) @IS@ @IF@ n @==@ 0 @THEN@ acc '
+                  '@ELSE@ sumacc(n @-@ 1, acc @+@ n) @END@ @END@')
+    program_node = compile_program('<bench>', f'{definition}\nsumacc({depth}, 0)')
+    definition_node, statement_node = program_node.element_nodes
+    for engine in ENGINES:
+        evaluate = make_evaluator(engine, SymbolTable())
+        evaluate(definition_node)
+        results = []
+        try:
+            elapsed = best_time(lambda: results.append(evaluate(statement_node)), repeat=1)
+        except RecursionError:
+            print(f"{engine:>16}: RecursionError")
+            continue
+        value, error = results[0]
+        print(f"{engine:>16}: depth {depth} in {elapsed:.3f}s, {error.as_string() if error else value}")
+
+
+def bench_depth(depth=100000):
+    # Plain (non-tail) recursion to the given depth; only the vm engine keeps its call stack off Python's
+    definition = '@DEF@ sumton(n) @IS@ @IF@ n @==@ 0 @THEN@ 0 @ELSE@ n @+@ sumton(n @-@ 1) @END@ @END@'
+    program_node = compile_program('<bench>', f'{definition}\nsumton({depth})')
+    definition_node, statement_node = program_node.element_nodes
+    for engine in ENGINES:
+        evaluate = make_evaluator(engine, SymbolTable())
+        evaluate(definition_node)
+        results = []
+        try:
+            elapsed = best_time(lambda: results.append(evaluate(statement_node)), repeat=1)
+        except RecursionError as e:
+            print(f"{engine:>16}: RecursionError: {e}")
+            continue
+        value, error = results[0]
+        print(f"{engine:>16}: depth {depth} in {elapsed:.3f}s, {error.as_string() if error else value}")
+
+
+def bench_memo(n=25, memo_size=DEFAULT_MEMO_SIZE):
+    # The doubly recursive fibonacci of recursion_tests.txt, with and without memoizing it in the tree engine
+    definition = ('@DEF@ fibonacci(n) @IS@ @IF@ n @==@ 0 @THEN@ 0 @ELSEIF@ n @==@ 1 @THEN@ 1 '
+                  '@ELSE@ fibonacci(n @-@ 1) @+@ fibonacci(n @-@ 2) @END@ @END@')
+    program_node = compile_program('<bench>', f'{definition}\nfibonacci({n})')
+    definition_node, statement_node = program_node.element_nodes
+    for size in (0, memo_size):
+        symbol_table = SymbolTable()
+        evaluate = make_evaluator('tree', symbol_table, memo_size=size)
+        evaluate(definition_node)
+        results = []
+        elapsed = best_time(lambda: results.append(evaluate(statement_node)), repeat=1)
+        value, error = results[0]
+        label = f"memo {size}" if size else "no memo"
+        stats = ''.join(f", {name}: {hits} hits, {misses} misses" for name, (hits, misses, _) in
+                        memo_stats(symbol_table).items())
+        print(f"{label:>16}: fibonacci({n}) in {elapsed:.3f}s{stats}, {error.as_string() if error else value}")
+
+
+def bench_optimize(repeat=20000):
+    # Every @IF@ of if_tests.txt in a loop, on every engine, without and with the -O optimizer
+    lines = [line.strip() for line in open('if_tests.txt') if line.strip()]
+    statement = f"@FOR@ i @IN@ @RANGE@(0, {repeat}) @DO@ {' @+@ '.join(f'({line})' for line in lines)} @END@"
+    for engine in ENGINES:
+        timings = []
+        for optimize in (False, True):
+            statement_node = compile_program('<bench>', statement).element_nodes[0]
+            if optimize:
+                statement_node = optimize_node(statement_node)
+            evaluate = make_evaluator(engine, SymbolTable())
+            timings.append(best_time(lambda: evaluate(statement_node)))
+        plain, optimized = timings
+        print(f"{engine:>16}: {plain:.3f}s, -O {optimized:.3f}s ({plain / optimized:.1f}x)")
+
+
+def bench_invariants(repeat=20000):
+    # A loop whose body repeats arithmetic on names the loop does not change, without and with -O
+    invariant = '(a @*@ a @+@ b @*@ b) @%@ (a @+@ b @+@ 1)'
+    statement = (f"@FOR@ i @IN@ @RANGE@(0, {repeat}) @DO@ "
+                 f"(@IF@ i @%@ 2 @==@ 0 @THEN@ i @*@ ({invariant}) @ELSE@ i @-@ ({invariant}) @END@) "
+                 f"@+@ (a @*@ b @-@ a) @*@ (a @*@ b @-@ a) @END@")
+    for engine in ENGINES:
+        timings = []
+        for optimize in (False, True):
+            statement_node = compile_program('<bench>', statement).element_nodes[0]
+            if optimize:
+                statement_node = optimize_node(statement_node)
+            symbol_table = SymbolTable()
+            symbol_table.set('a', 12345)
+            symbol_table.set('b', 678)
+            evaluate = make_evaluator(engine, symbol_table)
+            timings.append(best_time(lambda: evaluate(statement_node)))
+        plain, optimized = timings
+        print(f"{engine:>16}: {plain:.3f}s, -O {optimized:.3f}s ({plain / optimized:.1f}x)")
+
+
+def bench_loops(n=200000):
+    # A long @FOR@ statement in every loop mode: its peak memory, and the time to run it and use up its value
+    statement = f'@FOR@ i @IN@ @RANGE@(0, {n}) @DO@ i @*@ i @%@ 7 @END@'
+    statement_node = compile_program('<bench>', statement).element_nodes[0]
+    for loops in LOOP_MODES:
+        evaluate = make_evaluator('tree', SymbolTable(), loops=loops)
+
+        def run_statement():
+            value, error = evaluate(statement_node)
+            if isinstance(value, LoopValues):
+                for _ in value:
+                    pass
+
+        tracemalloc.start()
+        run_statement()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        elapsed = best_time(run_statement)
+        print(f"{loops:>16}: {n} iterations in {elapsed:.3f}s, peak {peak / 1e6:.1f} MB")
+
+
+def bench_vectorize(n=200000):
+    # Arithmetic loops over a long range, one iteration at a time and with NumPy
+    bodies = ('i @*@ i @%@ 7', '(i @*@ 3 @+@ a) @/@ 5 @>=@ i @-@ 2 @|@ @FALSE@')
+    for body in bodies:
+        statement_node = compile_program('<bench>', f'@FOR@ i @IN@ @RANGE@(0, {n}) @DO@ {body} @END@').element_nodes[0]
+        timings = []
+        for vectorize in (False, True):
+            symbol_table = SymbolTable()
+            symbol_table.set('a', 12345)
+            evaluate = make_evaluator('tree', symbol_table, vectorize=vectorize)
+            timings.append(best_time(lambda: evaluate(statement_node)))
+        plain, vectorized = timings
+        print(f"{body}: {plain:.3f}s, --vectorize {vectorized:.3f}s ({plain / vectorized:.0f}x)")
+
+
+def bench_parallel(n=64, fib_n=16):
+    # A loop calling the doubly recursive fibonacci, serially and in worker processes, and the speedup over
+    # the serial run. The first run starts the workers, so it is left out of the timing.
+    definition = ('@DEF@ fibonacci(n) @IS@ @IF@ n @<@ 2 @THEN@ n '
+                  '@ELSE@ fibonacci(n @-@ 1) @+@ fibonacci(n @-@ 2) @END@ @END@')
+    statement = f'@FOR@ i @IN@ @RANGE@(0, {n}) @DO@ fibonacci({fib_n} @+@ i @%@ 2) @END@'
+    definition_node, statement_node = compile_program('<bench>', f'{definition}\n{statement}').element_nodes
+    cpus = os.cpu_count() or 1
+    serial = None
+    for workers in sorted({0, 1, 2, 4, cpus}):
+        evaluate = make_evaluator('tree', SymbolTable(), workers=workers)
+        evaluate(definition_node)
+        evaluate(statement_node)
+        elapsed = best_time(lambda: evaluate(statement_node))
+        serial = serial or elapsed
+        label = f"{workers} workers" if workers else "serial"
+        print(f"{label:>16}: {n} iterations in {elapsed:.3f}s, {serial / elapsed:.2f}x ({cpus} CPUs)")
+
+
+def bench_batch(rows=20000):
+    # One function of function_tests.txt applied to many rows: a run() per row, then apply_function
+    run('<bench>', '@DEF@ square(n) @IS@ n @*@ n @END@')
+    arguments = [(i,) for i in range(rows)]
+    workloads = [
+        ('run() per row', lambda: [run('<bench>', f'square({n})') for n, in arguments]),
+        ('apply_function', lambda: list(apply_function('square', arguments))),
+    ]
+    if NUMPY_AVAILABLE:
+        array = np.arange(rows).reshape(-1, 1)
+        workloads.append(('vectorized', lambda: list(apply_function('square', arguments, vectorize=True))))
+        workloads.append(('NumPy rows', lambda: list(apply_function('square', array, vectorize=True))))
+    for name, workload in workloads:
+        elapsed = best_time(workload)
+        print(f"{name:>16}: {rows} rows in {elapsed:.3f}s, {rows / elapsed:,.0f} rows/s")
+
+
+def bench_callsites(n=22):
+    # The doubly recursive fibonacci and the loop workload of bench_engines in the tree engine, looking every
+    # callee up and with the inline caches of call sites; then the hit rate of every call site
+    fib = '@DEF@ fib(n) @IS@ @IF@ n @<@ 2 @THEN@ n @ELSE@ fib(n @-@ 1) @+@ fib(n @-@ 2) @END@ @END@'
+    loop = ('@DEF@ f(x) @IS@ x @*@ x @%@ 7 @END@\n'
+            '@FOR@ i @IN@ @RANGE@(0, 100000) @DO@ @IF@ i @%@ 3 @==@ 0 @THEN@ f(i) @ELSE@ i @+@ 1 @END@ @END@')
+    for name, text in ((f'fib({n})', f'{fib}\nfib({n})'), ('loop', loop)):
+        timings = []
+        for cached in (False, True):
+            program_node = compile_program('<bench>', text)
+            if cached:
+                evaluate = make_evaluator('tree', SymbolTable())
+            else:
+                interpreter = Interpreter(SymbolTable())
+                evaluate = interpreter.visit
+            definition_node, statement_node = program_node.element_nodes
+            evaluate(definition_node)
+            timings.append(best_time(lambda: evaluate(statement_node)))
+        uncached, cached = timings
+        sites = ', '.join(f"{callee} on line {line} hit {hits}/{hits + misses}"
+                          for callee, line, hits, misses in call_site_stats(program_node))
+        print(f"{name:>16}: {uncached:.3f}s, cached {cached:.3f}s ({uncached / cached:.2f}x); {sites}")
+
+
+def bench_lambdas(n=100000):
+    # A lambda evaluated in every iteration of a loop, closed and capturing the loop variable: the memory each
+    # value of the lambda takes, then the time of a loop that calls it
+    for name, body in (('closed', '@LAMBDA@ (x) @:@ x @*@ 2'), ('capturing', '@LAMBDA@ (x) @:@ x @*@ i')):
+        values_node = compile_program('<bench>', f'@FOR@ i @IN@ @RANGE@(0, {n}) @DO@ {body} @END@').element_nodes[0]
+        calls_node = compile_program('<bench>', f'@FOR@ i @IN@ @RANGE@(0, {n}) @DO@ ({body})(i) @END@').element_nodes[0]
+        evaluate = make_evaluator('tree', SymbolTable())
+        tracemalloc.start()
+        values = evaluate(values_node)
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del values
+        elapsed = best_time(lambda: evaluate(calls_node))
+        print(f"{name:>16}: {allocated / n:.0f} bytes per value, {n} calls in {elapsed:.3f}s")
+
+
+def bench_inline(n=100000):
+    # Calls of the small helpers of function_tests.txt in a loop, optimized with -O, without and with inlining
+    definitions = '@DEF@ add(x, y) @IS@ x @+@ y @END@\n@DEF@ square(n) @IS@ n @*@ n @END@'
+    statement = f'@FOR@ i @IN@ @RANGE@(0, {n}) @DO@ add(square(i), i) @END@'
+    timings = []
+    for inline in (False, True):
+        program_node = optimize_node(compile_program('<bench>', f'{definitions}\n{statement}'))
+        evaluate = make_evaluator('tree', SymbolTable(), inline=inline)
+        for definition_node in program_node.element_nodes[:-1]:
+            evaluate(definition_node)
+        timings.append(best_time(lambda: evaluate(program_node.element_nodes[-1])))
+    called, inlined = timings
+    print(f"add(square(i), i) x {n}: {called:.3f}s, inlined {inlined:.3f}s ({called / inlined:.1f}x)")
+
+
+BENCHMARKS = {
+    'lexer': bench_lexer,
+    'tokens': bench_token_memory,
+    'parser': bench_parser,
+    'nesting': bench_nesting,
+    'ast': bench_ast,
+    'calls': bench_calls,
+    'engines': bench_engines,
+    'tail': bench_tail,
+    'depth': bench_depth,
+    'memo': bench_memo,
+    'optimize': bench_optimize,
+    'invariants': bench_invariants,
+    'loops': bench_loops,
+    'vectorize': bench_vectorize,
+    'parallel': bench_parallel,
+    'batch': bench_batch,
+    'callsites': bench_callsites,
+    'lambdas': bench_lambdas,
+    'inline': bench_inline,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}', expected one of: {', '.join(BENCHMARKS)}")
+            continue
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == '__main__':
+    main()
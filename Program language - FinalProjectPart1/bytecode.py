@@ -0,0 +1,530 @@
+import sys
+
+from parser import *
+from general import *
+from runtime import *
+
+#######################################
+# BYTECODE
+#######################################
+
+# The bytecode engine compiles every statement into a CodeObject and runs it on a stack-based virtual machine.
+# A CodeObject's instructions are one flat list of (opcode, argument) pairs; constants and names are kept in
+# separate tables and referenced by index, as in CPython. The body of every @DEF@ and @LAMBDA@ is compiled
+# once into its own CodeObject, which is kept on the FunctionDefNode / LambdaNode (node.code).
+#
+# Calls do not recurse in Python: CALL pushes the caller's state onto the VM's frame stack and RETURN pops it,
+# so a recursive @ function runs entirely inside the single dispatch loop of VirtualMachine.run(). Its depth is
+# bounded by the VM's max_depth, not by Python's recursion limit: a frame on the heap costs about half a
+# kilobyte, so the default of DEFAULT_MAX_DEPTH frames stays around 50 MB.
+
+DEFAULT_MAX_DEPTH = 100000
+
+LOAD_CONST = 0          # push consts[arg]
+LOAD_NAME = 1           # push the value of names[arg]; error if it is not defined
+LOAD_FUNCTION = 2       # push the value of names[arg]; error if it is not a function
+STORE_NAME = 3          # pop a value and bind names[arg] in the current frame
+BINARY_ADD = 4
+BINARY_SUB = 5
+BINARY_MUL = 6
+BINARY_DIV = 7          # floor division; error on division by zero
+BINARY_MOD = 8
+COMPARE_EQ = 9
+COMPARE_NE = 10
+COMPARE_LT = 11
+COMPARE_GT = 12
+COMPARE_LE = 13
+COMPARE_GE = 14
+BINARY_AND = 15         # both operands are already evaluated, as in the Interpreter
+BINARY_OR = 16
+UNARY_NOT = 17
+UNARY_NEG = 18
+JUMP = 19               # continue at instruction arg
+POP_JUMP_IF_FALSE = 20  # pop a value; continue at arg if it is falsy
+FOR_SETUP = 21          # pop step, end and start; push the loop state [counter, end, step, results] of a
+                        # loop over names[arg]
+FOR_ITER = 22           # push the counter while it is below the end, otherwise continue at arg
+FOR_APPEND = 23         # pop the body's value into the results and advance the counter
+FOR_END = 24            # replace the loop state with its results
+DEFINE_FUNCTION = 25    # bind the function described by consts[arg] and push the "defined" message
+MAKE_LAMBDA = 26        # push the function described by consts[arg]
+CHECK_CALLABLE = 27     # error if the top of the stack is not a function (a callee that is not a plain name)
+CALL = 28               # pop arg arguments and a function, and call it
+RETURN = 29             # pop the result and return to the caller
+BUILD_LIST = 30         # pop arg values into a list
+RAISE = 31              # fail with the error in consts[arg]
+LOAD_SHARED = 32        # consts[arg] is (slot, target): if the slot is set, push its value and continue at target
+STORE_SHARED = 33       # set the slot consts[arg] to the top of the stack, which stays there
+CLEAR_SHARED = 34       # unset the slots in consts[arg]
+
+OPCODE_NAMES = [
+    'LOAD_CONST', 'LOAD_NAME', 'LOAD_FUNCTION', 'STORE_NAME',
+    'BINARY_ADD', 'BINARY_SUB', 'BINARY_MUL', 'BINARY_DIV', 'BINARY_MOD',
+    'COMPARE_EQ', 'COMPARE_NE', 'COMPARE_LT', 'COMPARE_GT', 'COMPARE_LE', 'COMPARE_GE',
+    'BINARY_AND', 'BINARY_OR', 'UNARY_NOT', 'UNARY_NEG',
+    'JUMP', 'POP_JUMP_IF_FALSE', 'FOR_SETUP', 'FOR_ITER', 'FOR_APPEND', 'FOR_END',
+    'DEFINE_FUNCTION', 'MAKE_LAMBDA', 'CHECK_CALLABLE', 'CALL', 'RETURN', 'BUILD_LIST', 'RAISE',
+    'LOAD_SHARED', 'STORE_SHARED', 'CLEAR_SHARED',
+]
+
+BINARY_OPCODES = {
+    T_PLUS: BINARY_ADD,
+    T_SUB: BINARY_SUB,
+    T_MUL: BINARY_MUL,
+    T_DIV: BINARY_DIV,
+    T_MODULO: BINARY_MOD,
+    T_EQEQ: COMPARE_EQ,
+    T_NEQ: COMPARE_NE,
+    T_LESSTHAN: COMPARE_LT,
+    T_GREATERTHAN: COMPARE_GT,
+    T_EQLESSTHAN: COMPARE_LE,
+    T_EQGREATERTHAN: COMPARE_GE,
+    T_AND: BINARY_AND,
+    T_OR: BINARY_OR,
+}
+
+
+# nodes maps the index of every instruction that can fail to the node it was compiled from,
+# which is only looked at to report the error.
+class CodeObject:
+    __slots__ = ('name', 'instructions', 'consts', 'names', 'nodes')
+
+    def __init__(self, name):
+        self.name = name
+        self.instructions = []
+        self.consts = []
+        self.names = []
+        self.nodes = {}
+
+    def disassemble(self):
+        lines = []
+        for pc in range(0, len(self.instructions), 2):
+            op, arg = self.instructions[pc], self.instructions[pc + 1]
+            if op in (LOAD_CONST, DEFINE_FUNCTION, MAKE_LAMBDA, RAISE, LOAD_SHARED, STORE_SHARED, CLEAR_SHARED):
+                detail = f' ({self.consts[arg]!r})'
+            elif op in (LOAD_NAME, LOAD_FUNCTION, STORE_NAME, FOR_SETUP):
+                detail = f' ({self.names[arg]})'
+            else:
+                detail = ''
+            lines.append(f'{pc:>6} {OPCODE_NAMES[op]:<18} {arg}{detail}')
+        return '\n'.join(lines)
+
+
+# What DEFINE_FUNCTION and MAKE_LAMBDA need to create a function value
+class FunctionTemplate:
+    __slots__ = ('name', 'code', 'arg_names', 'body_node')
+
+    def __init__(self, name, code, arg_names, body_node):
+        self.name = name
+        self.code = code
+        self.arg_names = arg_names
+        self.body_node = body_node
+
+    def __repr__(self):
+        return f'<code {self.name}>'
+
+
+#######################################
+# COMPILER
+#######################################
+
+class BytecodeCompiler:
+    def __init__(self, code):
+        self.code = code
+        self.const_indices = {}
+        self.name_indices = {}
+
+    def emit(self, op, arg=0, node=None):
+        index = len(self.code.instructions)
+        self.code.instructions += (op, arg)
+        if node is not None:
+            self.code.nodes[index] = node
+        return index
+
+    def here(self):
+        return len(self.code.instructions)
+
+    def patch(self, index, target):
+        self.code.instructions[index + 1] = target
+
+    def const(self, value):
+        # Keyed by type as well, so that True and 1 stay separate constants
+        key = (type(value), value)
+        index = self.const_indices.get(key)
+        if index is None:
+            index = self.const_indices[key] = len(self.code.consts)
+            self.code.consts.append(value)
+        return index
+
+    def name(self, name):
+        index = self.name_indices.get(name)
+        if index is None:
+            index = self.name_indices[name] = len(self.code.names)
+            self.code.names.append(name)
+        return index
+
+    def compile(self, node):
+        method_name = f'compile_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_compile_method)
+        method(node)
+
+    def no_compile_method(self, node):
+        raise Exception(f'No compile_{type(node).__name__} method')
+
+    def compile_NumberNode(self, node):
+        self.emit(LOAD_CONST, self.const(node.tok.value))
+
+    compile_BooleanNode = compile_NumberNode
+
+    def compile_IdentifierNode(self, node):
+        self.emit(LOAD_NAME, self.name(node.tok.value), node)
+
+    def compile_BinOpNode(self, node):
+        self.compile(node.left_node)
+        self.compile(node.right_node)
+        self.emit(BINARY_OPCODES[node.op_tok.type], 0, node)
+
+    def compile_UnaryOpNode(self, node):
+        self.compile(node.node)
+        if node.op_tok.type == T_NOT:
+            self.emit(UNARY_NOT)
+        elif node.op_tok.type == T_SUB:
+            self.emit(UNARY_NEG)
+
+    def compile_IfNode(self, node):
+        end_jumps = []
+        for condition, expr in node.cases:
+            self.compile(condition)
+            next_case = self.emit(POP_JUMP_IF_FALSE)
+            self.compile(expr)
+            end_jumps.append(self.emit(JUMP))
+            self.patch(next_case, self.here())
+
+        if node.else_case:
+            self.compile(node.else_case)
+        else:
+            self.emit(LOAD_CONST, self.const(None))
+
+        for end_jump in end_jumps:
+            self.patch(end_jump, self.here())
+
+    def compile_ForNode(self, node):
+        self.compile(node.start_value_node)
+        self.compile(node.end_value_node)
+        if node.step_value_node:
+            self.compile(node.step_value_node)
+        else:
+            self.emit(LOAD_CONST, self.const(1))
+        self.emit(FOR_SETUP, self.name(node.var_name_tok.value))
+
+        loop = self.emit(FOR_ITER)
+        self.emit(STORE_NAME, self.name(node.var_name_tok.value))
+        self.compile(node.body_node)
+        self.emit(FOR_APPEND)
+        self.emit(JUMP, loop)
+        self.patch(loop, self.here())
+        self.emit(FOR_END)
+
+    def compile_FunctionDefNode(self, node):
+        if node.code is None:
+            node.code = compile_body(node.name_tok.value, node.body_node)
+        template = FunctionTemplate(node.name_tok.value, node.code,
+                                    [arg_tok.value for arg_tok in node.arg_name_toks], node.body_node)
+        self.emit(DEFINE_FUNCTION, self.const(template))
+
+    def compile_FunctionCallNode(self, node):
+        if isinstance(node.name_tok, IdentifierNode):
+            self.emit(LOAD_FUNCTION, self.name(node.name_tok.tok.value), node)
+        else:
+            self.compile(node.name_tok)
+            self.emit(CHECK_CALLABLE, 0, node)
+
+        for arg_node in node.arg_nodes:
+            self.compile(arg_node)
+        self.emit(CALL, len(node.arg_nodes), node)
+
+    def compile_LambdaNode(self, node):
+        func_name = f"<lambda_{id(node)}>"
+        if node.code is None:
+            node.code = compile_body(func_name, node.body_node)
+        template = FunctionTemplate(func_name, node.code,
+                                    [arg_tok.value for arg_tok in node.arg_name_toks], node.body_node)
+        self.emit(MAKE_LAMBDA, self.const(template))
+
+    def compile_SharedNode(self, node):
+        load = self.emit(LOAD_SHARED)
+        self.compile(node.node)
+        self.emit(STORE_SHARED, self.const(node.slot))
+        self.patch(load, self.const((node.slot, self.here())))
+
+    def compile_ScopeNode(self, node):
+        self.emit(CLEAR_SHARED, self.const(node.slots))
+        self.compile(node.node)
+
+    def compile_ListNode(self, node):
+        for element_node in node.element_nodes:
+            self.compile(element_node)
+        self.emit(BUILD_LIST, len(node.element_nodes))
+
+    def compile_ErrorNode(self, node):
+        self.emit(RAISE, self.const(node.error))
+
+
+def compile_body(name, node):
+    # Compiles node into a CodeObject that returns its value
+    code = CodeObject(name)
+    compiler = BytecodeCompiler(code)
+    compiler.compile(node)
+    compiler.emit(RETURN)
+
+    # A jump to a RETURN might as well return right away; this saves one dispatch at the end of every
+    # @IF@ branch but the last
+    instructions = code.instructions
+    for pc in range(0, len(instructions), 2):
+        if instructions[pc] == JUMP and instructions[instructions[pc + 1]] == RETURN:
+            instructions[pc] = RETURN
+    return code
+
+
+#######################################
+# VIRTUAL MACHINE
+#######################################
+
+# A VMFunction is the value of a @DEF@ or @LAMBDA@ in bytecode. The VM calls it without leaving its loop;
+# execute() gives the Interpreter's Function interface, so other engines can call it too.
+class VMFunction:
+    def __init__(self, name, code, arg_names, parent_context, symbol_table, body_node):
+        self.name = name
+        self.code = code
+        self.arg_names = arg_names
+        self.parent_context = parent_context
+        self.symbol_table = symbol_table
+        self.body_node = body_node
+
+    def arity_error(self, args):
+        return RuntimeFailure(RTError(
+            self.body_node.pos_start, self.body_node.pos_end,
+            f"{len(self.arg_names)} arguments expected, got {len(args)}",
+            self.parent_context
+        ))
+
+    def execute(self, args):
+        res = RTResult()
+        if len(args) != len(self.arg_names):
+            return res.failure(self.arity_error(args).error)
+
+        frame = SymbolTable(self.symbol_table)
+        frame.symbols = dict(zip(self.arg_names, args))
+        new_context = Context(self.name, self.parent_context)
+        new_context.symbol_table = frame
+        value, error = run_bytecode(self.code, frame, new_context)
+        if error: return res.failure(error)
+        return res.success(value)
+
+
+class VirtualMachine:
+    def __init__(self, max_depth=DEFAULT_MAX_DEPTH):
+        # Deeper @ recursion than this is a runtime error of the call that goes too deep, so the statement
+        # fails with a traceback and the program goes on. A max_depth of 0 or None leaves the depth bounded
+        # by memory alone
+        self.max_depth = max_depth or sys.maxsize
+
+    def run(self, code, symbol_table, context):
+        # The opcodes are tested roughly from the most to the least frequent
+        frames = []
+        max_depth = self.max_depth
+        instructions, consts, names = code.instructions, code.consts, code.names
+        stack = []
+        push, pop = stack.append, stack.pop
+        pc = 0
+
+        while True:
+            op = instructions[pc]
+            arg = instructions[pc + 1]
+            pc += 2
+
+            if op == LOAD_NAME:
+                name = names[arg]
+                table = symbol_table
+                while table is not None:
+                    value = table.symbols.get(name, UNBOUND)
+                    if value is not UNBOUND:
+                        break
+                    table = table.parent
+                else:
+                    value = None
+                if value is None:
+                    node = code.nodes[pc - 2]
+                    raise RuntimeFailure(RTError(node.pos_start, node.pos_end, f"'{name}' is not defined", context))
+                push(value)
+            elif op == LOAD_CONST:
+                push(consts[arg])
+            elif op == POP_JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == LOAD_FUNCTION:
+                value = symbol_table.get(names[arg])
+                if not value:
+                    node = code.nodes[pc - 2]
+                    raise RuntimeFailure(RTError(node.pos_start, node.pos_end, f"'{names[arg]}'  is not defined", context))
+                push(value)
+            elif op == CALL:
+                if arg:
+                    args = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    args = []
+                func = pop()
+                if type(func) is not VMFunction:
+                    # A function created by another engine
+                    res = func.execute(args)
+                    if res.error:
+                        raise RuntimeFailure(res.error)
+                    push(res.value)
+                    continue
+                if len(args) != len(func.arg_names):
+                    raise func.arity_error(args)
+
+                # A call followed by RETURN is a tail call: the callee replaces the current frame
+                # instead of being stacked on it, so tail recursion runs in constant space
+                if instructions[pc] != RETURN:
+                    if len(frames) >= max_depth:
+                        node = code.nodes[pc - 2]
+                        raise RuntimeFailure(RTError(node.pos_start, node.pos_end,
+                                                     f"Maximum recursion depth of {max_depth} calls exceeded",
+                                                     context))
+                    frames.append((code, pc, stack, symbol_table, context))
+                symbol_table = SymbolTable(func.symbol_table)
+                symbol_table.symbols = dict(zip(func.arg_names, args))
+                context = Context(func.name, func.parent_context)
+                context.symbol_table = symbol_table
+                code = func.code
+                instructions, consts, names = code.instructions, code.consts, code.names
+                stack = []
+                push, pop = stack.append, stack.pop
+                pc = 0
+            elif op == RETURN:
+                value = pop()
+                if not frames:
+                    return value
+                code, pc, stack, symbol_table, context = frames.pop()
+                instructions, consts, names = code.instructions, code.consts, code.names
+                push, pop = stack.append, stack.pop
+                push(value)
+            elif op == BINARY_ADD:
+                right = pop()
+                stack[-1] = stack[-1] + right
+            elif op == BINARY_SUB:
+                right = pop()
+                stack[-1] = stack[-1] - right
+            elif op == BINARY_MUL:
+                right = pop()
+                stack[-1] = stack[-1] * right
+            elif op == COMPARE_EQ:
+                right = pop()
+                stack[-1] = stack[-1] == right
+            elif op == COMPARE_LT:
+                right = pop()
+                stack[-1] = stack[-1] < right
+            elif op == JUMP:
+                pc = arg
+            elif op == FOR_ITER:
+                state = stack[-1]
+                if state[0] < state[1]:
+                    push(state[0])
+                else:
+                    pc = arg
+            elif op == STORE_NAME:
+                symbol_table.symbols[names[arg]] = pop()
+            elif op == FOR_APPEND:
+                value = pop()
+                state = stack[-1]
+                state[3].append(value)
+                state[0] += state[2]
+            elif op == LOAD_SHARED:
+                slot, target = consts[arg]
+                value = symbol_table.symbols.get(slot, UNBOUND)
+                if value is not UNBOUND:
+                    push(value)
+                    pc = target
+            elif op == BINARY_MOD:
+                right = pop()
+                stack[-1] = stack[-1] % right
+            elif op == BINARY_DIV:
+                right = pop()
+                if right == 0:
+                    node = code.nodes[pc - 2]
+                    pos_start = node.op_tok.pos_start if node.op_tok.pos_start else node.left_node.pos_start
+                    pos_end = node.op_tok.pos_end if node.op_tok.pos_end else node.right_node.pos_end
+                    raise RuntimeFailure(DivisionByZeroError(pos_start, pos_end))
+                stack[-1] = stack[-1] // right
+            elif op == COMPARE_NE:
+                right = pop()
+                stack[-1] = stack[-1] != right
+            elif op == COMPARE_GT:
+                right = pop()
+                stack[-1] = stack[-1] > right
+            elif op == COMPARE_LE:
+                right = pop()
+                stack[-1] = stack[-1] <= right
+            elif op == COMPARE_GE:
+                right = pop()
+                stack[-1] = stack[-1] >= right
+            elif op == BINARY_AND:
+                right = pop()
+                if stack[-1]:
+                    stack[-1] = right
+            elif op == BINARY_OR:
+                right = pop()
+                if not stack[-1]:
+                    stack[-1] = right
+            elif op == UNARY_NOT:
+                stack[-1] = not stack[-1]
+            elif op == UNARY_NEG:
+                stack[-1] = -stack[-1]
+            elif op == CHECK_CALLABLE:
+                if not stack[-1]:
+                    node = code.nodes[pc - 2]
+                    raise RuntimeFailure(RTError(node.pos_start, node.pos_end, "'<anonymous>'  is not defined", context))
+            elif op == FOR_SETUP:
+                symbol_table.check_rebinding(names[arg])
+                step_value = pop()
+                end_value = pop()
+                stack[-1] = [stack[-1], end_value, step_value, []]
+            elif op == FOR_END:
+                stack[-1] = stack[-1][3]
+            elif op == STORE_SHARED:
+                symbol_table.symbols[consts[arg]] = stack[-1]
+            elif op == CLEAR_SHARED:
+                symbols = symbol_table.symbols
+                for slot in consts[arg]:
+                    symbols.pop(slot, None)
+            elif op == DEFINE_FUNCTION:
+                template = consts[arg]
+                symbol_table.set(template.name, VMFunction(template.name, template.code, template.arg_names,
+                                                           context, symbol_table, template.body_node))
+                SymbolTable.invalidate()
+                push(f"Function '{template.name}' defined successfully")
+            elif op == MAKE_LAMBDA:
+                template = consts[arg]
+                push(VMFunction(template.name, template.code, template.arg_names,
+                                context, symbol_table, template.body_node))
+            elif op == BUILD_LIST:
+                values = stack[-arg:] if arg else []
+                del stack[len(stack) - arg:]
+                push(values)
+            elif op == RAISE:
+                raise RuntimeFailure(consts[arg])
+            else:
+                raise Exception(f'Unknown opcode {op}')
+
+
+def compile_statement(node):
+    return compile_body('<program>', node)
+
+
+def run_bytecode(code, symbol_table, context, max_depth=DEFAULT_MAX_DEPTH):
+    try:
+        return VirtualMachine(max_depth).run(code, symbol_table, context), None
+    except RuntimeFailure as e:
+        return None, e.error
@@ -0,0 +1,115 @@
+from parser import *
+from runtime import *
+from astcache import child_nodes
+
+#######################################
+# CALL SITES
+#######################################
+
+# Most calls name their function, like fib(n @-@ 1), and the name resolves to the same Function call after
+# call. Before the tree engine evaluates a statement, mark_call_sites() gives every such call a CallSite: an
+# inline cache that remembers the function the name resolved to, so that the Interpreter does not walk the
+# frames to look it up again, and whether its arity matches the call, so that the arguments are not counted
+# again either.
+#
+# A cached function is used while nothing has rebound a name since it was cached. Names are rebound by @DEF@
+# and @FOR@, which bump SymbolTable.generation (see runtime.py), and by binding the arguments of a call in its
+# frame, which never does: a call whose name is a parameter of an enclosing @DEF@ or @LAMBDA@, or is bound by
+# a @DEF@ or @FOR@ in the body of one, resolves to a different function from one call to the next, so it gets
+# no CallSite and is looked up every time. Every other call resolves in the global table, which the CallSite
+# keeps too, in case the same tree is evaluated in another one.
+#
+# free_names() is the same kind of analysis for a @LAMBDA@: one that reads no names from outside is evaluated
+# to the same Function every time (see Interpreter.lambda_value).
+
+
+class CallSite:
+    __slots__ = ('generation', 'root', 'function', 'checked', 'hits', 'misses')
+
+    def __init__(self):
+        self.generation = -1  # never current, so the first call looks the name up
+        self.root = None
+        self.function = None
+        self.checked = False  # the function is a tree Function that takes as many arguments as the call passes
+        self.hits = 0
+        self.misses = 0
+
+    def __reduce__(self):
+        # A tree sent to another process (see parallel.py) keeps its call sites but not what they cached
+        return CallSite, ()
+
+    def store(self, root, function, checked):
+        self.generation = SymbolTable.generation
+        self.root = root
+        self.function = function
+        self.checked = checked
+
+
+def mark_call_sites(node):
+    # Gives every call in node whose name can only resolve in the global table a CallSite; sites marked
+    # before keep their caches and counts
+    nodes = [(node, frozenset())]
+
+    while nodes:
+        node, local_names = nodes.pop()
+        node_type = type(node)
+        if node_type is FunctionDefNode or node_type is LambdaNode:
+            # The body runs in a frame of its own, which binds the parameters and whatever the body binds
+            arg_names = {arg_tok.value for arg_tok in node.arg_name_toks}
+            local_names = local_names | arg_names | bound_names(node.body_node)
+        elif node_type is FunctionCallNode and isinstance(node.name_tok, IdentifierNode):
+            if node.site is None and node.name_tok.tok.value not in local_names:
+                node.site = CallSite()
+        nodes.extend((child, local_names) for child in child_nodes(node) or ())
+
+
+def bound_names(body_node):
+    # The names that @DEF@ and @FOR@ bind in the frame body_node runs in, not in the frames of nested functions
+    names = set()
+    nodes = [body_node]
+
+    while nodes:
+        node = nodes.pop()
+        node_type = type(node)
+        if node_type is FunctionDefNode:
+            names.add(node.name_tok.value)
+            continue
+        if node_type is LambdaNode:
+            continue
+        if node_type is ForNode:
+            names.add(node.var_name_tok.value)
+        nodes.extend(child_nodes(node) or ())
+    return names
+
+
+def free_names(node):
+    # The names the body of a @DEF@ or @LAMBDA@ node reads from outside: every name but the parameters of node
+    # and of the functions nested in it. A name that a @DEF@ or @FOR@ in the body binds is free as well, as
+    # the body can read it before binding it.
+    names = set()
+    nodes = [(node, frozenset())]
+
+    while nodes:
+        node, arg_names = nodes.pop()
+        node_type = type(node)
+        if node_type is IdentifierNode:
+            if node.tok.value not in arg_names:
+                names.add(node.tok.value)
+        elif node_type is FunctionDefNode or node_type is LambdaNode:
+            arg_names = arg_names | {arg_tok.value for arg_tok in node.arg_name_toks}
+        nodes.extend((child, arg_names) for child in child_nodes(node) or ())
+    return names
+
+
+def call_site_stats(node):
+    # [(name, line, hits, misses)] of the call sites in node, in source order; lines are counted in the file
+    stats = []
+    nodes = [node]
+
+    while nodes:
+        node = nodes.pop()
+        if type(node) is FunctionCallNode and node.site is not None:
+            stats.append((node.pos_start.file_ln, node.pos_start.col, node.name_tok.tok.value, node.site))
+        nodes.extend(child_nodes(node) or ())
+    stats.sort(key=lambda stat: stat[:2])
+    return [(name, ln + 1, site.hits, site.misses) for ln, _, name, site in stats]
@@ -0,0 +1,280 @@
+import operator
+
+from parser import *
+from general import *
+from runtime import *
+
+#######################################
+# CLOSURE COMPILER
+#######################################
+
+# The closure compiler is an alternative to the Interpreter. It walks the AST once and turns every node into a
+# Python closure with its operands and operator already bound, so running a program is a single call of the
+# root closure: there is no per-node visit_* lookup and no RTResult per step.
+#
+# Every compiled closure takes (symbol_table, context) and returns the node's value. A run-time error is
+# raised as a RuntimeFailure (runtime.py) carrying the same Error object the Interpreter would return, and
+# run_compiled() turns it back into a (value, error) pair at the top.
+
+# Operators that cannot fail, pre-bound to the function that applies them. '@/@' is compiled separately
+# because it checks for division by zero.
+BINARY_FUNCTIONS = {
+    T_PLUS: operator.add,
+    T_SUB: operator.sub,
+    T_MUL: operator.mul,
+    T_MODULO: operator.mod,
+    T_EQEQ: operator.eq,
+    T_NEQ: operator.ne,
+    T_GREATERTHAN: operator.gt,
+    T_LESSTHAN: operator.lt,
+    T_EQGREATERTHAN: operator.ge,
+    T_EQLESSTHAN: operator.le,
+    # Both operands are evaluated before the operator is applied, exactly as in the Interpreter
+    T_AND: lambda left, right: left if not left else right,
+    T_OR: lambda left, right: left if left else right,
+}
+
+
+# A CompiledFunction is the value of a @DEF@ or @LAMBDA@ in compiled code. call() is the fast path used by
+# compiled call sites; execute() gives the Interpreter's Function interface, so functions can be shared
+# between engines through a symbol table.
+class CompiledFunction:
+    def __init__(self, name, body, arg_names, parent_context, symbol_table, body_node):
+        self.name = name
+        self.body = body
+        self.arg_names = arg_names
+        self.parent_context = parent_context
+        self.symbol_table = symbol_table
+        self.body_node = body_node
+
+    def call(self, args):
+        frame = SymbolTable(self.symbol_table)
+        new_context = Context(self.name, self.parent_context)
+        new_context.symbol_table = frame
+
+        if len(args) != len(self.arg_names):
+            raise RuntimeFailure(RTError(
+                self.body_node.pos_start, self.body_node.pos_end,
+                f"{len(self.arg_names)} arguments expected, got {len(args)}",
+                self.parent_context
+            ))
+
+        symbols = frame.symbols
+        for arg_name, arg_value in zip(self.arg_names, args):
+            symbols[arg_name] = arg_value
+
+        return self.body(frame, new_context)
+
+    def execute(self, args):
+        res = RTResult()
+        try:
+            return res.success(self.call(args))
+        except RuntimeFailure as e:
+            return res.failure(e.error)
+
+
+def call_function(func_value, args):
+    if type(func_value) is CompiledFunction:
+        return func_value.call(args)
+    # A Function created by the Interpreter
+    res = func_value.execute(args)
+    if res.error:
+        raise RuntimeFailure(res.error)
+    return res.value
+
+
+def run_compiled(code, symbol_table, context):
+    try:
+        return code(symbol_table, context), None
+    except RuntimeFailure as e:
+        return None, e.error
+
+
+class ClosureCompiler:
+    def compile(self, node):
+        method_name = f'compile_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_compile_method)
+        return method(node)
+
+    def no_compile_method(self, node):
+        raise Exception(f'No compile_{type(node).__name__} method')
+
+    def compile_NumberNode(self, node):
+        value = node.tok.value
+
+        def number(symbol_table, context):
+            return value
+        return number
+
+    compile_BooleanNode = compile_NumberNode
+
+    def compile_IdentifierNode(self, node):
+        var_name = node.tok.value
+
+        def identifier(symbol_table, context):
+            value = symbol_table.get(var_name)
+            if value is None:
+                raise RuntimeFailure(RTError(
+                    node.pos_start, node.pos_end,
+                    f"'{var_name}' is not defined",
+                    context
+                ))
+            return value
+        return identifier
+
+    def compile_BinOpNode(self, node):
+        left = self.compile(node.left_node)
+        right = self.compile(node.right_node)
+
+        if node.op_tok.type == T_DIV:
+            def divide(symbol_table, context):
+                left_value = left(symbol_table, context)
+                right_value = right(symbol_table, context)
+                if right_value == 0:
+                    pos_start = node.op_tok.pos_start if node.op_tok.pos_start else node.left_node.pos_start
+                    pos_end = node.op_tok.pos_end if node.op_tok.pos_end else node.right_node.pos_end
+                    raise RuntimeFailure(DivisionByZeroError(pos_start, pos_end))
+                return left_value // right_value
+            return divide
+
+        function = BINARY_FUNCTIONS[node.op_tok.type]
+
+        def binary(symbol_table, context):
+            return function(left(symbol_table, context), right(symbol_table, context))
+        return binary
+
+    def compile_UnaryOpNode(self, node):
+        operand = self.compile(node.node)
+
+        if node.op_tok.type == T_NOT:
+            def negation(symbol_table, context):
+                return not operand(symbol_table, context)
+            return negation
+        if node.op_tok.type == T_SUB:
+            def minus(symbol_table, context):
+                return -operand(symbol_table, context)
+            return minus
+        return operand
+
+    def compile_IfNode(self, node):
+        cases = [(self.compile(condition), self.compile(expr)) for condition, expr in node.cases]
+        else_case = self.compile(node.else_case) if node.else_case else None
+
+        def if_expr(symbol_table, context):
+            for condition, expr in cases:
+                if condition(symbol_table, context):
+                    return expr(symbol_table, context)
+            if else_case is not None:
+                return else_case(symbol_table, context)
+            return None
+        return if_expr
+
+    def compile_ForNode(self, node):
+        var_name = node.var_name_tok.value
+        start = self.compile(node.start_value_node)
+        end = self.compile(node.end_value_node)
+        step = self.compile(node.step_value_node) if node.step_value_node else None
+        body = self.compile(node.body_node)
+
+        def for_expr(symbol_table, context):
+            results = []
+            i = start(symbol_table, context)
+            end_value = end(symbol_table, context)
+            step_value = step(symbol_table, context) if step is not None else 1
+            symbols = symbol_table.symbols
+            symbol_table.check_rebinding(var_name)
+
+            while i < end_value:
+                symbols[var_name] = i
+                results.append(body(symbol_table, context))
+                i += step_value
+
+            return results
+        return for_expr
+
+    def compile_FunctionDefNode(self, node):
+        func_name = node.name_tok.value
+        body_node = node.body_node
+        body = self.compile(body_node)
+        arg_names = [arg_tok.value for arg_tok in node.arg_name_toks]
+        message = f"Function '{func_name}' defined successfully"
+
+        def function_def(symbol_table, context):
+            symbol_table.set(func_name, CompiledFunction(func_name, body, arg_names, context, symbol_table, body_node))
+            SymbolTable.invalidate()
+            return message
+        return function_def
+
+    def compile_FunctionCallNode(self, node):
+        arg_codes = [self.compile(arg_node) for arg_node in node.arg_nodes]
+
+        if isinstance(node.name_tok, IdentifierNode):
+            func_name = node.name_tok.tok.value
+
+            def callee(symbol_table, context):
+                return symbol_table.get(func_name)
+        else:
+            func_name = '<anonymous>'
+            callee = self.compile(node.name_tok)
+
+        def function_call(symbol_table, context):
+            func_value = callee(symbol_table, context)
+            if not func_value:
+                raise RuntimeFailure(RTError(
+                    node.pos_start, node.pos_end,
+                    f"'{func_name}'  is not defined",
+                    context
+                ))
+            return call_function(func_value, [arg_code(symbol_table, context) for arg_code in arg_codes])
+        return function_call
+
+    def compile_LambdaNode(self, node):
+        func_name = f"<lambda_{id(node)}>"
+        body_node = node.body_node
+        body = self.compile(body_node)
+        arg_names = [arg_tok.value for arg_tok in node.arg_name_toks]
+
+        def lambda_expr(symbol_table, context):
+            return CompiledFunction(func_name, body, arg_names, context, symbol_table, body_node)
+        return lambda_expr
+
+    def compile_SharedNode(self, node):
+        slot = node.slot
+        code = self.compile(node.node)
+
+        def shared(symbol_table, context):
+            symbols = symbol_table.symbols
+            value = symbols.get(slot, UNBOUND)
+            if value is UNBOUND:
+                value = symbols[slot] = code(symbol_table, context)
+            return value
+        return shared
+
+    def compile_ScopeNode(self, node):
+        slots = node.slots
+        code = self.compile(node.node)
+
+        def scope(symbol_table, context):
+            symbols = symbol_table.symbols
+            for slot in slots:
+                symbols.pop(slot, None)
+            return code(symbol_table, context)
+        return scope
+
+    def compile_ListNode(self, node):
+        element_codes = [self.compile(element_node) for element_node in node.element_nodes]
+
+        def list_expr(symbol_table, context):
+            return [element_code(symbol_table, context) for element_code in element_codes]
+        return list_expr
+
+    def compile_ErrorNode(self, node):
+        error = node.error
+
+        def error_expr(symbol_table, context):
+            raise RuntimeFailure(error)
+        return error_expr
+
+
+def compile_node(node):
+    return ClosureCompiler().compile(node)
@@ -0,0 +1,219 @@
+from array import array
+
+from parser import *
+from general import *
+from astcache import (child_nodes, OP_NUMBER, OP_BOOLEAN, OP_IDENTIFIER, OP_BINOP, OP_UNARYOP, OP_IF, OP_FOR,
+                      OP_FUNCTION_DEF, OP_FUNCTION_CALL, OP_LAMBDA, OP_LIST, OP_ERROR)
+
+#######################################
+# FLAT AST
+#######################################
+
+# A FlatTree stores a whole program as a handful of parallel arrays instead of one object per node.
+# Nodes are numbered in post-order (children before their parent, so the root is the last node), and node i is:
+#
+#   ops[i]          opcode, the same OP_* numbering as the AST cache
+#   args[i]         token type for BINOP/UNARYOP, has-else flag for IF, otherwise an index into consts
+#   starts[i]       source offset of pos_start
+#   ends[i]         source offset of pos_end
+#   tok_offsets[i]  source offset of the node's own token (the operator of a BINOP), or -1
+#   children[child_starts[i]:child_starts[i + 1]]  indices of its child nodes
+#
+# consts holds the token values (numbers, booleans, names), the (name, arg_names) of FunctionDefs,
+# the arg_names of Lambdas and the error of ErrorNodes, each distinct value once.
+# FlatInterpreter (interpreter.py) walks these arrays directly; repr_at() prints any node exactly like its __repr__.
+
+INDEX_TYPE = 'i'  # 4-byte ints: sources and trees up to 2**31 characters and nodes
+
+
+class FlatTree:
+    __slots__ = ('ops', 'args', 'starts', 'ends', 'tok_offsets', 'child_starts', 'children',
+                 'consts', 'src', 'spans', 'root')
+
+    def __init__(self, src):
+        self.ops = array('B')
+        self.args = array(INDEX_TYPE)
+        self.starts = array(INDEX_TYPE)
+        self.ends = array(INDEX_TYPE)
+        self.tok_offsets = array(INDEX_TYPE)
+        self.child_starts = array(INDEX_TYPE, [0])
+        self.children = array(INDEX_TYPE)
+        self.consts = []
+        self.src = src
+        self.spans = None  # (start, end) offsets of every statement when the root is a program ListNode
+        self.root = -1
+
+    @classmethod
+    def from_node(cls, root, src):
+        tree = cls(src)
+        const_indices = {}
+        indices = []  # indices of the finished nodes whose parent has not been emitted yet
+        stack = [(root, None)]
+
+        def const(value):
+            # Keyed by type as well, so that True and 1 stay separate constants
+            key = (type(value), value)
+            index = const_indices.get(key)
+            if index is None:
+                index = const_indices[key] = len(tree.consts)
+                tree.consts.append(value)
+            return index
+
+        while stack:
+            node, children = stack.pop()
+            while isinstance(node, (SharedNode, ScopeNode)):
+                # The flat form has no shared values: it evaluates the expressions of the optimizer's nodes
+                node = node.node
+            if children is None:
+                children = () if isinstance(node, ErrorNode) else child_nodes(node)
+                stack.append((node, children))
+                for child in reversed(children):
+                    stack.append((child, None))
+                continue
+
+            tok_offset = -1
+            if isinstance(node, NumberNode):
+                op, arg, tok_offset = OP_NUMBER, const(node.tok.value), node.tok.pos_start.idx
+            elif isinstance(node, BooleanNode):
+                op, arg, tok_offset = OP_BOOLEAN, const(node.tok.value), node.tok.pos_start.idx
+            elif isinstance(node, IdentifierNode):
+                op, arg, tok_offset = OP_IDENTIFIER, const(node.tok.value), node.tok.pos_start.idx
+            elif isinstance(node, BinOpNode):
+                op, arg, tok_offset = OP_BINOP, node.op_tok.type, node.op_tok.pos_start.idx
+            elif isinstance(node, UnaryOpNode):
+                op, arg, tok_offset = OP_UNARYOP, node.op_tok.type, node.op_tok.pos_start.idx
+            elif isinstance(node, IfNode):
+                op, arg = OP_IF, int(node.else_case is not None)
+            elif isinstance(node, ForNode):
+                op, arg, tok_offset = OP_FOR, const(node.var_name_tok.value), node.var_name_tok.pos_start.idx
+            elif isinstance(node, FunctionDefNode):
+                arg_names = tuple(arg_tok.value for arg_tok in node.arg_name_toks)
+                op, arg, tok_offset = OP_FUNCTION_DEF, const((node.name_tok.value, arg_names)), node.name_tok.pos_start.idx
+            elif isinstance(node, FunctionCallNode):
+                op, arg = OP_FUNCTION_CALL, 0
+            elif isinstance(node, LambdaNode):
+                op, arg = OP_LAMBDA, const(tuple(arg_tok.value for arg_tok in node.arg_name_toks))
+            elif isinstance(node, ListNode):
+                op, arg = OP_LIST, 0
+            else:
+                op, arg = OP_ERROR, const(node.error)
+
+            if children:
+                tree.children.extend(indices[-len(children):])
+                del indices[-len(children):]
+            tree.child_starts.append(len(tree.children))
+            tree.ops.append(op)
+            tree.args.append(arg)
+            tree.starts.append(node.pos_start.idx)
+            tree.ends.append(node.pos_end.idx)
+            tree.tok_offsets.append(tok_offset)
+            indices.append(len(tree.ops) - 1)
+
+        tree.root = indices.pop()
+        if isinstance(root, ListNode) and root.element_spans is not None:
+            tree.spans = [(pos_start.idx, pos_end.idx) for pos_start, pos_end in root.element_spans]
+        return tree
+
+    def __len__(self):
+        return len(self.ops)
+
+    def node(self, index):
+        return FlatNode(self, index)
+
+    def child_indices(self, index):
+        return self.children[self.child_starts[index]:self.child_starts[index + 1]]
+
+    def position(self, offset):
+        return SourcePosition(offset, self.src)
+
+    def subtree_start(self, index):
+        # In post-order a subtree is the contiguous run of nodes ending at its root;
+        # it starts at its leftmost leaf
+        while self.child_starts[index] != self.child_starts[index + 1]:
+            index = self.children[self.child_starts[index]]
+        return index
+
+    def repr_at(self, index):
+        # Builds the same text as the node classes' __repr__, bottom-up over the subtree so that deep trees do not recurse
+        texts = {}
+        ops, args, consts = self.ops, self.args, self.consts
+
+        for i in range(self.subtree_start(index), index + 1):
+            parts = [texts.pop(child) for child in self.child_indices(i)]
+            op = ops[i]
+
+            if op == OP_NUMBER:
+                text = repr(token(T_INT, consts[args[i]]))
+            elif op == OP_BOOLEAN:
+                text = repr(token(T_BOOLEAN, consts[args[i]]))
+            elif op == OP_IDENTIFIER:
+                text = repr(token(T_IDENTIFIER, consts[args[i]]))
+            elif op == OP_BINOP:
+                text = f'({parts[0]} {token(args[i])} {parts[1]})'
+            elif op == OP_UNARYOP:
+                text = f'({token(args[i])}{parts[0]})'
+            elif op == OP_IF:
+                else_text = parts.pop() if args[i] else None
+                text = f'@IF@ {parts[0]} @THEN@ {parts[1]}'
+                for k in range(2, len(parts), 2):
+                    text += f' @ELSEIF@ {parts[k]} @THEN@ {parts[k + 1]}'
+                if else_text:
+                    text += f' @ELSE@ {else_text}'
+                text += ' @END@'
+            elif op == OP_FOR:
+                range_text = f'@RANGE@({", ".join(parts[:-1])})'
+                text = f'@FOR@ {token(T_IDENTIFIER, consts[args[i]])} @IN@ {range_text} @DO@ {parts[-1]} @END@'
+            elif op == OP_FUNCTION_DEF:
+                name, arg_names = consts[args[i]]
+                text = f'@DEF@ {token(T_IDENTIFIER, name)}({arg_list(arg_names)}) @IS@ {parts[0]} @END@'
+            elif op == OP_FUNCTION_CALL:
+                text = f'{parts[0]}({", ".join(parts[1:])})'
+            elif op == OP_LAMBDA:
+                text = f'@LAMBDA@({arg_list(consts[args[i]])}) @:@ {parts[0]}'
+            elif op == OP_LIST:
+                text = f'[{", ".join(parts)}]'
+            else:
+                text = f'<error: {consts[args[i]].error_name}>'
+
+            texts[i] = text
+
+        return texts[index]
+
+
+def token(type_, value=None):
+    # A throwaway token, only used for its __repr__
+    return my_CompactToken(type_, value, 0, None)
+
+
+def arg_list(arg_names):
+    return ", ".join(str(token(T_IDENTIFIER, name)) for name in arg_names)
+
+
+# A FlatNode is a lightweight handle on one node of a FlatTree. It is what the interpreter keeps
+# where it would otherwise keep a node object: as the body of a Function and for the statements of a program.
+class FlatNode:
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def pos_start(self):
+        return self.tree.position(self.tree.starts[self.index])
+
+    @property
+    def pos_end(self):
+        return self.tree.position(self.tree.ends[self.index])
+
+    @property
+    def element_nodes(self):
+        return [FlatNode(self.tree, child) for child in self.tree.child_indices(self.index)]
+
+    @property
+    def element_spans(self):
+        position = self.tree.position
+        return [(position(start), position(end)) for start, end in self.tree.spans]
+
+    def __repr__(self):
+        return self.tree.repr_at(self.index)
@@ -1,7 +1,14 @@
+from bisect import bisect_right
+from contextlib import contextmanager
+import gc
+
 #######################################
 # CONSTANTS
 #######################################
 
+# Bumped whenever a change makes previously parsed programs invalid (see astcache.py)
+INTERPRETER_VERSION = '1.1'
+
 DIGITS = '0123456789'
 LETTERS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
 
@@ -63,7 +70,8 @@ class RTError(Error):
         pos = self.pos_start
         ctx = self.context
 
-        while ctx:
+        # A function's context is entered without a call position, so the traceback stops at the frame that raised
+        while ctx and pos:
             result = f'  File {pos.fn}, line {str(pos.ln + 1)}, in {ctx.display_name}\n' + result
             pos = ctx.parent_entry_pos
             ctx = ctx.parent
@@ -100,6 +108,99 @@ class Position:
         return Position(self.idx, self.ln, self.col, self.fn, self.ftxt)
 
 
+# The SourceFile class holds a file name and its text, plus an index of line start offsets.
+# The index is only built the first time a line or column number is actually requested,
+# which in practice means when an error message is being formatted.
+#
+# Errors report lines counted from the start of the statement they are in, as they did when every line of a
+# file was run as a program of its own. For a whole program, statement_starts holds the offset where every
+# statement starts (see mark_statements); file_line_of() gives the line in the file.
+class SourceFile:
+    __slots__ = ('fn', 'ftxt', '_line_starts', 'statement_starts')
+
+    def __init__(self, fn, ftxt):
+        self.fn = fn
+        self.ftxt = ftxt
+        self._line_starts = None
+        self.statement_starts = None
+
+    def line_starts(self):
+        if self._line_starts is None:
+            starts = [0]
+            idx = self.ftxt.find('\n')
+            while idx != -1:
+                starts.append(idx + 1)
+                idx = self.ftxt.find('\n', idx + 1)
+            self._line_starts = starts
+        return self._line_starts
+
+    def mark_statements(self, spans):
+        # spans are the (start, end) positions of a program's statements, as in ListNode.element_spans
+        self.statement_starts = [pos_start.idx for pos_start, _ in spans]
+
+    def file_line_of(self, idx):
+        return bisect_right(self.line_starts(), idx) - 1
+
+    def line_of(self, idx):
+        line = self.file_line_of(idx)
+        starts = self.statement_starts
+        if starts:
+            i = bisect_right(starts, idx) - 1
+            if i >= 0:
+                line -= self.file_line_of(starts[i])
+        return line
+
+    def col_of(self, idx):
+        return idx - self.line_starts()[self.file_line_of(idx)]
+
+
+# SourcePosition is an immutable stand-in for Position that stores a single offset into a SourceFile.
+# It exposes the same idx/ln/col/fn/ftxt attributes, computing ln and col lazily, and file_ln, the line of the
+# file it is on.
+class SourcePosition:
+    __slots__ = ('idx', 'src')
+
+    def __init__(self, idx, src):
+        self.idx = idx
+        self.src = src
+
+    @property
+    def ln(self):
+        return self.src.line_of(self.idx)
+
+    @property
+    def file_ln(self):
+        return self.src.file_line_of(self.idx)
 
+    @property
+    def col(self):
+        return self.src.col_of(self.idx)
 
+    @property
+    def fn(self):
+        return self.src.fn
+
+    @property
+    def ftxt(self):
+        return self.src.ftxt
+
+    def copy(self):
+        return SourcePosition(self.idx, self.src)
+
+
+#######################################
+# GARBAGE COLLECTION
+#######################################
 
+# Decoding or encoding a cached AST (see astcache.py) creates millions of objects without any reference cycles.
+# The cycle collector would keep rescanning the growing tree, so it is paused while that happens. It is only
+# disabled for that stretch, and objects someone else froze are left where they are.
+@contextmanager
+def gc_paused():
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
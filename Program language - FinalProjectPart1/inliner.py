@@ -0,0 +1,93 @@
+from parser import *
+from astcache import child_nodes
+from optimizer import SLOTS
+
+#######################################
+# INLINING
+#######################################
+
+# A call of a small helper like square(n) costs far more than its body n @*@ n: a frame, a Context and an
+# Interpreter of its own. Under -O the tree engine gives every @DEF@ whose body only computes a value from its
+# parameters an InlineBody, a copy of the body in which every parameter reads a slot of the optimizer (see
+# SharedNode) instead of a name. A call of such a function evaluates its arguments in order as usual, puts them
+# in the slots and evaluates the InlineBody in the caller's frame, so every argument is still evaluated exactly
+# once, before the body.
+#
+# Only bodies of at most INLINE_MAX_NODES numbers, booleans, parameters, operators, @IF@ and lists are inlined:
+# they can only fail with a division by zero, whose message does not depend on the frame it happens in, and
+# they call nothing, so a recursive function is never inlined. The InlineBody belongs to the Function, so a call
+# site only uses it while its inline cache (see callsites.py) holds that Function; redefining the name with @DEF@
+# makes a new Function and drops the cache.
+
+INLINE_MAX_NODES = 16
+
+INLINE_NODES = (NumberNode, BooleanNode, IdentifierNode, BinOpNode, UnaryOpNode, IfNode, ListNode, SharedNode,
+                ScopeNode)
+
+
+class InlineBody:
+    __slots__ = ('arg_slots', 'slots', 'body_node')
+
+    def __init__(self, arg_slots, slots, body_node):
+        self.arg_slots = arg_slots  # the slot of every argument, in order
+        self.slots = slots          # every slot the body uses, to be cleared from the caller's frame after it
+        self.body_node = body_node
+
+
+def inline_body(body_node, arg_names):
+    # The InlineBody of a function, or None when its calls have to be made
+    nodes = [body_node]
+    count = 0
+
+    while nodes:
+        node = nodes.pop()
+        count += 1
+        if count > INLINE_MAX_NODES or type(node) not in INLINE_NODES:
+            return None
+        if type(node) is IdentifierNode and node.tok.value not in arg_names:
+            return None  # a name of the defining frame, which the caller's frame may not see
+        nodes.extend(child_nodes(node))
+
+    arg_slots = tuple(next(SLOTS) for _ in arg_names)
+    # As when a call binds them, the last of repeated parameters wins
+    slot_of = dict(zip(arg_names, arg_slots))
+    body_node = substitute(body_node, slot_of)
+    slots = arg_slots + tuple(slot for slot in shared_slots(body_node) if slot not in arg_slots)
+    return InlineBody(arg_slots, slots, body_node)
+
+
+def substitute(node, slot_of):
+    # A copy of node in which every parameter reads its slot. The copies keep the tokens of the originals, so
+    # errors report the same positions.
+    node_type = type(node)
+    if node_type is IdentifierNode:
+        return SharedNode(slot_of[node.tok.value], node)
+    if node_type is BinOpNode:
+        return BinOpNode(substitute(node.left_node, slot_of), node.op_tok, substitute(node.right_node, slot_of))
+    if node_type is UnaryOpNode:
+        return UnaryOpNode(node.op_tok, substitute(node.node, slot_of))
+    if node_type is IfNode:
+        cases = [(substitute(condition, slot_of), substitute(expr, slot_of)) for condition, expr in node.cases]
+        return IfNode(cases, substitute(node.else_case, slot_of) if node.else_case else None)
+    if node_type is ListNode:
+        return ListNode([substitute(element_node, slot_of) for element_node in node.element_nodes],
+                        node.pos_start, node.pos_end, node.element_spans)
+    if node_type is SharedNode:
+        return SharedNode(node.slot, substitute(node.node, slot_of))
+    if node_type is ScopeNode:
+        return ScopeNode(node.slots, substitute(node.node, slot_of))
+    return node  # numbers and booleans
+
+
+def shared_slots(node):
+    # The slots the SharedNodes of node read: those of the parameters and of the values -O shares
+    slots = []
+    nodes = [node]
+
+    while nodes:
+        node = nodes.pop()
+        if type(node) is SharedNode and node.slot not in slots:
+            slots.append(node.slot)
+        nodes.extend(child_nodes(node))
+    return slots
+
@@ -1,7 +1,20 @@
 from parser import *
 from general import *
-from lexer import my_Lexer
-import sys
+from runtime import *
+from lexer import my_RegexLexer
+from astcache import (load_program, store_program, OP_NUMBER, OP_BOOLEAN, OP_IDENTIFIER, OP_BINOP, OP_UNARYOP,
+                      OP_IF, OP_FOR, OP_FUNCTION_DEF, OP_FUNCTION_CALL, OP_LAMBDA, OP_LIST, OP_ERROR)
+from flatast import FlatTree
+from closures import compile_node, run_compiled
+from bytecode import DEFAULT_MAX_DEPTH, compile_statement, run_bytecode
+from transpiler import transpile_statement, run_transpiled
+from memo import DEFAULT_MEMO_SIZE, MISSING, Memo, pure_callees
+from optimizer import optimize_node
+from vectorize import NUMPY_AVAILABLE, vectorized_loop
+from parallel import parallel_loop
+from callsites import free_names, mark_call_sites
+from inliner import inline_body
+import argparse
 #######################################
 # function
 #######################################
@@ -10,82 +23,143 @@ import sys
 # It stores the function's name, body, arguments, and context information.
 # The execute method handles the function call process, including argument validation,
 # setting up a new execution context, and interpreting the function body.
+# A Function with a memo (see memo.py) answers repeated calls with the same arguments from it, and one with
+# an inline_body (see inliner.py) is evaluated in its caller's frame.
 
 
 class Function:
-    def __init__(self, name, body_node, arg_names, parent_context, global_symbol_table):
+    __slots__ = ('name', 'body_node', 'arg_names', 'parent_context', 'symbol_table', 'memo_size', 'vectorize',
+                 'workers', 'inline', 'memo', 'inline_body')
+
+    def __init__(self, name, body_node, arg_names, parent_context, symbol_table, memo_size=0, vectorize=False,
+                 workers=0, inline=False):
         self.name = name
         self.body_node = body_node
         self.arg_names = arg_names
         self.parent_context = parent_context
-        self.global_symbol_table = global_symbol_table
-
-    def execute(self, args):
+        self.symbol_table = symbol_table  # the environment the function was defined in
+        self.memo_size = memo_size
+        self.vectorize = vectorize
+        self.workers = workers
+        self.inline = inline
+        self.memo = None
+        self.inline_body = None
+
+    def execute(self, args, checked=False):
+        # checked: the caller already knows that args has one value per parameter (see callsites.py)
         res = RTResult()
-        interpreter = Interpreter(self.global_symbol_table.copy())
-        new_context = Context(self.name, self.parent_context)
-
-        if len(args) != len(self.arg_names):
-            return res.failure(RTError(
-                self.body_node.pos_start, self.body_node.pos_end,
-                f"{len(self.arg_names)} arguments expected, got {len(args)}",
-                self.parent_context
-            ))
+        function = self
+        pending = None  # (memo, key) of every memoized call that ends with the result of this one
+
+        # A call in tail position of the body comes back as a TailCall and is made by this loop rather than
+        # by a nested execute(), so tail recursion runs in constant Python stack space
+        while True:
+            memo = function.memo
+            if memo is not None:
+                key, value = memo.lookup(function, args)
+                if key is not None:
+                    if value is not MISSING:
+                        if pending:
+                            for pending_memo, pending_key in pending:
+                                pending_memo.store(pending_key, value)
+                        return res.success(value)
+                    if pending is None:
+                        pending = [(memo, key)]
+                    else:
+                        pending.append((memo, key))
+
+            # A call only creates a small frame for the arguments, linked to the defining environment
+            frame = SymbolTable(function.symbol_table)
+            interpreter = function.new_interpreter(frame)
+            new_context = Context(function.name, function.parent_context)
+            new_context.symbol_table = frame
+
+            arg_names = function.arg_names
+            if not checked and len(args) != len(arg_names):
+                return res.failure(RTError(
+                    function.body_node.pos_start, function.body_node.pos_end,
+                    f"{len(arg_names)} arguments expected, got {len(args)}",
+                    function.parent_context
+                ))
 
-        for i in range(len(args)):
-            arg_name = self.arg_names[i]
-            arg_value = args[i]
-            interpreter.global_symbol_table[arg_name] = arg_value
+            for i in range(len(args)):
+                arg_name = arg_names[i]
+                arg_value = args[i]
+                frame.set(arg_name, arg_value)
 
-        interpreter.context = new_context
-        value = res.register(interpreter.visit(self.body_node))
-        if res.error: return res
-        return res.success(value)
+            interpreter.context = new_context
+            value = res.register(interpreter.visit_tail(function.body_node))
+            if res.error: return res
 
-#######################################
-# context
-#######################################
+            if not isinstance(value, TailCall):
+                if pending:
+                    for pending_memo, pending_key in pending:
+                        pending_memo.store(pending_key, value)
+                return res.success(value)
+            if not isinstance(value.function, Function):
+                # A function of another engine makes the call itself
+                value = res.register(value.function.execute(value.args))
+                if res.error: return res
+                return res.success(value)
+            function, args, checked = value.function, value.args, value.checked
+
+    def new_interpreter(self, symbol_table):
+        return Interpreter(symbol_table, self.memo_size, self.vectorize, self.workers, self.inline)
+
+
+# A call that Interpreter.visit_tail found in tail position: the function and its evaluated arguments
+class TailCall:
+    __slots__ = ('function', 'args', 'checked')
+
+    def __init__(self, function, args, checked=False):
+        self.function = function
+        self.args = args
+        self.checked = checked
+
+
+# A Closure is the value of a @LAMBDA@ whose body reads names from outside. The Function of the LambdaNode is
+# made once (see Interpreter.lambda_function); every evaluation only adds the frame and context it happened in,
+# in the slots it inherits from Function. The others are left empty.
+class Closure(Function):
+    __slots__ = ('function',)
+    memo = None  # lambdas are not memoized or inlined
+    inline_body = None
+
+    def __init__(self, function, symbol_table, parent_context):
+        self.function = function
+        self.symbol_table = symbol_table
+        self.parent_context = parent_context
 
-# The Context class represents the execution context for a specific scope in the @ language.
-# It maintains information about the current scope's name, its parent context, and the position
-# where it was entered. This class is crucial for managing nested scopes and proper variable resolution.
+    @property
+    def name(self):
+        return self.function.name
 
+    @property
+    def body_node(self):
+        return self.function.body_node
 
-class Context:
-    def __init__(self, display_name, parent=None, parent_entry_pos=None):
-        self.display_name = display_name
-        self.parent = parent
-        self.parent_entry_pos = parent_entry_pos
-        self.symbol_table = None
+    @property
+    def arg_names(self):
+        return self.function.arg_names
 
-#######################################
-# INTERPRETER
-#######################################
+    def new_interpreter(self, symbol_table):
+        return self.function.new_interpreter(symbol_table)
 
-# The RTResult (Runtime Result) class is used to handle the results of runtime operations.
-# It encapsulates both successful results (values) and errors that may occur during interpretation.
-# This class helps in propagating results and errors through the interpretation process,
-# allowing for clean error handling and result management throughout the interpreter.
+    def __repr__(self):
+        # To a program it is a function like any other
+        return f'<{Function.__module__}.{Function.__qualname__} object at {hex(id(self))}>'
 
-class RTResult:
-    def __init__(self):
-        self.value = None
-        self.error = None
 
-    def register(self, res):
-        if isinstance(res, RTResult):
-            if res.error: self.error = res.error
-            return res.value
-        return res
+# A FlatFunction is a Function whose body is a FlatNode of a FlatTree; calling it runs a FlatInterpreter.
+class FlatFunction(Function):
+    __slots__ = ()
 
-    def success(self, value):
-        self.value = value
-        return self
-
-    def failure(self, error):
-        self.error = error
-        return self
+    def new_interpreter(self, symbol_table):
+        return FlatInterpreter(self.body_node.tree, symbol_table)
 
+#######################################
+# INTERPRETER
+#######################################
 
 # The Interpreter class is responsible for executing the Abstract Syntax Tree (AST) generated by the parser.
 # It implements the visitor pattern to traverse the AST and execute each node according to the language semantics.
@@ -93,9 +167,14 @@ class RTResult:
 # It also manages the global symbol table and execution context, ensuring proper scoping and variable resolution.
 
 class Interpreter:
-    def __init__(self, global_symbol_table):
-        self.global_symbol_table = global_symbol_table
+    def __init__(self, symbol_table, memo_size=0, vectorize=False, workers=0, inline=False):
+        self.symbol_table = symbol_table
+        self.memo_size = memo_size  # results kept per pure @DEF@ function; 0 turns memoization off
+        self.vectorize = vectorize  # run arithmetic @FOR@ loops with NumPy (see vectorize.py)
+        self.workers = workers      # processes that run pure @FOR@ loops (see parallel.py); 0 runs them here
+        self.inline = inline        # evaluate calls of small @DEF@ functions in the caller's frame (see inliner.py)
         self.context = Context('<program>')
+        self.context.symbol_table = symbol_table
 
     def visit(self, node):
         method_name = f'visit_{type(node).__name__}'
@@ -107,43 +186,142 @@ class Interpreter:
         func_name = node.name_tok.value
         body_node = node.body_node
         arg_names = [arg_tok.value for arg_tok in node.arg_name_toks]
-        func_value = Function(func_name, body_node, arg_names, self.context, self.global_symbol_table)
-
-        self.global_symbol_table[func_name] = func_value
+        func_value = Function(func_name, body_node, arg_names, self.context, self.symbol_table, self.memo_size,
+                              self.vectorize, self.workers, self.inline)
+        if self.memo_size:
+            callees = pure_callees(body_node, arg_names)
+            if callees is not None:
+                func_value.memo = Memo(callees, self.memo_size)
+        if self.inline and func_value.memo is None:
+            func_value.inline_body = inline_body(body_node, arg_names)
+
+        self.symbol_table.set(func_name, func_value)
+        SymbolTable.invalidate()
         return res.success(f"Function '{func_name}' defined successfully")
 
     def visit_FunctionCallNode(self, node):
         res = RTResult()
-        args = []
+        call = res.register(self.evaluate_call(node))
+        if res.error: return res
+
+        func_value, args, checked = call
+        if checked and func_value.inline_body is not None:
+            return self.visit_inline(func_value, args)
+        return_value = res.register(func_value.execute(args, True) if checked else func_value.execute(args))
+        if res.error: return res
+        return res.success(return_value)
 
-        if isinstance(node.name_tok, LambdaNode):
-            func_value = res.register(self.visit_LambdaNode(node.name_tok))
-        elif isinstance(node.name_tok, IdentifierNode):
-            func_value = self.global_symbol_table.get(node.name_tok.tok.value)
+    def evaluate_call(self, node):
+        # Evaluates the function and the arguments of a call, in that order, but does not call it.
+        # Returns (function, arguments, whether the function's arity was checked against the call already).
+        res = RTResult()
+        args = []
+        checked = False
+
+        site = node.site
+        if site is not None and site.generation == SymbolTable.generation and site.root is self.symbol_table.root:
+            # A call by a name that only the global table binds, and nothing rebound a name since it was cached
+            site.hits += 1
+            func_value = site.function
+            checked = site.checked
         else:
-            func_value = res.register(self.visit(node.name_tok))
+            if site is not None:
+                site.misses += 1
+                func_value = self.symbol_table.get(node.name_tok.tok.value)
+                if hasattr(func_value, 'execute'):
+                    checked = type(func_value) is Function and len(func_value.arg_names) == len(node.arg_nodes)
+                    site.store(self.symbol_table.root, func_value, checked)
+            elif isinstance(node.name_tok, LambdaNode):
+                func_value = self.lambda_value(node.name_tok)
+            elif isinstance(node.name_tok, IdentifierNode):
+                func_value = self.symbol_table.get(node.name_tok.tok.value)
+            else:
+                func_value = res.register(self.visit(node.name_tok))
 
-        if res.error:
-            return res
+            if res.error:
+                return res
 
-        if not func_value:
-            return res.failure(RTError(
-                node.pos_start, node.pos_end,
-                f"'{node.name_tok.tok.value if isinstance(node.name_tok, IdentifierNode) else '<anonymous>'}'  is not defined",
-                self.context
-            ))
+            if not func_value:
+                return res.failure(RTError(
+                    node.pos_start, node.pos_end,
+                    f"'{node.name_tok.tok.value if isinstance(node.name_tok, IdentifierNode) else '<anonymous>'}'  is not defined",
+                    self.context
+                ))
 
         for arg_node in node.arg_nodes:
             args.append(res.register(self.visit(arg_node)))
             if res.error: return res
 
-        return_value = res.register(func_value.execute(args))
-        if res.error: return res
-        return res.success(return_value)
+        return res.success((func_value, args, checked))
+
+    def visit_tail(self, node):
+        # Evaluates a function body like visit(), except for a call in tail position: the body itself or the
+        # chosen branch of an @IF@ there. That call is not made but returned as a TailCall to Function.execute.
+        res = RTResult()
+
+        while True:
+            if isinstance(node, IfNode):
+                for condition, expr in node.cases:
+                    condition_value = res.register(self.visit(condition))
+                    if res.error: return res
+
+                    if condition_value:
+                        node = expr
+                        break
+                else:
+                    if not node.else_case:
+                        return res.success(None)
+                    node = node.else_case
+            elif isinstance(node, ScopeNode):
+                self.reset_slots(node)
+                node = node.node
+            else:
+                break
+
+        if isinstance(node, FunctionCallNode):
+            call = res.register(self.evaluate_call(node))
+            if res.error: return res
+            func_value, args, checked = call
+            if checked and func_value.inline_body is not None:
+                return self.visit_inline(func_value, args)
+            return res.success(TailCall(*call))
+
+        return self.visit(node)
+
+    def visit_inline(self, function, args):
+        # Makes a call of a function with an inline_body whose arguments are evaluated and known to fit, by
+        # evaluating the body in the current frame with the arguments in its slots
+        for value in args:
+            if value is None:
+                # Binding it would leave the parameter undefined; the call reports that in the function's context
+                return function.execute(args, True)
+
+        inline = function.inline_body
+        symbols = self.symbol_table.symbols
+        for slot, value in zip(inline.arg_slots, args):
+            symbols[slot] = value
+        try:
+            return self.visit(inline.body_node)
+        finally:
+            for slot in inline.slots:
+                symbols.pop(slot, None)
+
+    def visit_ListNode(self, node):
+        res = RTResult()
+        values = []
+
+        for element_node in node.element_nodes:
+            values.append(res.register(self.visit(element_node)))
+            if res.error: return res
+
+        return res.success(values)
+
+    def visit_ErrorNode(self, node):
+        return RTResult().failure(node.error)
 
     def visit_IdentifierNode(self, node):
         var_name = node.tok.value
-        value = self.global_symbol_table.get(var_name)
+        value = self.symbol_table.get(var_name)
 
         if value is None:
             return RTResult().failure(RTError(
@@ -165,58 +343,26 @@ class Interpreter:
 
     def visit_BinOpNode(self, node):
         res = RTResult()
-        result = None
         left = res.register(self.visit(node.left_node))
         if res.error: return res
         right = res.register(self.visit(node.right_node))
         if res.error: return res
 
-        if node.op_tok.type == T_DIV:
-            if right == 0:
-                pos_start = node.op_tok.pos_start if node.op_tok.pos_start else node.left_node.pos_start
-                pos_end = node.op_tok.pos_end if node.op_tok.pos_end else node.right_node.pos_end
-                return res.failure(DivisionByZeroError(
-                    pos_start, pos_end
-                ))
-            result = left // right
-        elif node.op_tok.type == T_PLUS:
-            result = left + right
-        elif node.op_tok.type == T_SUB:
-            result = left - right
-        elif node.op_tok.type == T_MUL:
-            result = left * right
-        elif node.op_tok.type == T_MODULO:
-            result = left % right
-        elif node.op_tok.type == T_EQEQ:
-            result = left == right
-        elif node.op_tok.type == T_NEQ:
-            result = left != right
-        elif node.op_tok.type == T_GREATERTHAN:
-            result = left > right
-        elif node.op_tok.type == T_LESSTHAN:
-            result = left < right
-        elif node.op_tok.type == T_EQGREATERTHAN:
-            result = left >= right
-        elif node.op_tok.type == T_EQLESSTHAN:
-            result = left <= right
-        elif node.op_tok.type == T_AND:
-            result = left if not left else right
-        elif node.op_tok.type == T_OR:
-            result = left if left else right
-
-        return res.success(result)
+        if node.op_tok.type == T_DIV and right == 0:
+            pos_start = node.op_tok.pos_start if node.op_tok.pos_start else node.left_node.pos_start
+            pos_end = node.op_tok.pos_end if node.op_tok.pos_end else node.right_node.pos_end
+            return res.failure(DivisionByZeroError(
+                pos_start, pos_end
+            ))
+
+        return res.success(binary_operation(node.op_tok.type, left, right))
 
     def visit_UnaryOpNode(self, node):
         res = RTResult()
         value = res.register(self.visit(node.node))
         if res.error: return res
 
-        if node.op_tok.type == T_NOT:
-            value = not value
-        elif node.op_tok.type == T_SUB:
-            value = -value
-
-        return res.success(value)
+        return res.success(unary_operation(node.op_tok.type, value))
 
     def visit_IfNode(self, node):
         res = RTResult()
@@ -249,10 +395,29 @@ class Interpreter:
         else:
             step_value = 1
 
+        var_name = node.var_name_tok.value
+        self.check_rebinding(var_name)
+        generation = SymbolTable.generation
+
+        if self.vectorize:
+            values = vectorized_loop(var_name, node.body_node, start_value, end_value, step_value, self.symbol_table)
+            if values is not None:
+                return res.success(values)
+
         i = start_value
 
+        if self.workers:
+            # The iterations the workers did not get to, if one of them failed, run below
+            computed = parallel_loop(self, Function, var_name, node.body_node, start_value, end_value, step_value,
+                                     self.workers)
+            if computed is not None:
+                results, i = computed
+
         while i < end_value:
-            self.global_symbol_table[node.var_name_tok.value] = i
+            if SymbolTable.generation != generation:
+                self.check_rebinding(var_name)
+                generation = SymbolTable.generation
+            self.symbol_table.set(var_name, i)
 
             value = res.register(self.visit(node.body_node))
             if res.error: return res
@@ -262,69 +427,628 @@ class Interpreter:
 
         return res.success(results)
 
+    def iterate_ForNode(self, node):
+        # Runs the loop like visit_ForNode, but yields the value of every iteration as soon as it is known
+        # instead of collecting them. Errors are raised as RuntimeFailure, including those of the range.
+        res = RTResult()
+
+        start_value = res.register(self.visit(node.start_value_node))
+        if res.error: raise RuntimeFailure(res.error)
+
+        end_value = res.register(self.visit(node.end_value_node))
+        if res.error: raise RuntimeFailure(res.error)
+
+        if node.step_value_node:
+            step_value = res.register(self.visit(node.step_value_node))
+            if res.error: raise RuntimeFailure(res.error)
+        else:
+            step_value = 1
+
+        var_name = node.var_name_tok.value
+        generation = None
+        i = start_value
+
+        while i < end_value:
+            if SymbolTable.generation != generation:
+                self.check_rebinding(var_name)
+                generation = SymbolTable.generation
+            self.symbol_table.set(var_name, i)
+
+            value = res.register(self.visit(node.body_node))
+            if res.error: raise RuntimeFailure(res.error)
+
+            yield value
+            i += step_value
+
+    def check_rebinding(self, var_name):
+        # Binding the variable of a @FOR@ rebinds a function when the name resolves to one; that happens before
+        # the first iteration or after a @DEF@ in the body, which is when the loops above call this
+        self.symbol_table.check_rebinding(var_name)
+
+    def visit_SharedNode(self, node):
+        symbols = self.symbol_table.symbols
+        value = symbols.get(node.slot, UNBOUND)
+        if value is not UNBOUND:
+            return RTResult().success(value)
+
+        res = self.visit(node.node)
+        if not res.error:
+            symbols[node.slot] = res.value
+        return res
+
+    def visit_ScopeNode(self, node):
+        self.reset_slots(node)
+        return self.visit(node.node)
+
+    def reset_slots(self, node):
+        symbols = self.symbol_table.symbols
+        for slot in node.slots:
+            symbols.pop(slot, None)
+
     def visit_LambdaNode(self, node):
+        return RTResult().success(self.lambda_value(node))
+
+    def lambda_value(self, node):
+        # A lambda whose body reads nothing but parameters is the same function every time, so that is what it
+        # evaluates to; one that reads other names is a Closure over the current frame
+        function = self.lambda_function(node)
+        if node.closed:
+            return function
+        return Closure(function, self.symbol_table, self.context)
+
+    def lambda_function(self, node):
+        # The Function made for node, or a new one when it was made in another global table or by an
+        # Interpreter with other options. Its frame is the global table, and its context only has the name
+        # of the current one: a closed lambda has no use for the frames it is evaluated in, and should not
+        # keep them alive.
+        function = node.function
+        root = self.symbol_table.root
+        if (function is None or function.symbol_table is not root or function.memo_size != self.memo_size
+                or function.vectorize != self.vectorize or function.workers != self.workers
+                or function.inline != self.inline):
+            arg_names = [arg_tok.value for arg_tok in node.arg_name_toks]
+            function = Function(f"<lambda_{id(node)}>", node.body_node, arg_names, Context(self.context.display_name),
+                                root, self.memo_size, self.vectorize, self.workers, self.inline)
+            node.function = function
+            node.closed = not free_names(node)
+        return function
+
+
+#######################################
+# FLAT INTERPRETER
+#######################################
+
+# The FlatInterpreter evaluates a FlatTree (see flatast.py) by walking its arrays, without node objects.
+# Node i is dispatched on tree.ops[i]; every visit_flat_* method mirrors the visit_*Node method of the same
+# construct in Interpreter, so both produce the same values and the same errors.
+
+class FlatInterpreter(Interpreter):
+    def __init__(self, tree, symbol_table):
+        super().__init__(symbol_table)
+        self.tree = tree
+
+    def visit(self, node):
+        # node is a FlatNode: a statement of the program or the body of a FlatFunction
+        return self.visit_index(node.index)
+
+    def visit_index(self, i):
+        return self.FLAT_VISITORS[self.tree.ops[i]](self, i)
+
+    def node_error(self, i, details):
+        return RTResult().failure(RTError(
+            self.tree.position(self.tree.starts[i]), self.tree.position(self.tree.ends[i]),
+            details,
+            self.context
+        ))
+
+    def visit_flat_constant(self, i):
+        return RTResult().success(self.tree.consts[self.tree.args[i]])
+
+    def visit_flat_identifier(self, i):
+        var_name = self.tree.consts[self.tree.args[i]]
+        value = self.symbol_table.get(var_name)
+
+        if value is None:
+            return self.node_error(i, f"'{var_name}' is not defined")
+
+        return RTResult().success(value)
+
+    def visit_flat_binop(self, i):
         res = RTResult()
+        tree = self.tree
+        first = tree.child_starts[i]
+        left = res.register(self.visit_index(tree.children[first]))
+        if res.error: return res
+        right = res.register(self.visit_index(tree.children[first + 1]))
+        if res.error: return res
 
-        func_name = f"<lambda_{id(node)}>"
-        body_node = node.body_node
-        arg_names = [arg_tok.value for arg_tok in node.arg_name_toks]
-        func_value = Function(func_name, body_node, arg_names, self.context, self.global_symbol_table)
+        op_type = tree.args[i]
+        if op_type == T_DIV and right == 0:
+            return res.failure(DivisionByZeroError(
+                tree.position(tree.tok_offsets[i]), tree.position(tree.tok_offsets[i] + 1)
+            ))
+
+        return res.success(binary_operation(op_type, left, right))
+
+    def visit_flat_unaryop(self, i):
+        res = RTResult()
+        value = res.register(self.visit_index(self.tree.children[self.tree.child_starts[i]]))
+        if res.error: return res
+
+        return res.success(unary_operation(self.tree.args[i], value))
+
+    def visit_flat_if(self, i):
+        res = RTResult()
+        children = self.tree.child_indices(i)
+        case_end = len(children) - 1 if self.tree.args[i] else len(children)
+
+        for k in range(0, case_end, 2):
+            condition_value = res.register(self.visit_index(children[k]))
+            if res.error: return res
+
+            if condition_value:
+                return res.success(res.register(self.visit_index(children[k + 1])))
+
+        if self.tree.args[i]:
+            return res.success(res.register(self.visit_index(children[-1])))
+
+        return res.success(None)
+
+    def visit_flat_for(self, i):
+        res = RTResult()
+        results = []
+        children = self.tree.child_indices(i)
+        var_name = self.tree.consts[self.tree.args[i]]
+
+        start_value = res.register(self.visit_index(children[0]))
+        if res.error: return res
+
+        end_value = res.register(self.visit_index(children[1]))
+        if res.error: return res
+
+        if len(children) == 4:
+            step_value = res.register(self.visit_index(children[2]))
+            if res.error: return res
+        else:
+            step_value = 1
+
+        body = children[-1]
+        counter = start_value
+        self.symbol_table.check_rebinding(var_name)
+
+        while counter < end_value:
+            self.symbol_table.set(var_name, counter)
+
+            value = res.register(self.visit_index(body))
+            if res.error: return res
+
+            results.append(value)
+            counter += step_value
+
+        return res.success(results)
+
+    def visit_flat_function_def(self, i):
+        res = RTResult()
+        func_name, arg_names = self.tree.consts[self.tree.args[i]]
+        body_node = self.tree.node(self.tree.children[self.tree.child_starts[i]])
+        func_value = FlatFunction(func_name, body_node, list(arg_names), self.context, self.symbol_table)
+
+        self.symbol_table.set(func_name, func_value)
+        SymbolTable.invalidate()
+        return res.success(f"Function '{func_name}' defined successfully")
+
+    def visit_flat_function_call(self, i):
+        res = RTResult()
+        call = res.register(self.evaluate_flat_call(i))
+        if res.error: return res
+
+        func_value, args = call
+        return_value = res.register(func_value.execute(args))
+        if res.error: return res
+        return res.success(return_value)
+
+    def evaluate_flat_call(self, i):
+        res = RTResult()
+        args = []
+        tree = self.tree
+        children = tree.child_indices(i)
+        callee = children[0]
+
+        if tree.ops[callee] == OP_LAMBDA:
+            func_value = res.register(self.visit_flat_lambda(callee))
+        elif tree.ops[callee] == OP_IDENTIFIER:
+            func_value = self.symbol_table.get(tree.consts[tree.args[callee]])
+        else:
+            func_value = res.register(self.visit_index(callee))
+
+        if res.error:
+            return res
+
+        if not func_value:
+            name = tree.consts[tree.args[callee]] if tree.ops[callee] == OP_IDENTIFIER else '<anonymous>'
+            return self.node_error(i, f"'{name}'  is not defined")
+
+        for arg_index in children[1:]:
+            args.append(res.register(self.visit_index(arg_index)))
+            if res.error: return res
+
+        return res.success((func_value, args))
+
+    def visit_tail(self, node):
+        res = RTResult()
+        tree = self.tree
+        i = node.index
+
+        while tree.ops[i] == OP_IF:
+            children = tree.child_indices(i)
+            case_end = len(children) - 1 if tree.args[i] else len(children)
+
+            for k in range(0, case_end, 2):
+                condition_value = res.register(self.visit_index(children[k]))
+                if res.error: return res
+
+                if condition_value:
+                    i = children[k + 1]
+                    break
+            else:
+                if not tree.args[i]:
+                    return res.success(None)
+                i = children[-1]
+
+        if tree.ops[i] == OP_FUNCTION_CALL:
+            call = res.register(self.evaluate_flat_call(i))
+            if res.error: return res
+            return res.success(TailCall(*call))
+
+        return self.visit_index(i)
+
+    def visit_flat_lambda(self, i):
+        res = RTResult()
+
+        func_name = f"<lambda_{id(self.tree)}_{i}>"
+        body_node = self.tree.node(self.tree.children[self.tree.child_starts[i]])
+        arg_names = list(self.tree.consts[self.tree.args[i]])
+        func_value = FlatFunction(func_name, body_node, arg_names, self.context, self.symbol_table)
 
         return res.success(func_value)
 
+    def visit_flat_list(self, i):
+        res = RTResult()
+        values = []
+
+        for element in self.tree.child_indices(i):
+            values.append(res.register(self.visit_index(element)))
+            if res.error: return res
+
+        return res.success(values)
+
+    def visit_flat_error(self, i):
+        return RTResult().failure(self.tree.consts[self.tree.args[i]])
+
+    FLAT_VISITORS = {
+        OP_NUMBER: visit_flat_constant,
+        OP_BOOLEAN: visit_flat_constant,
+        OP_IDENTIFIER: visit_flat_identifier,
+        OP_BINOP: visit_flat_binop,
+        OP_UNARYOP: visit_flat_unaryop,
+        OP_IF: visit_flat_if,
+        OP_FOR: visit_flat_for,
+        OP_FUNCTION_DEF: visit_flat_function_def,
+        OP_FUNCTION_CALL: visit_flat_function_call,
+        OP_LAMBDA: visit_flat_lambda,
+        OP_LIST: visit_flat_list,
+        OP_ERROR: visit_flat_error,
+    }
+
 #######################################
 # RUN
 #######################################
 
 
-global_symbol_table = {}
+global_symbol_table = SymbolTable()
+
+# The execution engines: 'tree' is the tree-walking Interpreter above,
+# 'closure' compiles every statement to Python closures first (see closures.py),
+# 'vm' compiles it to bytecode for a stack-based virtual machine (see bytecode.py),
+# 'python' translates it to Python code (see transpiler.py)
+ENGINES = ('tree', 'closure', 'vm', 'python')
+
+# What a @FOR@ statement evaluates to: 'list' collects the values of its iterations into a list,
+# 'lazy' returns a LoopValues (see runtime.py) that runs the loop as it is iterated, and 'discard' runs the loop
+# for its effect and keeps only the value of the last iteration. Loops inside expressions always make a list.
+LOOP_MODES = ('list', 'lazy', 'discard')
+
+
+def make_evaluator(engine, symbol_table, max_depth=DEFAULT_MAX_DEPTH, memo_size=0, loops='list', vectorize=False,
+                   workers=0, inline=False):
+    # Returns a function that evaluates one node in symbol_table and returns (value, error). max_depth limits
+    # the @ call depth of the 'vm' engine; the other engines recurse in Python and stop at its recursion limit
+    # (see depth_checked).
+    # memo_size turns on the memoization of pure functions, loops chooses a loop mode from LOOP_MODES,
+    # vectorize runs arithmetic loops with NumPy, workers runs pure loops in that many processes and inline
+    # evaluates calls of small functions in the caller's frame; only the 'tree' engine does any of these.
+    # The 'tree' engine also caches the callee of every call by name (see callsites.py).
+    if memo_size and engine != 'tree':
+        raise ValueError("Memoization is only available in the 'tree' engine")
+    if vectorize and engine != 'tree':
+        raise ValueError("Vectorized loops are only available in the 'tree' engine")
+    if vectorize and not NUMPY_AVAILABLE:
+        raise ValueError("Vectorized loops need NumPy, which is not installed")
+    if workers < 0:
+        raise ValueError(f"The number of workers must be positive, got {workers}")
+    if workers and engine != 'tree':
+        raise ValueError("Parallel loops are only available in the 'tree' engine")
+    if loops not in LOOP_MODES:
+        raise ValueError(f"Unknown loop mode '{loops}', expected one of: {', '.join(LOOP_MODES)}")
+    if loops != 'list' and engine != 'tree':
+        raise ValueError("Lazy and discarded loops are only available in the 'tree' engine")
+    if inline and engine != 'tree':
+        raise ValueError("Inlining is only available in the 'tree' engine")
+    if engine == 'tree':
+        interpreter = Interpreter(symbol_table, memo_size, vectorize, workers, inline)
+
+        def evaluate(node):
+            mark_call_sites(node)
+            if loops != 'list':
+                # Under -O a loop statement can be wrapped in the scope of its hoisted values
+                while type(node) is ScopeNode:
+                    interpreter.reset_slots(node)
+                    node = node.node
+                if type(node) is ForNode:
+                    return run_loop(interpreter.iterate_ForNode(node), loops)
+            result = interpreter.visit(node)
+            return result.value, result.error
+    elif engine == 'closure':
+        context = Context('<program>')
+        context.symbol_table = symbol_table
+
+        def evaluate(node):
+            return run_compiled(compile_node(node), symbol_table, context)
+    elif engine == 'vm':
+        context = Context('<program>')
+        context.symbol_table = symbol_table
+
+        def evaluate(node):
+            return run_bytecode(compile_statement(node), symbol_table, context, max_depth)
+    elif engine == 'python':
+        context = Context('<program>')
+        context.symbol_table = symbol_table
+
+        def evaluate(node):
+            return run_transpiled(transpile_statement(node), symbol_table, context)
+    else:
+        raise ValueError(f"Unknown engine '{engine}', expected one of: {', '.join(ENGINES)}")
+    return depth_checked(evaluate)
+
+
+def depth_checked(evaluate):
+    # Wraps a statement evaluator so that running into Python's recursion limit is a runtime error of the statement,
+    # like the vm engine's max_depth. Deep @ recursion gets there, and so does compiling or evaluating source that
+    # nests deeper than the recursive engines can follow, which the iterative parser accepts.
+    def evaluate_statement(node):
+        try:
+            return evaluate(node)
+        except RecursionError:
+            return None, RTError(node.pos_start, node.pos_end, "Maximum recursion depth exceeded",
+                                 Context('<program>'))
+
+    return evaluate_statement
+
+
+def run_loop(values, loops):
+    # The (value, error) of a @FOR@ statement whose iterations values yields, in the loop mode loops
+    if loops == 'lazy':
+        return LoopValues(values), None
 
+    value = None
+    try:
+        for value in values:
+            pass
+    except RuntimeFailure as e:
+        return None, e.error
+    return value, None
 
-def run(fn, text):
+
+def run(fn, text, stream=False, iterative=False, engine='tree', max_depth=DEFAULT_MAX_DEPTH, memo_size=0,
+        optimize=False, loops='list', vectorize=False, workers=0):
     # Generate tokens
-    lexer = my_Lexer(fn, text)
-    tokens, error = lexer.make_tokens()
-    if error:
-        return None, error
-    # Parsing
-    parser = Parser(tokens)
+    lexer = my_RegexLexer(fn, text)
+    if stream:
+        # Streaming mode: the parser pulls tokens from the lexer as it goes
+        tokens = lexer.iter_tokens()
+    else:
+        tokens, error = lexer.make_tokens()
+        if error:
+            return None, error
+    # Parsing; the iterative parser handles nesting deeper than Python's recursion limit
+    parser = IterativeParser(tokens) if iterative else Parser(tokens)
     ast = parser.parse()
+    if stream:
+        # Lex whatever the parser left unread, so an illegal character is reported before a syntax error
+        for _ in tokens:
+            pass
+        if lexer.error: return None, lexer.error
     if ast.error: return None, ast.error
 
-    # Interpreting
-    interpreter = Interpreter(global_symbol_table)
-    result = interpreter.visit(ast.node)
+    # Constant folding and dead-branch elimination
+    node = optimize_node(ast.node) if optimize else ast.node
+
+    # Interpreting; -O also inlines small functions where the engine can
+    inline = optimize and engine == 'tree'
+    return make_evaluator(engine, global_symbol_table, max_depth, memo_size, loops, vectorize, workers, inline)(node)
+
 
-    return result.value, result.error
+def positive_int(text):
+    # An argparse type for counts that have to be at least 1 when given
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{text}'")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive number, got {value}")
+    return value
 
 
 def main():
-    if len(sys.argv) == 2:
+    arg_parser = argparse.ArgumentParser(description='Run a @ program, or start the REPL when no file is given.')
+    arg_parser.add_argument('file', nargs='?', help='the program to run')
+    arg_parser.add_argument('--engine', choices=ENGINES, default='tree', help='how to execute the program')
+    arg_parser.add_argument('--line-mode', action='store_true', help='run the file one line at a time')
+    arg_parser.add_argument('--no-cache', action='store_true', help='do not read or write __pycache__')
+    arg_parser.add_argument('--flat', action='store_true', help='evaluate the flat array form of the program')
+    arg_parser.add_argument('--iterative', action='store_true', help='parse with the iterative parser')
+    arg_parser.add_argument('--max-depth', type=int, default=DEFAULT_MAX_DEPTH,
+                            help='deepest @ recursion the vm engine allows; 0 for no limit but memory')
+    arg_parser.add_argument('-O', '--optimize', action='store_true',
+                            help='fold constant expressions, drop @IF@ branches that can never be taken '
+                                 'and inline small functions')
+    arg_parser.add_argument('--memoize', action='store_true', help='remember the results of pure functions')
+    arg_parser.add_argument('--memo-size', type=int, default=DEFAULT_MEMO_SIZE,
+                            help='how many results --memoize keeps per function')
+    arg_parser.add_argument('--loops', choices=LOOP_MODES, default='list',
+                            help='what a @FOR@ statement evaluates to: a list, values printed as the loop runs, '
+                                 'or only the last value')
+    arg_parser.add_argument('--vectorize', action='store_true',
+                            help='run @FOR@ loops over plain arithmetic with NumPy')
+    arg_parser.add_argument('--workers', type=positive_int, default=0,
+                            help='run the iterations of pure @FOR@ loops in this many processes')
+    args = arg_parser.parse_args()
+    memo_size = args.memo_size if args.memoize else 0
+
+    if args.file:
         # File mode
-        filename = sys.argv[1]
-        run_file(filename)
+        run_file(args.file, program=not args.line_mode, cache=not args.no_cache, flat=args.flat,
+                 iterative=args.iterative, engine=args.engine, max_depth=args.max_depth, memo_size=memo_size,
+                 optimize=args.optimize, loops=args.loops, vectorize=args.vectorize, workers=args.workers)
     else:
         # REPL mode
-        run_repl()
-
+        run_repl(args.engine, args.max_depth, memo_size, args.optimize, args.loops, args.vectorize, args.workers)
+
+
+def compile_program(fn, text, iterative=False):
+    # Program mode: lex the whole text once and parse it into a single ListNode of statements.
+    # A statement that spans several lines and fails to parse (an unclosed @DEF@ or parenthesis swallows the
+    # lines after it) is parsed again a line at a time, the way line mode reads it, so the statements on the
+    # following lines still run.
+    parser_class = IterativeParser if iterative else Parser
+    lexer = my_RegexLexer(fn, text, program=True)
+    program_node = parser_class(lexer.iter_tokens()).statements().node
+
+    element_nodes = []
+    element_spans = []
+    for node, span in zip(program_node.element_nodes, program_node.element_spans):
+        pos_start, pos_end = span
+        if type(node) is ErrorNode and pos_start.file_ln != pos_end.file_ln:
+            end = text.find('\n', pos_end.idx)
+            tokens = lexer.iter_tokens(pos_start.idx, len(text) if end == -1 else end, every_line=True)
+            lines_node = parser_class(tokens).statements().node
+            element_nodes.extend(lines_node.element_nodes)
+            element_spans.extend(lines_node.element_spans)
+        else:
+            element_nodes.append(node)
+            element_spans.append(span)
+    program_node.element_nodes = element_nodes
+    program_node.element_spans = element_spans
+    lexer.src.mark_statements(element_spans)
+    return program_node
+
+
+def run_file(filename, program=True, cache=True, flat=False, iterative=False, engine='tree',
+             max_depth=DEFAULT_MAX_DEPTH, memo_size=0, optimize=False, loops='list', vectorize=False, workers=0):
+    if flat and engine != 'tree':
+        raise ValueError("Flat trees can only be evaluated by the 'tree' engine")
+    if flat and memo_size:
+        raise ValueError("Flat trees cannot be evaluated with memoization")
+    if flat and loops != 'list':
+        raise ValueError("Flat trees can only evaluate loops to lists")
+    if flat and vectorize:
+        raise ValueError("Flat trees cannot be evaluated with vectorized loops")
+    if flat and workers:
+        raise ValueError("Flat trees cannot be evaluated with parallel loops")
 
-def run_file(filename):
     with open(filename, 'r') as file:
-        lines = file.readlines()
-
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if line == '':
-            continue  # Skip empty lines
-        print(f"Line {i+1}: {line}")
-        result, error = run(filename, line)
-        if error:
-            print(f"Error: {error.as_string()}\n")
+        text = file.read()
+
+    if not program:
+        for i, line in enumerate(text.splitlines()):
+            line = line.strip()
+            if line == '':
+                continue  # Skip empty lines
+            print(f"Line {i+1}: {line}")
+            result, error = run(filename, line, iterative=iterative, engine=engine, max_depth=max_depth,
+                                memo_size=memo_size, optimize=optimize, loops=loops, vectorize=vectorize,
+                                workers=workers)
+            print_output(result, error)
+        return
+
+    lines = text.splitlines()
+    # Reuse the tree from __pycache__ when this exact source was compiled before
+    program_node = load_program(filename, text) if cache else None
+    if program_node is None:
+        program_node = compile_program(filename, text, iterative)
+        if cache:
+            store_program(filename, text, program_node)
+    if optimize:
+        # After caching, so the artifact holds the program as written
+        program_node = optimize_node(program_node)
+    if flat:
+        # Evaluate the compact array form instead, and let the node objects go
+        src = SourceFile(filename, text)
+        src.mark_statements(program_node.element_spans)
+        tree = FlatTree.from_node(program_node, src)
+        program_node = tree.node(tree.root)
+        interpreter = FlatInterpreter(tree, global_symbol_table)
+
+        @depth_checked
+        def evaluate(node):
+            result = interpreter.visit(node)
+            return result.value, result.error
+    else:
+        evaluate = make_evaluator(engine, global_symbol_table, max_depth, memo_size, loops, vectorize, workers,
+                                  optimize and engine == 'tree')
+    for node, (pos_start, pos_end) in zip(program_node.element_nodes, program_node.element_spans):
+        source = ' '.join(line.strip() for line in lines[pos_start.file_ln:pos_end.file_ln + 1] if line.strip())
+        print(f"Line {pos_start.file_ln + 1}: {source}")
+        result, error = evaluate(node)
+        print_output(result, error)
+
+
+def print_output(result, error):
+    # Prints the outcome of a statement in file mode. The values of a lazy loop are printed while it runs,
+    # in the same format as a list; an error stops the line where it happened and is printed below it.
+    if error:
+        print(f"Error: {error.as_string()}\n")
+    elif isinstance(result, LoopValues):
+        print('Output: [', end='')
+        try:
+            write_values(result)
+        except RuntimeFailure as e:
+            print(f"\nError: {e.error.as_string()}\n")
         else:
-            print(f"Output: {result}\n")
-
-
-def run_repl():
+            print(']\n')
+    else:
+        print(f"Output: {result}\n")
+
+
+def write_values(values, chunk_size=1024):
+    # Writes the values of an iterable like the inside of a list's repr, a chunk of values at a time
+    # The values before an error are still written
+    chunk = []
+    separator = ''
+    try:
+        for value in values:
+            chunk.append(repr(value))
+            if len(chunk) == chunk_size:
+                print(separator + ', '.join(chunk), end='')
+                chunk.clear()
+                separator = ', '
+    finally:
+        if chunk:
+            print(separator + ', '.join(chunk), end='')
+
+
+def run_repl(engine='tree', max_depth=DEFAULT_MAX_DEPTH, memo_size=0, optimize=False, loops='list',
+             vectorize=False, workers=0):
     print("Starting REPL... Type 'exit' to quit.")
     while True:
         try:
@@ -332,9 +1056,18 @@ def run_repl():
             if text.strip().lower() == 'exit':
                 print("\nExiting REPL...")
                 break
-            result, error = run('<stdin>', text)
+            result, error = run('<stdin>', text, engine=engine, max_depth=max_depth, memo_size=memo_size,
+                                optimize=optimize, loops=loops, vectorize=vectorize, workers=workers)
             if error:
                 print(error.as_string())
+            elif isinstance(result, LoopValues):
+                print('[', end='')
+                try:
+                    write_values(result)
+                except RuntimeFailure as e:
+                    print(f"\n{e.error.as_string()}")
+                else:
+                    print(']')
             else:
                 print(result)
         except KeyboardInterrupt:
@@ -1,3 +1,5 @@
+import re
+
 from tokens import *
 from general import *
 #######################################
@@ -190,3 +192,147 @@ class my_Lexer:
 
         return None  # This is not a valid operator
 
+
+
+#######################################
+# REGEX LEXER
+#######################################
+
+# The my_RegexLexer class is a table-driven replacement for my_Lexer.
+# A single compiled master pattern recognises the next token (after skipping blanks) in one regex call,
+# and @...@ spellings, parentheses and commas are resolved with dict lookups from tokens.py.
+# It produces the same token stream as my_Lexer, as compact my_CompactToken objects,
+# and the same IllegalCharError diagnostics.
+# iter_tokens() produces the tokens lazily so a parser can consume them without a full list.
+#
+# With program=True the lexer reads a whole file: newlines become T_NEWLINE statement separators,
+# except inside parentheses and unfinished @DEF@/@IF@/@FOR@ blocks, so a statement may span lines.
+# An illegal character becomes a T_ERROR token (carrying the error) and lexing resumes on the next line,
+# which lets every statement report its own errors. iter_tokens(start, end, every_line=True) lexes a part of
+# the file again with every line as a statement of its own, as line mode reads it (see compile_program).
+
+TOKEN_REGEX = re.compile(r"""
+    [ \t]*
+    (?:
+        (?P<INT>-?[0-9]+)
+      | (?P<IDENTIFIER>[a-zA-Z]+)
+      | (?P<AT>@[^@]*@?)
+      | (?P<SYMBOL>[(),])
+    )
+""", re.VERBOSE)
+
+PROGRAM_TOKEN_REGEX = re.compile(r"""
+    [ \t]*
+    (?:
+        (?P<INT>-?[0-9]+)
+      | (?P<IDENTIFIER>[a-zA-Z]+)
+      | (?P<AT>@[^@\n]*@?)
+      | (?P<SYMBOL>[(),])
+      | (?P<NEWLINE>\n)
+    )
+""", re.VERBOSE)
+
+BLANKS_REGEX = re.compile(r'[ \t]*')
+
+OPENING_TYPES = (T_LPAREN, T_DEF, T_IF, T_FOR)
+CLOSING_TYPES = (T_RPAREN, T_END)
+
+
+class my_RegexLexer:
+    def __init__(self, fn, text, program=False):
+        self.fn = fn
+        self.text = text
+        self.program = program
+        self.src = SourceFile(fn, text)
+        self.error = None
+
+    def position(self, idx):
+        return SourcePosition(idx, self.src)
+
+    def make_tokens(self):
+        tokens = list(self.iter_tokens())
+        if self.error:
+            return [], self.error
+        return tokens, None
+
+    def iter_tokens(self, start=0, end=None, every_line=False):
+        # Yields the tokens of text[start:end] one at a time. In line mode an illegal character is stored in
+        # self.error and ends the stream; in program mode it is yielded as a T_ERROR token instead.
+        text = self.text
+        src = self.src
+        program = self.program
+        match = (PROGRAM_TOKEN_REGEX if program else TOKEN_REGEX).match
+        end = len(text) if end is None else end
+        idx = start
+        depth = 0  # open parentheses and @DEF@/@IF@/@FOR@ blocks
+        statement_open = False  # a token was produced since the last T_NEWLINE
+        line_start = True  # no token was produced yet on this line
+
+        while idx < end:
+            m = match(text, idx, end)
+            error = None
+            if m is None:
+                idx = BLANKS_REGEX.match(text, idx, end).end()
+                if idx == end:
+                    break
+                error = IllegalCharError(self.position(idx), self.position(idx + 1), "'" + text[idx] + "'")
+            else:
+                kind = m.lastgroup
+                start = m.start(kind)
+                idx = m.end()
+
+                if kind == 'IDENTIFIER':
+                    yield my_CompactToken(T_IDENTIFIER, m.group(kind), start, src)
+                elif kind == 'INT':
+                    yield my_CompactToken(T_INT, int(m.group(kind)), start, src)
+                elif kind == 'SYMBOL':
+                    type_ = SYMBOLS[m.group(kind)]
+                    if type_ == T_LPAREN:
+                        depth += 1
+                    elif type_ == T_RPAREN and depth:
+                        depth -= 1
+                    yield my_CompactToken(type_, None, start, src)
+                elif kind == 'NEWLINE':
+                    if every_line:
+                        depth = 0
+                    if depth == 0 and statement_open:
+                        statement_open = False
+                        yield my_CompactToken(T_NEWLINE, None, start, src)
+                    line_start = True
+                    continue
+                else:
+                    spelling = AT_SPELLINGS.get(m.group(kind))
+                    if spelling is None:
+                        # my_Lexer reports the position just past the unknown span, or past the end of the line
+                        # when the span is never closed. In program mode the next line is another statement, so
+                        # the error stays at the end of its own line.
+                        closed = text[idx - 1] == '@' and idx - start > 1
+                        err_idx = idx if closed or idx < end or program else end + 1
+                        error = IllegalCharError(self.position(err_idx), self.position(err_idx + 1),
+                                                 "Invalid token starting with '@'")
+                    else:
+                        type_ = spelling[0]
+                        if type_ in OPENING_TYPES:
+                            if type_ == T_DEF and depth and line_start and program:
+                                # A line opening with @DEF@ starts a new statement, so an unclosed block above it
+                                # ends here
+                                depth = 0
+                                yield my_CompactToken(T_NEWLINE, None, start, src)
+                            depth += 1
+                        elif type_ in CLOSING_TYPES and depth:
+                            depth -= 1
+                        yield my_CompactToken(type_, spelling[1], start, src)
+
+            if error:
+                if not program:
+                    self.error = error
+                    return
+                yield my_CompactToken(T_ERROR, error, error.pos_start.idx, src)
+                # Resume on the next line with a fresh statement
+                idx = text.find('\n', idx)
+                if idx == -1:
+                    idx = end
+                depth = 0
+
+            statement_open = True
+            line_start = False
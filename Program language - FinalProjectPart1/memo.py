@@ -0,0 +1,129 @@
+from collections import OrderedDict
+
+from parser import *
+
+#######################################
+# MEMOIZATION
+#######################################
+
+# A @DEF@ function is pure when its body only uses its parameters, literals, operators, @IF@ and calls of
+# other functions by name, and every function it calls that way is pure too. The result of a pure function
+# depends on nothing but its arguments, so the Interpreter can keep the results of earlier calls in a Memo
+# and answer a repeated call from there.
+#
+# Which function a name calls is only known at run time and can change when a function is redefined, so the
+# purity of everything a function reaches is checked at call time against the bindings it was last checked
+# with. When one of them is rebound, the results are dropped and purity is checked again.
+
+DEFAULT_MEMO_SIZE = 1024
+
+MISSING = object()
+
+
+def pure_callees(body_node, arg_names):
+    # Returns the names of the functions the body calls when the body is pure on its own, otherwise None
+    callees = []
+    nodes = [body_node]
+
+    while nodes:
+        node = nodes.pop()
+        node_type = type(node)
+        if node_type is NumberNode or node_type is BooleanNode:
+            continue
+        if node_type is IdentifierNode:
+            if node.tok.value not in arg_names:
+                return None  # a global can be rebound by a @FOR@ or a @DEF@
+        elif node_type is BinOpNode:
+            nodes.append(node.left_node)
+            nodes.append(node.right_node)
+        elif node_type is UnaryOpNode:
+            nodes.append(node.node)
+        elif node_type is IfNode:
+            for condition, expr in node.cases:
+                nodes.append(condition)
+                nodes.append(expr)
+            if node.else_case:
+                nodes.append(node.else_case)
+        elif node_type is SharedNode or node_type is ScopeNode:
+            nodes.append(node.node)
+        elif node_type is FunctionCallNode:
+            if not isinstance(node.name_tok, IdentifierNode) or node.name_tok.tok.value in arg_names:
+                return None  # the callee is a value, not a function known by name
+            if node.name_tok.tok.value not in callees:
+                callees.append(node.name_tok.tok.value)
+            nodes.extend(node.arg_nodes)
+        else:
+            return None  # @FOR@, @DEF@, @LAMBDA@ and errors
+    return callees
+
+
+# A Memo holds the results of one pure function in least-recently-used order, up to size results, and counts
+# the calls it could (hits) and could not (misses) answer.
+class Memo:
+    def __init__(self, callees, size=DEFAULT_MEMO_SIZE):
+        self.callees = callees
+        self.size = size
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.pure = False
+        self.bindings = None  # (symbol_table, name, value) of every call reachable from the body
+
+    def lookup(self, function, args):
+        # The key of a call of function with args and the result the memo holds for it. The key is None when
+        # the call cannot be memoized, and the result is MISSING when the memo does not hold one.
+        # TRUE and 1 are equal in Python but not in @, so the types of the arguments are part of the key.
+        bindings = self.bindings
+        if bindings is None:
+            self.check(function)
+        else:
+            for table, name, value in bindings:
+                if table.get(name) is not value:
+                    self.check(function)
+                    break
+        if not self.pure:
+            return None, MISSING
+        key = (*args, *map(type, args))
+        try:
+            value = self.results.get(key, MISSING)
+        except TypeError:
+            return None, MISSING  # a list argument
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.results.move_to_end(key)
+        return key, value
+
+    def check(self, function):
+        # Finds every function reachable from function and whether all of them are pure
+        self.results.clear()
+        self.bindings = []
+        self.pure = True
+        seen = {id(function)}
+        functions = [function]
+
+        while functions:
+            caller = functions.pop()
+            for name in caller.memo.callees:
+                callee = caller.symbol_table.get(name)
+                self.bindings.append((caller.symbol_table, name, callee))
+                if getattr(callee, 'memo', None) is None:
+                    self.pure = False  # undefined, not a function, impure, or a function of another engine
+                elif id(callee) not in seen:
+                    seen.add(id(callee))
+                    functions.append(callee)
+
+    def store(self, key, value):
+        self.results[key] = value
+        if len(self.results) > self.size:
+            self.results.popitem(last=False)
+
+
+def memo_stats(symbol_table):
+    # {name: (hits, misses, cached results)} of the memoized functions defined in symbol_table
+    return {
+        name: (value.memo.hits, value.memo.misses, len(value.memo.results))
+        for name, value in symbol_table.symbols.items()
+        if getattr(value, 'memo', None) is not None
+    }
@@ -0,0 +1,364 @@
+import itertools
+import sys
+
+from parser import *
+from general import *
+from runtime import *
+
+#######################################
+# OPTIMIZER
+#######################################
+
+# The optimizer rewrites the AST between parsing and evaluation, for every engine (interpreter.py -O):
+#
+#   constant folding        a BinOpNode or UnaryOpNode whose operands are constants becomes a NumberNode or
+#                           BooleanNode holding its value, computed by the same binary_operation and
+#                           unary_operation the Interpreter uses
+#   dead-branch elimination an @IF@ / @ELSEIF@ arm with a constant condition is dropped when the condition is
+#                           false, and ends the @IF@ when it is true: the arm becomes the @ELSE@ and the arms
+#                           after it are dropped. An @IF@ whose first arm is always taken is replaced by it.
+#
+# Nothing that can fail is folded: a constant division by zero (or modulo by zero) stays in the tree, so it is
+# reported when the program runs, exactly as without -O. The rewritten nodes keep the positions of the nodes
+# they replace, so error messages do not change either.
+
+class Optimizer:
+    def optimize(self, node):
+        method_name = f'optimize_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_optimize_method)
+        return method(node)
+
+    def no_optimize_method(self, node):
+        raise Exception(f'No optimize_{type(node).__name__} method')
+
+    def optimize_NumberNode(self, node):
+        return node
+
+    optimize_BooleanNode = optimize_NumberNode
+    optimize_IdentifierNode = optimize_NumberNode
+    optimize_ErrorNode = optimize_NumberNode
+
+    def optimize_BinOpNode(self, node):
+        node.left_node = self.optimize(node.left_node)
+        node.right_node = self.optimize(node.right_node)
+        if not (is_constant(node.left_node) and is_constant(node.right_node)):
+            return node
+
+        left, right = node.left_node.tok.value, node.right_node.tok.value
+        if node.op_tok.type == T_DIV and right == 0:
+            return node  # the division by zero error is reported at run time
+        try:
+            value = binary_operation(node.op_tok.type, left, right)
+        except ArithmeticError:
+            return node
+        return constant_node(value, node)
+
+    def optimize_UnaryOpNode(self, node):
+        node.node = self.optimize(node.node)
+        if not is_constant(node.node):
+            return node
+        return constant_node(unary_operation(node.op_tok.type, node.node.tok.value), node)
+
+    def optimize_IfNode(self, node):
+        cases = []
+        else_case = None
+
+        for condition, expr in node.cases:
+            condition = self.optimize(condition)
+            expr = self.optimize(expr)
+            if not is_constant(condition):
+                cases.append((condition, expr))
+            elif condition.tok.value:
+                # Always taken: nothing after this arm can be reached
+                if not cases:
+                    return expr
+                else_case = expr
+                break
+        else:
+            if node.else_case:
+                else_case = self.optimize(node.else_case)
+            if not cases:
+                if else_case:
+                    return else_case
+                # Every condition is false and there is no @ELSE@: keep one arm so the @IF@ still gives nothing
+                cases.append((condition, expr))
+
+        return IfNode(cases, else_case)
+
+    def optimize_ForNode(self, node):
+        node.start_value_node = self.optimize(node.start_value_node)
+        node.end_value_node = self.optimize(node.end_value_node)
+        if node.step_value_node:
+            node.step_value_node = self.optimize(node.step_value_node)
+        node.body_node = self.optimize(node.body_node)
+        return node
+
+    def optimize_FunctionDefNode(self, node):
+        node.body_node = self.optimize_body(node.body_node)
+        return node
+
+    optimize_LambdaNode = optimize_FunctionDefNode
+
+    def optimize_body(self, body_node):
+        # A call with the wrong number of arguments reports the line the body starts on. When the optimized
+        # body starts on another line (an @IF@ whose first arms were dropped), a condition that is always
+        # true keeps it at the original line.
+        optimized = self.optimize(body_node)
+        if optimized.pos_start.ln == body_node.pos_start.ln:
+            return optimized
+        return IfNode([(constant_node(True, body_node), optimized)], None)
+
+    def optimize_FunctionCallNode(self, node):
+        if not isinstance(node.name_tok, IdentifierNode):
+            node.name_tok = self.optimize(node.name_tok)
+        node.arg_nodes = [self.optimize(arg_node) for arg_node in node.arg_nodes]
+        return node
+
+    def optimize_ListNode(self, node):
+        node.element_nodes = [self.optimize(element_node) for element_node in node.element_nodes]
+        return node
+
+
+def is_constant(node):
+    return type(node) is NumberNode or type(node) is BooleanNode
+
+
+def constant_node(value, node):
+    # A NumberNode or BooleanNode for value, at the position of the node it replaces
+    pos_start = node.pos_start
+    if type(value) is bool:
+        return BooleanNode(my_CompactToken(T_BOOLEAN, value, pos_start.idx, pos_start.src))
+    return NumberNode(my_CompactToken(T_INT, value, pos_start.idx, pos_start.src))
+
+
+#######################################
+# LOOP OPTIMIZER
+#######################################
+
+# After folding, the LoopOptimizer avoids evaluating the same pure expression more than once. A pure expression
+# is built from constants, names, operators and @IF@ only, so its value depends on nothing but the names in it.
+#
+#   loop-invariant code motion  in a @FOR@ body, a pure expression that uses none of the names which can change
+#                               while the loop runs (its variable, and every name a @FOR@ or @DEF@ inside it
+#                               binds) is computed once per run of the loop
+#   common subexpressions       a pure expression that occurs more than once in a region (a statement, a function
+#                               body, or one iteration of a loop body) and uses no name bound inside the region
+#                               is computed once per run of the region
+#
+# A shared expression becomes a SharedNode and the loop or region is wrapped in a ScopeNode that resets it.
+# The value is computed where the expression is first reached, not in front of the loop, so an expression
+# that fails fails at the same moment as without the optimizer, and one in an @IF@ branch that is never
+# taken is never computed. Function and lambda bodies run in frames of their own and are regions of their own.
+
+SHAREABLE = (BinOpNode, UnaryOpNode, IfNode)
+
+SLOTS = itertools.count()
+
+
+class LoopOptimizer:
+    def __init__(self):
+        self.expressions = {}  # node: (key, names) of a pure expression, or None
+
+    def optimize(self, node):
+        if isinstance(node, ListNode):
+            # The statements of a program are run one at a time, so each is a region
+            node.element_nodes = [self.region(element_node) for element_node in node.element_nodes]
+            return node
+        return self.region(node)
+
+    def region(self, root):
+        # Optimizes the loops and functions in the region below root, then shares its common subexpressions
+        root = self.nested(root)
+        bound = bound_names(root)
+        counts = {}
+
+        def count(node):
+            expression = self.expression(node)
+            if expression is not None and isinstance(node, SHAREABLE) and not expression[1] & bound:
+                counts[expression[0]] = counts.get(expression[0], 0) + 1
+            for child in region_children(node):
+                count(child)
+
+        slots = {}
+
+        def share(node):
+            expression = self.expression(node)
+            if expression is not None and isinstance(node, SHAREABLE) and counts.get(expression[0], 0) > 1:
+                slot = slots.get(expression[0])
+                if slot is None:
+                    slot = slots[expression[0]] = next(SLOTS)
+                return SharedNode(slot, node)
+            if type(node) is ForNode:
+                node.start_value_node = share(node.start_value_node)
+                node.end_value_node = share(node.end_value_node)
+                if node.step_value_node:
+                    node.step_value_node = share(node.step_value_node)
+            elif type(node) not in (SharedNode, ScopeNode, FunctionDefNode, LambdaNode):
+                map_children(node, share)
+            elif type(node) is ScopeNode:
+                node.node = share(node.node)
+            return node
+
+        count(root)
+        root = share(root)
+        return ScopeNode(tuple(slots.values()), root) if slots else root
+
+    def nested(self, node):
+        # Hoists the invariants out of every loop in the region, outermost first, and optimizes the regions below
+        if type(node) is ForNode:
+            node.start_value_node = self.nested(node.start_value_node)
+            node.end_value_node = self.nested(node.end_value_node)
+            if node.step_value_node:
+                node.step_value_node = self.nested(node.step_value_node)
+            scope = self.hoist(node)
+            node.body_node = self.region(node.body_node)
+            return scope
+        if type(node) in (FunctionDefNode, LambdaNode):
+            node.body_node = self.region(node.body_node)
+            return node
+        if type(node) is not SharedNode:
+            map_children(node, self.nested)
+        return node
+
+    def hoist(self, for_node):
+        bound = bound_names(for_node.body_node) | {for_node.var_name_tok.value}
+        slots = {}
+
+        def hoisted(node):
+            expression = self.expression(node)
+            if expression is not None and isinstance(node, SHAREABLE) and not expression[1] & bound:
+                slot = slots.get(expression[0])
+                if slot is None:
+                    slot = slots[expression[0]] = next(SLOTS)
+                return SharedNode(slot, node)
+            if type(node) not in (SharedNode, FunctionDefNode, LambdaNode):
+                map_children(node, hoisted)
+            return node
+
+        for_node.body_node = hoisted(for_node.body_node)
+        return ScopeNode(tuple(slots.values()), for_node) if slots else for_node
+
+    def expression(self, node):
+        # (key, names) when node is a pure expression: equal keys mean equal values for equal names
+        if node in self.expressions:
+            return self.expressions[node]
+
+        node_type = type(node)
+        if node_type is NumberNode or node_type is BooleanNode:
+            # TRUE and 1 are equal in Python but not in @
+            expression = (('constant', type(node.tok.value), node.tok.value), frozenset())
+        elif node_type is IdentifierNode:
+            expression = (('name', node.tok.value), frozenset((node.tok.value,)))
+        elif node_type is SharedNode:
+            expression = self.expression(node.node)
+        else:
+            if node_type is BinOpNode:
+                parts = [node.left_node, node.right_node]
+                kind = ('binary', node.op_tok.type)
+            elif node_type is UnaryOpNode:
+                parts = [node.node]
+                kind = ('unary', node.op_tok.type)
+            elif node_type is IfNode:
+                parts = [part for case in node.cases for part in case]
+                if node.else_case:
+                    parts.append(node.else_case)
+                kind = ('if', len(node.cases), node.else_case is not None)
+            else:
+                parts = None
+
+            expressions = [self.expression(part) for part in parts] if parts is not None else [None]
+            if None in expressions:
+                expression = None
+            else:
+                expression = (kind + tuple(key for key, _ in expressions),
+                              frozenset().union(*(names for _, names in expressions)))
+
+        self.expressions[node] = expression
+        return expression
+
+
+def map_children(node, function):
+    # Replaces every child of node that is evaluated in node's frame by function(child)
+    node_type = type(node)
+    if node_type is BinOpNode:
+        node.left_node = function(node.left_node)
+        node.right_node = function(node.right_node)
+    elif node_type is UnaryOpNode:
+        node.node = function(node.node)
+    elif node_type is IfNode:
+        node.cases = [(function(condition), function(expr)) for condition, expr in node.cases]
+        if node.else_case:
+            node.else_case = function(node.else_case)
+    elif node_type is ForNode:
+        node.start_value_node = function(node.start_value_node)
+        node.end_value_node = function(node.end_value_node)
+        if node.step_value_node:
+            node.step_value_node = function(node.step_value_node)
+        node.body_node = function(node.body_node)
+    elif node_type is FunctionCallNode:
+        if not isinstance(node.name_tok, IdentifierNode):
+            node.name_tok = function(node.name_tok)
+        node.arg_nodes = [function(arg_node) for arg_node in node.arg_nodes]
+    elif node_type is ListNode:
+        node.element_nodes = [function(element_node) for element_node in node.element_nodes]
+    elif node_type is SharedNode or node_type is ScopeNode:
+        node.node = function(node.node)
+
+
+def region_children(node):
+    # The children of node that belong to the same region: not loop bodies, function bodies or shared values
+    node_type = type(node)
+    if node_type is ForNode:
+        return [child for child in (node.start_value_node, node.end_value_node, node.step_value_node) if child]
+    if node_type is ScopeNode:
+        return [node.node]
+    if node_type in (SharedNode, FunctionDefNode, LambdaNode):
+        return []
+    children = []
+    map_children(node, lambda child: children.append(child) or child)
+    return children
+
+
+def bound_names(node):
+    # The names that @FOR@ and @DEF@ bind in node's frame while node is evaluated
+    names = set()
+    nodes = [node]
+    while nodes:
+        node = nodes.pop()
+        if type(node) is ForNode:
+            names.add(node.var_name_tok.value)
+        elif type(node) is FunctionDefNode:
+            names.add(node.name_tok.value)
+        if type(node) not in (FunctionDefNode, LambdaNode):
+            map_children(node, lambda child: nodes.append(child) or child)
+    return names
+
+
+def nesting_depth(node, limit):
+    # How deeply the nodes below node nest, function bodies included, counted without recursion; stops at limit
+    depth = 0
+    level = [node]
+    while level and depth < limit:
+        depth += 1
+        children = []
+        for node in level:
+            if type(node) is FunctionDefNode or type(node) is LambdaNode:
+                children.append(node.body_node)
+            else:
+                map_children(node, lambda child: children.append(child) or child)
+        level = children
+    return depth
+
+
+def optimize_node(node):
+    # Optimizes node in place where it can and returns the node to evaluate instead of it. The passes recurse
+    # over the tree, so a statement that nests deeper than they can follow (the iterative parser builds those)
+    # is left as written; it runs the same, and evaluating it reports the depth as usual.
+    if isinstance(node, ListNode):
+        # Both passes take the statements of a program one at a time anyway
+        node.element_nodes = [optimize_node(element_node) for element_node in node.element_nodes]
+        return node
+    limit = sys.getrecursionlimit() // 4
+    if nesting_depth(node, limit) >= limit:
+        return node
+    return LoopOptimizer().optimize(Optimizer().optimize(node))
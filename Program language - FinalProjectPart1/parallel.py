@@ -0,0 +1,213 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count
+import atexit
+import gc
+import pickle
+
+from parser import *
+from runtime import *
+
+#######################################
+# PARALLEL LOOPS
+#######################################
+
+# The iterations of a @FOR@ loop are independent when its body is pure: it only reads the loop variable and
+# names that the loop cannot change, and only calls functions that are pure in the same way. With --workers N
+# the Interpreter hands such a loop to parallel_loop(), which splits the range into chunks and evaluates them in
+# N worker processes, then puts the values back together in order.
+#
+# A body is pure when it only holds numbers, booleans, names, operators, @IF@ and calls of functions by name.
+# The names it reads must be bound to numbers, booleans, strings or lists of them, which are copied to the
+# workers; a name bound to a function may only be called. Every function reachable through calls must be a
+# @DEF@ of the global frame whose body is pure, with its parameters as the only other names. @DEF@, @FOR@ and
+# @LAMBDA@ bind names or make functions, so a body with any of them runs serially.
+#
+# The worker processes are started by the first parallel loop and serve every loop after it, until the program
+# exits. The body, the functions and the values a loop reads (a LoopPlan) are pickled once per loop and sent
+# along with every chunk; a worker only builds its tables again when a chunk belongs to another loop than the
+# one before. A worker that hits an error in its chunk stops and reports the value of the loop variable where it
+# happened; the Interpreter then runs the loop serially from that iteration on, so the error is reported exactly
+# as it would have been without workers, and iterations after it are not evaluated in the parent.
+
+PARALLEL_MIN_LENGTH = 64  # shorter loops are not worth sending to other processes
+CHUNKS_PER_WORKER = 4     # more chunks than workers, so that a slow chunk does not keep the others waiting
+
+pools = {}          # {workers: the ProcessPoolExecutor with that many processes}
+plan_ids = count()  # tells the workers which loop a chunk belongs to
+
+
+class NotParallel(Exception):
+    pass
+
+
+# What a worker needs to evaluate the body: the classes of the engine, the body, and the names it can reach.
+# Functions are sent as (name, arg_names, body_node) and made again in the worker.
+class LoopPlan:
+    def __init__(self, interpreter_class, function_class, var_name, body_node, in_global_frame):
+        self.interpreter_class = interpreter_class
+        self.function_class = function_class
+        self.var_name = var_name
+        self.body_node = body_node
+        self.in_global_frame = in_global_frame  # the loop variable is a global, which functions can read too
+        self.global_values = {}     # names read by function bodies, bound in the global frame
+        self.global_functions = {}  # functions called by function bodies
+        self.loop_values = {}       # names read by the loop body, bound where the loop runs
+        self.loop_functions = {}    # functions called by the loop body
+
+
+def parallel_loop(interpreter, function_class, var_name, body_node, start_value, end_value, step_value, workers):
+    # Runs the loop in worker processes and returns (values, next_value): the values of the iterations that ran
+    # and the value of the loop variable to go on from, which is past the end unless an iteration failed.
+    # Returns None without running anything when the loop has to run serially.
+    if not (type(start_value) is int and type(end_value) is int and type(step_value) is int) or step_value <= 0:
+        return None
+    values = range(start_value, end_value, step_value)
+    if len(values) < PARALLEL_MIN_LENGTH:
+        return None
+
+    plan = LoopPlan(type(interpreter), function_class, var_name, body_node, interpreter.symbol_table.parent is None)
+    try:
+        collect(plan, body_node, {var_name}, interpreter.symbol_table, plan.loop_values, plan.loop_functions)
+    except NotParallel:
+        return None
+
+    chunk_count = min(len(values), workers * CHUNKS_PER_WORKER)
+    chunk_size = -(-len(values) // chunk_count)
+    chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+
+    results = []
+    next_value = values[-1] + step_value
+    plan_id, plan_data = next(plan_ids), pickle.dumps(plan)
+    futures = [get_pool(workers).submit(run_chunk, plan_id, plan_data, chunk) for chunk in chunks]
+    try:
+        for future in futures:
+            chunk_values, failed_value = future.result()
+            results.extend(chunk_values)
+            if failed_value is not None:
+                next_value = failed_value
+                break
+    finally:
+        # The chunks after a failed one are not needed; those already running finish in the background
+        for future in futures:
+            future.cancel()
+
+    if next_value > values[-1]:
+        interpreter.symbol_table.set(var_name, values[-1])
+    return results, next_value
+
+
+def get_pool(workers):
+    pool = pools.get(workers)
+    if pool is None:
+        pool = pools[workers] = ProcessPoolExecutor(max_workers=workers)
+        atexit.register(pool.shutdown, cancel_futures=True)
+    return pool
+
+
+def collect(plan, node, params, symbol_table, values, functions):
+    # Checks that node is pure and adds the names it reads and the functions it calls to the plan.
+    # params are the names bound by the body itself; the others are looked up in symbol_table.
+    nodes = [node]
+
+    while nodes:
+        node = nodes.pop()
+        node_type = type(node)
+        if node_type is NumberNode or node_type is BooleanNode:
+            continue
+        if node_type is IdentifierNode:
+            var_name = node.tok.value
+            if var_name == plan.var_name and plan.in_global_frame:
+                continue  # set by the worker for every iteration
+            if var_name not in params:
+                value = symbol_table.get(var_name)
+                if value is not None:  # an undefined name is reported by the serial run
+                    if not is_plain(value):
+                        raise NotParallel()  # a function used as a value
+                    values[var_name] = value
+        elif node_type is BinOpNode:
+            nodes.append(node.left_node)
+            nodes.append(node.right_node)
+        elif node_type is UnaryOpNode or node_type is SharedNode or node_type is ScopeNode:
+            nodes.append(node.node)
+        elif node_type is IfNode:
+            for condition, expr in node.cases:
+                nodes.append(condition)
+                nodes.append(expr)
+            if node.else_case:
+                nodes.append(node.else_case)
+        elif node_type is ListNode:
+            nodes.extend(node.element_nodes)
+        elif node_type is FunctionCallNode:
+            if not isinstance(node.name_tok, IdentifierNode) or node.name_tok.tok.value in params:
+                raise NotParallel()  # the callee is a value, not a function known by name
+            collect_function(plan, node.name_tok.tok.value, symbol_table, functions)
+            nodes.extend(node.arg_nodes)
+        else:
+            raise NotParallel()  # @FOR@, @DEF@, @LAMBDA@ and errors
+
+
+def collect_function(plan, func_name, symbol_table, functions):
+    function = symbol_table.get(func_name)
+    if function is None or func_name in functions:
+        return
+    if type(function) is not plan.function_class or function.symbol_table.parent is not None:
+        raise NotParallel()  # a function of another engine, or one defined inside a call
+    functions[func_name] = (function.name, function.arg_names, function.body_node)
+    collect(plan, function.body_node, set(function.arg_names), function.symbol_table,
+            plan.global_values, plan.global_functions)
+
+
+def is_plain(value):
+    # A value that is copied to the workers as it is
+    if type(value) is list:
+        return all(is_plain(element) for element in value)
+    return type(value) in (int, bool, str)
+
+
+#######################################
+# WORKERS
+#######################################
+
+worker_state = None  # (plan_id, interpreter, plan) of the last loop a worker process ran a chunk of
+
+
+def start_plan(plan_id, plan):
+    global worker_state
+    global_table = SymbolTable()
+    loop_table = global_table if plan.in_global_frame else SymbolTable(global_table)
+    interpreter = plan.interpreter_class(loop_table)
+
+    for table, values, functions in ((global_table, plan.global_values, plan.global_functions),
+                                     (loop_table, plan.loop_values, plan.loop_functions)):
+        for var_name, value in values.items():
+            table.set(var_name, value)
+        for var_name, (func_name, arg_names, body_node) in functions.items():
+            table.set(var_name, plan.function_class(func_name, body_node, arg_names, interpreter.context,
+                                                    global_table))
+    # The previous plan is garbage now. What the worker inherited and the new plan live until the next loop;
+    # keep the cycle collector off them.
+    worker_state = plan_id, interpreter, plan
+    gc.unfreeze()
+    gc.collect()
+    gc.freeze()
+
+
+def run_chunk(plan_id, plan_data, values):
+    # The values of the iterations of one chunk, and the loop variable's value at the first one that failed
+    if worker_state is None or worker_state[0] != plan_id:
+        start_plan(plan_id, pickle.loads(plan_data))
+    _, interpreter, plan = worker_state
+    symbols = interpreter.symbol_table.symbols
+    results = []
+
+    for i in values:
+        symbols[plan.var_name] = i
+        try:
+            result = interpreter.visit(plan.body_node)
+        except Exception:
+            return results, i  # the serial run raises it again
+        if result.error:
+            return results, i
+        results.append(result.value)
+
+    return results, None
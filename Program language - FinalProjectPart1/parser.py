@@ -6,28 +6,49 @@ from general import *
 # NODES
 ##############################################
 
+# Every node class declares __slots__, so a node is a fixed-size record instead of an object with its own dict.
+# Leaf nodes keep only their token and derive their positions from it when an error message needs them.
+# For a flat, array-backed form of a whole tree see flatast.py.
 
 class NumberNode:
+    __slots__ = ('tok',)
+
     def __init__(self, tok):
         self.tok = tok
-        self.pos_start = self.tok.pos_start
-        self.pos_end = self.tok.pos_end
+
+    @property
+    def pos_start(self):
+        return self.tok.pos_start
+
+    @property
+    def pos_end(self):
+        return self.tok.pos_end
 
     def __repr__(self):
         return f'{self.tok}'
 
 
 class BooleanNode:
+    __slots__ = ('tok',)
+
     def __init__(self, tok):
         self.tok = tok
-        self.pos_start = self.tok.pos_start
-        self.pos_end = self.tok.pos_end
+
+    @property
+    def pos_start(self):
+        return self.tok.pos_start
+
+    @property
+    def pos_end(self):
+        return self.tok.pos_end
 
     def __repr__(self):
         return f'{self.tok}'
 
 
 class BinOpNode:
+    __slots__ = ('left_node', 'op_tok', 'right_node', 'pos_start', 'pos_end')
+
     def __init__(self, left_node, op_tok, right_node):
         self.left_node = left_node
         self.op_tok = op_tok
@@ -40,6 +61,8 @@ class BinOpNode:
 
 
 class UnaryOpNode:
+    __slots__ = ('op_tok', 'node', 'pos_start', 'pos_end')
+
     def __init__(self, op_tok, node):
         self.op_tok = op_tok
         self.node = node
@@ -51,6 +74,8 @@ class UnaryOpNode:
 
 
 class IfNode:
+    __slots__ = ('cases', 'else_case', 'pos_start', 'pos_end')
+
     def __init__(self, cases, else_case):
         self.cases = cases  # (condition, expr)
         self.else_case = else_case
@@ -68,6 +93,8 @@ class IfNode:
 
 
 class ForNode:
+    __slots__ = ('var_name_tok', 'start_value_node', 'end_value_node', 'step_value_node', 'body_node', 'pos_start', 'pos_end')
+
     def __init__(self, var_name_tok, start_value_node, end_value_node, step_value_node, body_node):
         self.var_name_tok = var_name_tok
         self.start_value_node = start_value_node
@@ -86,10 +113,13 @@ class ForNode:
 
 
 class FunctionDefNode:
+    __slots__ = ('name_tok', 'arg_name_toks', 'body_node', 'pos_start', 'pos_end', 'code')
+
     def __init__(self, name_tok, arg_name_toks, body_node):
         self.name_tok = name_tok
         self.arg_name_toks = arg_name_toks
         self.body_node = body_node
+        self.code = None  # the body's CodeObject, once the bytecode compiler has compiled it (see bytecode.py)
         self.pos_start = self.name_tok.pos_start
         self.pos_end = self.body_node.pos_end
 
@@ -98,9 +128,12 @@ class FunctionDefNode:
 
 
 class FunctionCallNode:
+    __slots__ = ('name_tok', 'arg_nodes', 'pos_start', 'pos_end', 'site')
+
     def __init__(self, name_tok, arg_nodes):
         self.name_tok = name_tok
         self.arg_nodes = arg_nodes
+        self.site = None  # the call's inline cache, once mark_call_sites has given it one (see callsites.py)
         self.pos_start = self.name_tok.pos_start
         self.pos_end = (self.arg_nodes[-1].pos_end if self.arg_nodes else self.name_tok.pos_end)
 
@@ -109,93 +142,156 @@ class FunctionCallNode:
 
 
 class ListNode:
-    def __init__(self, element_nodes, pos_start, pos_end):
+    __slots__ = ('element_nodes', 'pos_start', 'pos_end', 'element_spans')
+
+    def __init__(self, element_nodes, pos_start, pos_end, element_spans=None):
         self.element_nodes = element_nodes
         self.pos_start = pos_start
         self.pos_end = pos_end
+        self.element_spans = element_spans  # (first token start, last token start) of each statement
 
     def __repr__(self):
         return f'[{", ".join(str(element) for element in self.element_nodes)}]'
 
 
+class ErrorNode:
+    # Stands in for a statement that failed to lex or parse; evaluating it reports the error
+    __slots__ = ('error', 'pos_start', 'pos_end')
+
+    def __init__(self, error):
+        self.error = error
+        self.pos_start = error.pos_start
+        self.pos_end = error.pos_end
+
+    def __repr__(self):
+        return f'<error: {self.error.error_name}>'
+
+
 class IdentifierNode:
+    __slots__ = ('tok',)
+
     def __init__(self, tok):
         self.tok = tok
-        self.pos_start = self.tok.pos_start
-        self.pos_end = self.tok.pos_end
+
+    @property
+    def pos_start(self):
+        return self.tok.pos_start
+
+    @property
+    def pos_end(self):
+        return self.tok.pos_end
 
     def __repr__(self):
         return f'{self.tok}'
 
 
 class LambdaNode:
+    __slots__ = ('arg_name_toks', 'body_node', 'pos_start', 'pos_end', 'code', 'function', 'closed')
+
     def __init__(self, arg_name_toks, body_node):
         self.arg_name_toks = arg_name_toks
         self.body_node = body_node
+        self.code = None  # as for FunctionDefNode
+        self.function = None  # the Function the Interpreter made for the lambda, once (see Interpreter.lambda_function)
+        self.closed = False   # the body reads no names but parameters, so that Function is the lambda's value
         self.pos_start = self.arg_name_toks[0].pos_start if self.arg_name_toks else self.body_node.pos_start
         self.pos_end = self.body_node.pos_end
 
     def __repr__(self):
         return f'@LAMBDA@({", ".join(str(arg) for arg in self.arg_name_toks)}) @:@ {self.body_node}'
 
-    def apply(self, args, interpreter):
-        if len(args) != len(self.arg_name_toks):
-            raise ValueError(f"Expected {len(self.arg_name_toks)} arguments, got {len(args)}")
 
-        # Create a new symbol table for the lambda execution
-        new_symbol_table = interpreter.global_symbol_table.copy()
+# The parser never builds the two nodes below; optimizer.py puts them into @FOR@ loops and expressions.
+# A SharedNode stands for a pure expression whose value is reused: the first evaluation keeps it in the
+# current frame under the integer slot, which can never clash with a name, and the next ones read it back.
+# Several SharedNodes with the same slot share one value.
+class SharedNode:
+    __slots__ = ('slot', 'node')
 
-        # Bind arguments to parameter names
-        for i, arg_name in enumerate(self.arg_name_toks):
-            new_symbol_table[arg_name.value] = args[i]
+    def __init__(self, slot, node):
+        self.slot = slot
+        self.node = node
 
-        # Execute the body with the new symbol table
-        old_symbol_table = interpreter.global_symbol_table
-        interpreter.global_symbol_table = new_symbol_table
-        result = interpreter.visit(self.body_node)
-        interpreter.global_symbol_table = old_symbol_table
-        return result
+    @property
+    def pos_start(self):
+        return self.node.pos_start
+
+    @property
+    def pos_end(self):
+        return self.node.pos_end
+
+    def __repr__(self):
+        return f'${self.slot}{{{self.node}}}'
+
+
+# A ScopeNode forgets the values of its slots and then evaluates node. It marks where shared values stop being
+# valid: before every run of a loop they were hoisted out of, or every iteration for values shared in its body.
+class ScopeNode:
+    __slots__ = ('slots', 'node')
+
+    def __init__(self, slots, node):
+        self.slots = slots
+        self.node = node
+
+    @property
+    def pos_start(self):
+        return self.node.pos_start
+
+    @property
+    def pos_end(self):
+        return self.node.pos_end
+
+    def __repr__(self):
+        return f'{self.node}'
+
+
+##############################################
+# OPERATORS
+##############################################
+
+# Binding power of every binary operator, from loosest to tightest. All of them are left associative.
+# Unary '+', '-' and '@NOT@' bind tighter than any binary operator.
+BINARY_PRECEDENCE = {
+    T_OR: 1,
+    T_AND: 2,
+    T_EQEQ: 3, T_NEQ: 3, T_LESSTHAN: 3, T_GREATERTHAN: 3, T_EQLESSTHAN: 3, T_EQGREATERTHAN: 3,
+    T_PLUS: 4, T_SUB: 4,
+    T_MUL: 5, T_DIV: 5, T_MODULO: 5,
+}
+
+UNARY_OPERATORS = (T_PLUS, T_SUB, T_NOT)
+
+ARITHMETIC_OPERATORS = (T_PLUS, T_SUB, T_MUL, T_DIV, T_MODULO)
 
 
 ##############################################
 # PARSE RESULT
 ##############################################
 
-# The ParseResult class is used to track the progress and results of parsing operations.
-# It handles the management of parsed nodes, error tracking, and token advancement counting.
-# This class helps in error recovery and backtracking during the parsing process.
+# The ParseResult class is what parse() and statements() hand back to the caller: either a node or an error.
+# Inside the parser the productions return nodes directly and report failures by raising ParseError,
+# so the common, successful path does no per-production bookkeeping.
 class ParseResult:
     def __init__(self):
         self.error = None
         self.node = None
-        self.advance_count = 0
-        self.to_reverse_count = 0
-
-    def register_advancement(self):
-        self.advance_count += 1
-
-    def register(self, res):
-        self.advance_count += res.advance_count
-        if res.error:
-            self.error = res.error
-        return res.node
-
-    def try_register(self, res):
-        if res.error:
-            self.to_reverse_count = res.advance_count
-            return None
-        return self.register(res)
 
     def success(self, node):
         self.node = node
         return self
 
     def failure(self, error):
-        if not self.error or self.advance_count == 0:
-            self.error = error
+        self.error = error
         return self
 
 
+# ParseError carries the InvalidSyntaxError (or IllegalCharError) of a failed production up to parse().
+class ParseError(Exception):
+    def __init__(self, error):
+        super().__init__(error.details)
+        self.error = error
+
+
 ##############################################
 # PARSER
 ##############################################
@@ -204,791 +300,776 @@ class ParseResult:
 # and constructing an Abstract Syntax Tree (AST) that represents the structure of the program.
 # It implements various parsing methods for different language constructs such as expressions,
 # statements, function definitions, and control structures (if, for, etc.).
-# The parser uses recursive descent parsing techniques and handles error detection and reporting.
+# The parser uses recursive descent parsing techniques and handles error detection and reporting;
+# a syntax error raises ParseError, which parse() and statements() turn back into an error result.
+#
+# The grammar is written once, as generator productions: where a production needs a sub-production it yields
+# that sub-production's generator, and gets the node it parsed sent back. run() drives them. Parser's run()
+# simply recurses, one Python frame per level of nesting; IterativeParser's run() keeps the productions on an
+# explicit stack instead. A production that only picks another one (expr, expression, operand) returns the
+# chosen production's generator without being a generator itself, so it costs nothing at run time.
 
 class Parser:
     def __init__(self, tokens):
-        self.tokens = tokens
-        self.token_idx = -1
+        # tokens may be a list or a lazy iterator (see my_RegexLexer.iter_tokens);
+        # they are pulled one at a time, as the grammar never needs to look past the current token
+        self.token_stream = iter(tokens)
+        self.last_token = None
         self.current_token = None
+        # In program mode a T_NEWLINE reads as the end of input until next_statement() is called
+        self.held_newline = None
         self.advance()
 
     def advance(self):
-        self.token_idx += 1
-        self.update_current_token()
-        return self.current_token
-
-    def update_current_token(self):
-        if self.token_idx >= 0 and self.token_idx < len(self.tokens):
-            self.current_token = self.tokens[self.token_idx]
-        else:
+        if self.current_token is not None:
+            self.last_token = self.current_token
+        if self.held_newline is not None:
             self.current_token = None
+            return None
+        tok = next(self.token_stream, None)
+        if tok is not None and tok.type == T_NEWLINE:
+            self.held_newline = tok
+            tok = None
+        self.current_token = tok
+        return tok
+
+    def end_pos(self):
+        # Position reported for "Unexpected end of input": the end of the last token read
+        if self.last_token is None:
+            return Position(0, 0, 0, '<unknown>', '')
+        return self.last_token.pos_end
+
+    def run(self, production):
+        # Recursive driver: every sub-production a production yields is run to completion by a nested call
+        run = self.run
+        send = production.send
+        try:
+            sub_production = send(None)
+            while True:
+                sub_production = send(run(sub_production))
+        except StopIteration as done:
+            return done.value
 
     def parse(self):
+        # Entry point for a single line. The productions below raise ParseError on failure;
+        # the error is turned back into a ParseResult only here.
         res = ParseResult()
-        if not self.tokens:
-            return res.failure(InvalidSyntaxError(
+        try:
+            return res.success(self.parse_line())
+        except ParseError as e:
+            return res.failure(e.error)
+
+    def parse_line(self):
+        if self.current_token is None:
+            raise ParseError(InvalidSyntaxError(
                 Position(0, 0, 0, '<unknown>', ''),
                 Position(0, 0, 0, '<unknown>', ''),
                 "No tokens to parse"
             ))
 
         if self.current_token.matches(T_DEF):
-            return self.func_def()
+            return self.run(self.func_def())
 
-        expr = res.register(self.expr())
-        if res.error: return res
+        expr = self.run(self.expr())
         if self.current_token is not None:
-            return res.failure(InvalidSyntaxError(
+            raise ParseError(InvalidSyntaxError(
                 self.current_token.pos_start, self.current_token.pos_end,
                 "Expected '+', '-', '*', '/', '%', '==', '!=', '<', '>', '<=', '>=', 'AND' or 'OR'"
             ))
-        return res.success(expr)
+        return expr
 
     def expr(self):
-        res = ParseResult()
-
-        if self.current_token.type == T_LAMBDA:
-            lambda_node = res.register(self.lambda_expr())
-            if res.error: return res
-            return res.success(lambda_node)
+        if self.current_token is not None and self.current_token.type == T_LAMBDA:
+            return self.lambda_expr()
 
         return self.expression()
 
     def statements(self):
+        # Program mode: parses T_NEWLINE separated statements into one ListNode.
+        # A statement that fails to parse becomes an ErrorNode so that the statements after it still run.
         res = ParseResult()
         statements = []
-        pos_start = self.current_token.pos_start.copy()
+        spans = []
+        pos_start = self.current_token.pos_start if self.current_token else self.end_pos()
 
-        while self.current_token != None:
-            statement = res.register(self.statement())
-            if res.error: return res
-            statements.append(statement)
+        while self.current_token is not None:
+            first_tok = self.current_token
+            try:
+                statements.append(self.statement())
+            except ParseError as e:
+                statements.append(ErrorNode(self.skip_statement(e.error)))
+            spans.append((first_tok.pos_start, self.last_token.pos_start))
+            self.next_statement()
 
-        return res.success(ListNode(
-            statements,
-            pos_start,
-            self.current_token.pos_end.copy()
-        ))
+        return res.success(ListNode(statements, pos_start, self.end_pos(), spans))
 
     def statement(self):
-        res = ParseResult()
-        pos_start = self.current_token.pos_start.copy()
-
+        # A single statement, parsed exactly like parse() parses a line
         if self.current_token.type == T_DEF:
-            func_def = res.register(self.func_def())
-            if res.error: return res
-            return res.success(func_def)
+            node = self.run(self.func_def())
+        else:
+            node = self.run(self.expr())
 
-        expr = res.register(self.expr())
-        if res.error:
-            return res.failure(IllegalCharError(
-                pos_start, self.current_token.pos_end,
-                "Expected 'DEF', 'IF', 'FOR', 'INT', 'IDENTIFIER', '+', '-', '('"
+        if self.current_token is not None:
+            raise ParseError(InvalidSyntaxError(
+                self.current_token.pos_start, self.current_token.pos_end,
+                "Expected '+', '-', '*', '/', '%', '==', '!=', '<', '>', '<=', '>=', 'AND' or 'OR'"
             ))
-        return res.success(expr)
-
-    def expression(self):
-        res = ParseResult()
-        if self.current_token.type == T_IF:
-            return self.if_expr()
-        elif self.current_token.type == T_FOR:
-            return self.for_expr()
-
-        left = res.register(self.comparison())
-        if res.error: return res
-
-        while self.current_token != None and self.current_token.type in (T_AND, T_OR):
-            op_tok = self.current_token
-            res.register_advancement()
+        return node
+
+    def skip_statement(self, error):
+        # Drops the rest of a failed statement. As in line mode, an illegal character
+        # anywhere in the statement is reported instead of the syntax error.
+        lex_error = None
+        while self.current_token is not None:
+            if self.current_token.type == T_ERROR and lex_error is None:
+                lex_error = self.current_token.value
             self.advance()
-            right = res.register(self.comparison())
-            if res.error: return res
-            left = BinOpNode(left, op_tok, right)
-
-        return res.success(left)
+        return lex_error or error
 
-    def comparison(self):
-        res = ParseResult()
-
-        left = res.register(self.term())
-        if res.error: return res
+    def next_statement(self):
+        # Moves past the T_NEWLINE that ended the current statement
+        self.held_newline = None
+        self.advance()
 
-        while self.current_token != None and self.current_token.type in (
-                T_EQEQ, T_NEQ, T_GREATERTHAN, T_LESSTHAN, T_EQGREATERTHAN, T_EQLESSTHAN):
-            op_tok = self.current_token
-            self.advance()
-            right = res.register(self.term())
-            if res.error: return res
-            left = BinOpNode(left, op_tok, right)
+    def expression(self):
+        tok = self.current_token
+        if tok is not None:
+            if tok.type == T_IF:
+                return self.if_expr()
+            if tok.type == T_FOR:
+                return self.for_expr()
 
-        return res.success(left)
+        return self.binary_expression()
 
-    def term(self):
-        res = ParseResult()
+    def binary_expression(self, min_precedence=1):
+        # Precedence climbing over BINARY_PRECEDENCE
+        return self.climb(None, min_precedence)
 
-        left = res.register(self.factor())
-        if res.error: return res
+    def operand(self):
+        tok = self.current_token
+        if tok is not None and tok.type in UNARY_OPERATORS:
+            return self.factor()
+        return self.primary()
 
-        while self.current_token != None and self.current_token.type in (T_MUL, T_DIV, T_MODULO, T_PLUS, T_SUB):
-            op_tok = self.current_token
-            res.register_advancement()
+    def leaf(self):
+        # The most common operands, an INT or an IDENTIFIER, read without running a sub-production; climb()
+        # calls an IDENTIFIER that '(' follows. Returns None, having read nothing, for any other operand.
+        tok = self.current_token
+        if tok is not None:
+            if tok.type == T_INT:
+                self.advance()
+                return NumberNode(tok)
+            if tok.type == T_IDENTIFIER:
+                self.advance()
+                return IdentifierNode(tok)
+        return None
+
+    def climb(self, left, min_precedence):
+        # Folds operators of equal precedence left to right in this loop; the right operand only
+        # recurses while the operator after it binds tighter than the current one.
+        # Without a left operand, the first operand is parsed here too.
+        if left is None:
+            left = self.leaf()
+            if left is None:
+                left = yield self.operand()
+            elif (type(left) is IdentifierNode and self.current_token is not None
+                  and self.current_token.type == T_LPAREN):
+                left = yield self.function_call(left)
+
+        op_tok = self.current_token
+        while op_tok is not None:
+            precedence = BINARY_PRECEDENCE.get(op_tok.type)
+            if precedence is None or precedence < min_precedence:
+                break
             self.advance()
 
-            if self.current_token is None:
-                return res.failure(InvalidSyntaxError(
+            tok = self.current_token
+            if tok is None and op_tok.type in ARITHMETIC_OPERATORS:
+                raise ParseError(InvalidSyntaxError(
                     op_tok.pos_start, op_tok.pos_end,
                     "Expected expression after operator"
                 ))
 
-            right = res.register(self.factor())
-            if res.error: return res
+            right = self.leaf()
+            if right is None:
+                right = yield self.operand()
+            elif (type(right) is IdentifierNode and self.current_token is not None
+                  and self.current_token.type == T_LPAREN):
+                right = yield self.function_call(right)
+
+            next_tok = self.current_token
+            while next_tok is not None and BINARY_PRECEDENCE.get(next_tok.type, 0) > precedence:
+                right = yield self.climb(right, precedence + 1)
+                next_tok = self.current_token
+
             left = BinOpNode(left, op_tok, right)
+            op_tok = next_tok
 
-        return res.success(left)
+        return left
 
     def factor(self):
-        res = ParseResult()
         tok = self.current_token
 
         if tok is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end if self.tokens else Position(0, 0, 0, '<unknown>', ''),
-                self.tokens[-1].pos_end if self.tokens else Position(0, 0, 0, '<unknown>', ''),
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input"
             ))
 
         if tok.type in (T_PLUS, T_SUB, T_NOT):
-            res.register_advancement()
             self.advance()
-            factor = res.register(self.factor())
-            if res.error:
-                return res
-            return res.success(UnaryOpNode(tok, factor))
+            factor = yield self.factor()
+            return UnaryOpNode(tok, factor)
 
-        return self.primary()
+        return (yield self.primary())
 
     def primary(self):
-        res = ParseResult()
         tok = self.current_token
 
         if tok is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end if self.tokens else Position(0, 0, 0, '<unknown>', ''),
-                self.tokens[-1].pos_end if self.tokens else Position(0, 0, 0, '<unknown>', ''),
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input"
             ))
 
         if tok.type in (T_INT, T_BOOLEAN):
-            res.register_advancement()
             self.advance()
-            return res.success(NumberNode(tok) if tok.type == T_INT else BooleanNode(tok))
+            return NumberNode(tok) if tok.type == T_INT else BooleanNode(tok)
 
         elif tok.type == T_IDENTIFIER:
-            res.register_advancement()
             self.advance()
             if self.current_token and self.current_token.type == T_LPAREN:
-                return self.function_call(IdentifierNode(tok))
-            return res.success(IdentifierNode(tok))
+                return (yield self.function_call(IdentifierNode(tok)))
+            return IdentifierNode(tok)
 
         elif tok.type == T_LPAREN:
-            res.register_advancement()
             self.advance()
-            expr = res.register(self.expr())
-            if res.error:
-                return res
+            expr = yield self.expr()
             if self.current_token is None or self.current_token.type != T_RPAREN:
-                return res.failure(InvalidSyntaxError(
-                    tok.pos_start, self.current_token.pos_start if self.current_token else self.tokens[-1].pos_end,
+                raise ParseError(InvalidSyntaxError(
+                    tok.pos_start, self.current_token.pos_start if self.current_token else self.end_pos(),
                     "Expected ')'"
                 ))
-            res.register_advancement()
             self.advance()
 
-            # Check if this is an immediate function call
             if self.current_token and self.current_token.type == T_LPAREN:
-                return self.function_call(expr)
+                return (yield self.function_call(expr))
 
-            return res.success(expr)
+            return expr
 
         elif tok.type == T_LAMBDA:
-            lambda_expr = res.register(self.lambda_expr())
-            if res.error:
-                return res
+            lambda_expr = yield self.lambda_expr()
 
-            # Check if this is an immediate function call
             if self.current_token and self.current_token.type == T_LPAREN:
-                return self.function_call(lambda_expr)
+                return (yield self.function_call(lambda_expr))
 
-            return res.success(lambda_expr)
+            return lambda_expr
 
-        return res.failure(InvalidSyntaxError(
+        raise ParseError(InvalidSyntaxError(
             tok.pos_start, tok.pos_end,
             "Expected INT, IDENTIFIER, '+', '-', '(', or 'LAMBDA'"
         ))
 
     def func_def(self):
-        res = ParseResult()
-
         if not self.current_token.matches(T_DEF):
-            return res.failure(InvalidSyntaxError(
+            raise ParseError(InvalidSyntaxError(
                 self.current_token.pos_start, self.current_token.pos_end,
                 f"Expected '@DEF@'"
             ))
-
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None or self.current_token.type != T_IDENTIFIER:
-            return res.failure(InvalidSyntaxError(
-                self.current_token.pos_start if self.current_token else self.tokens[-1].pos_end,
-                self.current_token.pos_end if self.current_token else self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.current_token.pos_start if self.current_token else self.end_pos(),
+                self.current_token.pos_end if self.current_token else self.end_pos(),
                 f"Expected identifier"
             ))
 
         func_name = self.current_token
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None or self.current_token.type != T_LPAREN:
-            return res.failure(InvalidSyntaxError(
-                self.current_token.pos_start if self.current_token else self.tokens[-1].pos_end,
-                self.current_token.pos_end if self.current_token else self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.current_token.pos_start if self.current_token else self.end_pos(),
+                self.current_token.pos_end if self.current_token else self.end_pos(),
                 f"Expected '('"
             ))
-
-        res.register_advancement()
         self.advance()
 
         arg_name_toks = []
 
-        # Check for unexpected end of input after opening parenthesis
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected parameter list or ')'"
             ))
 
         if self.current_token.type == T_IDENTIFIER:
             arg_name_toks.append(self.current_token)
-            res.register_advancement()
             self.advance()
 
             while self.current_token and self.current_token.type == T_COMMA:
-                res.register_advancement()
                 self.advance()
 
                 if self.current_token is None:
-                    return res.failure(InvalidSyntaxError(
-                        self.tokens[-1].pos_end,
-                        self.tokens[-1].pos_end,
+                    raise ParseError(InvalidSyntaxError(
+                        self.end_pos(),
+                        self.end_pos(),
                         "Unexpected end of input. Expected identifier after ','"
                     ))
 
                 if self.current_token.type != T_IDENTIFIER:
-                    return res.failure(InvalidSyntaxError(
+                    raise ParseError(InvalidSyntaxError(
                         self.current_token.pos_start, self.current_token.pos_end,
                         f"Expected identifier"
                     ))
 
                 arg_name_toks.append(self.current_token)
-                res.register_advancement()
                 self.advance()
 
         if self.current_token is None or self.current_token.type != T_RPAREN:
-            return res.failure(InvalidSyntaxError(
-                self.current_token.pos_start if self.current_token else self.tokens[-1].pos_end,
-                self.current_token.pos_end if self.current_token else self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.current_token.pos_start if self.current_token else self.end_pos(),
+                self.current_token.pos_end if self.current_token else self.end_pos(),
                 f"Expected ')'"
             ))
-
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None or not self.current_token.matches(T_IS):
-            return res.failure(InvalidSyntaxError(
-                self.current_token.pos_start if self.current_token else self.tokens[-1].pos_end,
-                self.current_token.pos_end if self.current_token else self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.current_token.pos_start if self.current_token else self.end_pos(),
+                self.current_token.pos_end if self.current_token else self.end_pos(),
                 f"Expected '@IS@'"
             ))
-
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected function body"
             ))
 
-        body = res.register(self.expr())
-        if res.error: return res
+        body = yield self.expr()
 
         if self.current_token is None or not self.current_token.matches(T_END):
-            return res.failure(InvalidSyntaxError(
-                self.current_token.pos_start if self.current_token else self.tokens[-1].pos_end,
-                self.current_token.pos_end if self.current_token else self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.current_token.pos_start if self.current_token else self.end_pos(),
+                self.current_token.pos_end if self.current_token else self.end_pos(),
                 f"Expected '@END@'"
             ))
-
-        res.register_advancement()
         self.advance()
 
-        return res.success(FunctionDefNode(func_name, arg_name_toks, body))
+        return FunctionDefNode(func_name, arg_name_toks, body)
 
     def if_expr(self):
-        res = ParseResult()
         cases = []
         else_case = None
 
         if not self.current_token.matches(T_IF):
-            return res.failure(
+            raise ParseError(
                 IllegalCharError(self.current_token.pos_start, self.current_token.pos_end, "Expected 'if'"))
-
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input after '@IF@'. Expected a condition."
             ))
 
-        condition = res.register(self.expression())
-        if res.error: return res
+        condition = yield self.expression()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected '@THEN@' and an expression after the condition."
             ))
 
         if self.current_token.matches(T_THEN):
-            res.register_advancement()
             self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected an expression after '@THEN@'."
             ))
 
-        body = res.register(self.expression())
-        if res.error: return res
+        body = yield self.expression()
 
         cases.append((condition, body))
 
         while self.current_token != None and self.current_token.matches(T_ELSEIF):
-            res.register_advancement()
             self.advance()
 
-            condition = res.register(self.expression())
-            if res.error: return res
+            condition = yield self.expression()
 
-            if self.current_token.matches(T_THEN):
-                res.register_advancement()
+            if self.current_token is not None and self.current_token.matches(T_THEN):
                 self.advance()
 
-            body = res.register(self.expression())
-            if res.error: return res
+            body = yield self.expression()
 
             cases.append((condition, body))
 
         if self.current_token != None and self.current_token.matches(T_ELSE):
-            res.register_advancement()
             self.advance()
-            else_case = res.register(self.expression())
-            if res.error: return res
+            else_case = yield self.expression()
 
         if self.current_token is None or not self.current_token.matches(T_END):
-            return res.failure(InvalidSyntaxError(
-                self.current_token.pos_start if self.current_token else self.tokens[-1].pos_end,
-                self.current_token.pos_end if self.current_token else self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.current_token.pos_start if self.current_token else self.end_pos(),
+                self.current_token.pos_end if self.current_token else self.end_pos(),
                 "Expected '@END@' at the end of IF expression"))
-
-        res.register_advancement()
         self.advance()
 
-        return res.success(IfNode(cases, else_case))
+        return IfNode(cases, else_case)
 
     def for_expr(self):
-        res = ParseResult()
-
         if not self.current_token.matches(T_FOR):
-            return res.failure(
+            raise ParseError(
                 IllegalCharError(self.current_token.pos_start, self.current_token.pos_end, "Expected '@FOR@'"))
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input after '@FOR@'. Expected identifier."
             ))
 
         if self.current_token.type != T_IDENTIFIER:
-            return res.failure(InvalidSyntaxError(
+            raise ParseError(InvalidSyntaxError(
                 self.current_token.pos_start,
                 self.current_token.pos_end,
                 f"Expected identifier"
             ))
 
         var_name = self.current_token
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected '@IN@'."
             ))
 
         if not self.current_token.matches(T_IN):
-            return res.failure(
+            raise ParseError(
                 IllegalCharError(self.current_token.pos_start, self.current_token.pos_end, "Expected '@IN@'"))
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected '@RANGE@'."
             ))
 
         if not self.current_token.matches(T_RANGE):
-            return res.failure(
+            raise ParseError(
                 IllegalCharError(self.current_token.pos_start, self.current_token.pos_end, "Expected '@RANGE@'"))
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected '('."
             ))
 
         if not self.current_token.type == T_LPAREN:
-            return res.failure(
+            raise ParseError(
                 IllegalCharError(self.current_token.pos_start, self.current_token.pos_end, "Expected '('"))
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected an expression."
             ))
 
-        start = res.register(self.expr())
-        if res.error: return res
+        start = yield self.expr()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected ','."
             ))
 
         if not self.current_token.type == T_COMMA:
-            return res.failure(
+            raise ParseError(
                 IllegalCharError(self.current_token.pos_start, self.current_token.pos_end, "Expected ','"))
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected an expression."
             ))
 
-        end = res.register(self.expr())
-        if res.error: return res
+        end = yield self.expr()
 
         step = None
         if self.current_token and self.current_token.type == T_COMMA:
-            res.register_advancement()
             self.advance()
             if self.current_token is None:
-                return res.failure(InvalidSyntaxError(
-                    self.tokens[-1].pos_end,
-                    self.tokens[-1].pos_end,
+                raise ParseError(InvalidSyntaxError(
+                    self.end_pos(),
+                    self.end_pos(),
                     "Unexpected end of input. Expected an expression for step value."
                 ))
-            step = res.register(self.expr())
-            if res.error: return res
+            step = yield self.expr()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected ')'."
             ))
 
         if not self.current_token.type == T_RPAREN:
-            return res.failure(
+            raise ParseError(
                 IllegalCharError(self.current_token.pos_start, self.current_token.pos_end, "Expected ')'"))
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected '@DO@'."
             ))
 
         if not self.current_token.matches(T_DO):
-            return res.failure(
+            raise ParseError(
                 IllegalCharError(self.current_token.pos_start, self.current_token.pos_end, "Expected '@DO@'"))
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected an expression for the loop body."
             ))
 
-        body = res.register(self.expr())
-        if res.error: return res
+        body = yield self.expr()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected '@END@'."
             ))
 
         if not self.current_token.matches(T_END):
-            return res.failure(
+            raise ParseError(
                 IllegalCharError(self.current_token.pos_start, self.current_token.pos_end, "Expected '@END@'"))
-        res.register_advancement()
         self.advance()
 
-        return res.success(ForNode(var_name, start, end, step, body))
+        return ForNode(var_name, start, end, step, body)
 
     def lambda_expr(self):
-        res = ParseResult()
-
         if not self.current_token.matches(T_LAMBDA):
-            return res.failure(IllegalCharError(
+            raise ParseError(IllegalCharError(
                 self.current_token.pos_start, self.current_token.pos_end,
                 f"Expected '@LAMBDA@'"
             ))
-
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input after '@LAMBDA@'. Expected '('."
             ))
 
         if self.current_token.type != T_LPAREN:
-            return res.failure(InvalidSyntaxError(
+            raise ParseError(InvalidSyntaxError(
                 self.current_token.pos_start,
                 self.current_token.pos_end,
                 f"Expected '('"
             ))
-
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected identifier."
             ))
 
         if self.current_token.type != T_IDENTIFIER:
-            return res.failure(InvalidSyntaxError(
+            raise ParseError(InvalidSyntaxError(
                 self.current_token.pos_start,
                 self.current_token.pos_end,
                 f"Expected identifier"
             ))
 
         arg_name_tok = self.current_token
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected ')'."
             ))
 
         if self.current_token.type != T_RPAREN:
-            return res.failure(InvalidSyntaxError(
+            raise ParseError(InvalidSyntaxError(
                 self.current_token.pos_start,
                 self.current_token.pos_end,
                 f"Expected ')'"
             ))
-
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected '@:@'."
             ))
 
         if not self.current_token.matches(T_COLON):
-            return res.failure(InvalidSyntaxError(
+            raise ParseError(InvalidSyntaxError(
                 self.current_token.pos_start,
                 self.current_token.pos_end,
                 f"Expected '@:@'"
             ))
-
-        res.register_advancement()
         self.advance()
 
         if self.current_token is None:
-            return res.failure(InvalidSyntaxError(
-                self.tokens[-1].pos_end,
-                self.tokens[-1].pos_end,
+            raise ParseError(InvalidSyntaxError(
+                self.end_pos(),
+                self.end_pos(),
                 "Unexpected end of input. Expected an expression after '@:@'."
             ))
 
-        body = res.register(self.expr())
-        if res.error: return res
+        body = yield self.expr()
 
-        return res.success(LambdaNode([arg_name_tok], body))
+        return LambdaNode([arg_name_tok], body)
 
     def function_call(self, func_name_or_lambda):
-        res = ParseResult()
         arg_nodes = []
 
         if not self.current_token.type == T_LPAREN:
-            return res.failure(IllegalCharError(
+            raise ParseError(IllegalCharError(
                 self.current_token.pos_start, self.current_token.pos_end,
                 f"Expected '('"
             ))
-
-        res.register_advancement()
         self.advance()
 
-        if self.current_token.type == T_RPAREN:
-            res.register_advancement()
+        if self.current_token is not None and self.current_token.type == T_RPAREN:
             self.advance()
         else:
-            arg_nodes.append(res.register(self.expr()))
-            if res.error:
-                return res.failure(IllegalCharError(
-                    self.current_token.pos_start, self.current_token.pos_end,
-                    "Expected ')', 'IF', 'FOR', 'FUN', INT, IDENTIFIER, '+', '-', '(', or 'lambda'"
-                ))
+            arg_nodes.append((yield self.expr()))
 
-            while self.current_token.type == T_COMMA:
-                res.register_advancement()
+            while self.current_token is not None and self.current_token.type == T_COMMA:
                 self.advance()
 
-                arg_nodes.append(res.register(self.expr()))
-                if res.error: return res
+                arg_nodes.append((yield self.expr()))
 
-            if self.current_token.type != T_RPAREN:
-                return res.failure(IllegalCharError(
-                    self.current_token.pos_start, self.current_token.pos_end,
+            if self.current_token is None or self.current_token.type != T_RPAREN:
+                raise ParseError(IllegalCharError(
+                    self.current_token.pos_start if self.current_token else self.end_pos(),
+                    self.current_token.pos_end if self.current_token else self.end_pos(),
                     f"Expected ',' or ')'"
                 ))
-
-            res.register_advancement()
             self.advance()
 
-        return res.success(FunctionCallNode(func_name_or_lambda, arg_nodes))
+        return FunctionCallNode(func_name_or_lambda, arg_nodes)
 
     def atom(self):
-        res = ParseResult()
         tok = self.current_token
 
         if tok.type == T_INT:
-            res.register_advancement()
             self.advance()
-            return res.success(NumberNode(tok))
+            return NumberNode(tok)
 
         elif tok.type == T_IDENTIFIER:
-            res.register_advancement()
             self.advance()
-            return res.success(IdentifierNode(tok))
+            return IdentifierNode(tok)
 
         elif tok.type == T_LPAREN:
-            res.register_advancement()
             self.advance()
-            expr = res.register(self.expr())
-            if res.error:
-                return res
+            expr = yield self.expr()
             if self.current_token.type == T_RPAREN:
-                res.register_advancement()
                 self.advance()
-                return res.success(expr)
+                return expr
             else:
-                return res.failure(InvalidSyntaxError(
+                raise ParseError(InvalidSyntaxError(
                     self.current_token.pos_start, self.current_token.pos_end,
                     "Expected ')'"
                 ))
 
         elif tok.type == T_LAMBDA:
-            lambda_expr = res.register(self.lambda_expr())
-            if res.error: return res
-            return res.success(lambda_expr)
+            lambda_expr = yield self.lambda_expr()
+            return lambda_expr
 
-        return res.failure(InvalidSyntaxError(
+        raise ParseError(InvalidSyntaxError(
             tok.pos_start, tok.pos_end,
             "Expected int, identifier, '+', '-', '(', 'LAMBDA'"
         ))
 
     def call(self):
-        res = ParseResult()
-        atom = res.register(self.atom())
-        if res.error: return res
+        atom = yield self.atom()
 
         if self.current_token.type == T_LPAREN:
-            res.register_advancement()
             self.advance()
             arg_nodes = []
 
             if self.current_token.type == T_RPAREN:
-                res.register_advancement()
                 self.advance()
             else:
-                arg_nodes.append(res.register(self.expr()))
-                if res.error:
-                    return res.failure(InvalidSyntaxError(
-                        self.current_token.pos_start, self.current_token.pos_end,
-                        "Expected ')', 'LAMBDA', int, identifier, '+', '-', '('"
-                    ))
+                arg_nodes.append((yield self.expr()))
 
                 while self.current_token.type == T_COMMA:
-                    res.register_advancement()
                     self.advance()
 
-                    arg_nodes.append(res.register(self.expr()))
-                    if res.error: return res
+                    arg_nodes.append((yield self.expr()))
 
                 if self.current_token.type != T_RPAREN:
-                    return res.failure(InvalidSyntaxError(
+                    raise ParseError(InvalidSyntaxError(
                         self.current_token.pos_start, self.current_token.pos_end,
                         f"Expected ',' or ')'"
                     ))
-
-                res.register_advancement()
                 self.advance()
-            return res.success(FunctionCallNode(atom, arg_nodes))
-        return res.success(atom)
+            return FunctionCallNode(atom, arg_nodes)
+        return atom
+
+
+##############################################
+# ITERATIVE PARSER
+##############################################
+
+# The IterativeParser accepts exactly the same language as Parser and builds the same nodes and the same
+# errors, but nesting depth is not limited by Python's recursion limit: its run() keeps the productions that
+# are waiting for a sub-production on an explicit stack, sending each result back into the production that
+# asked for it. Time and memory stay linear in the size of the input.
+# On ordinary input the two drivers take about the same time; Parser stays the default because trees too deep
+# for it are usually too deep to evaluate as well, so --iterative is meant for generated code that nests deeply.
+
+class IterativeParser(Parser):
+    def run(self, production):
+        stack = [production]
+        value = None
+        while True:
+            try:
+                sub_production = stack[-1].send(value)
+            except StopIteration as done:
+                stack.pop()
+                if not stack:
+                    return done.value
+                value = done.value
+                continue
+            stack.append(sub_production)
+            value = None
@@ -0,0 +1,167 @@
+from tokens import *
+
+# The run-time objects that every execution engine shares: contexts, environment frames, results and the
+# operators. They live here rather than in interpreter.py so that the other engines (closures.py) can use
+# them without importing the interpreter, which is also the program's __main__ module.
+
+
+#######################################
+# context
+#######################################
+
+# The Context class represents the execution context for a specific scope in the @ language.
+# It maintains information about the current scope's name, its parent context, and the position
+# where it was entered. This class is crucial for managing nested scopes and proper variable resolution.
+
+
+class Context:
+    def __init__(self, display_name, parent=None, parent_entry_pos=None):
+        self.display_name = display_name
+        self.parent = parent
+        self.parent_entry_pos = parent_entry_pos
+        self.symbol_table = None
+
+
+# A SymbolTable is one environment frame: the names bound in one scope plus a link to the enclosing frame.
+# The global table has no parent; every function call gets a new frame for its arguments whose parent is
+# the frame the function was defined in, so a call costs the same however many names the program defines.
+# Lookups walk outwards and stop at the first frame that binds the name, even if it is bound to None.
+#
+# generation counts the rebindings that can change which function a call site's name resolves to (see
+# callsites.py): every @DEF@, and a @FOR@ over a name bound to a function. Every engine bumps it, as the tree
+# engine's call sites may call through a table another engine rebinds names in. Python code that binds or
+# unbinds functions in a table the Interpreter has run in calls invalidate() afterwards.
+class SymbolTable:
+    __slots__ = ('symbols', 'parent', 'root')
+    generation = 0
+
+    def __init__(self, parent=None):
+        self.symbols = {}
+        self.parent = parent
+        self.root = self if parent is None else parent.root  # the global table
+
+    def get(self, name):
+        table = self
+        while table is not None:
+            value = table.symbols.get(name, UNBOUND)
+            if value is not UNBOUND:
+                return value
+            table = table.parent
+        return None
+
+    def set(self, name, value):
+        self.symbols[name] = value
+
+    def clear(self):
+        self.symbols.clear()
+        SymbolTable.invalidate()
+
+    def check_rebinding(self, name):
+        # Called before a @FOR@ binds name here for the first time: that rebinds a function when the name
+        # resolves to one
+        if hasattr(self.get(name), 'execute'):
+            SymbolTable.invalidate()
+
+    @staticmethod
+    def invalidate():
+        SymbolTable.generation += 1
+
+
+UNBOUND = object()
+
+
+#######################################
+# RESULTS
+#######################################
+
+# The RTResult (Runtime Result) class is used to handle the results of runtime operations.
+# It encapsulates both successful results (values) and errors that may occur during interpretation.
+# This class helps in propagating results and errors through the interpretation process,
+# allowing for clean error handling and result management throughout the interpreter.
+
+class RTResult:
+    def __init__(self):
+        self.value = None
+        self.error = None
+
+    def register(self, res):
+        if isinstance(res, RTResult):
+            if res.error: self.error = res.error
+            return res.value
+        return res
+
+    def success(self, value):
+        self.value = value
+        return self
+
+    def failure(self, error):
+        self.error = error
+        return self
+
+
+# The compiled engines report a run-time error by raising it, instead of returning an RTResult at every step
+class RuntimeFailure(Exception):
+    def __init__(self, error):
+        super().__init__(error.details)
+        self.error = error
+
+
+# A LoopValues is the lazy value of a @FOR@ statement: the loop has not run yet, and iterating over the
+# LoopValues runs it one iteration at a time, so its values never have to be in memory together. It can be
+# iterated once; an error in an iteration is raised as a RuntimeFailure when that iteration is reached.
+class LoopValues:
+    __slots__ = ('iterator',)
+
+    def __init__(self, iterator):
+        self.iterator = iterator
+
+    def __iter__(self):
+        return self.iterator
+
+    def __repr__(self):
+        return '<@FOR@ values>'
+
+
+#######################################
+# OPERATORS
+#######################################
+
+# The operators themselves, shared by every evaluator. Division by zero is checked by the caller,
+# which knows where the operator is in the source.
+def binary_operation(op_type, left, right):
+    result = None
+    if op_type == T_DIV:
+        result = left // right
+    elif op_type == T_PLUS:
+        result = left + right
+    elif op_type == T_SUB:
+        result = left - right
+    elif op_type == T_MUL:
+        result = left * right
+    elif op_type == T_MODULO:
+        result = left % right
+    elif op_type == T_EQEQ:
+        result = left == right
+    elif op_type == T_NEQ:
+        result = left != right
+    elif op_type == T_GREATERTHAN:
+        result = left > right
+    elif op_type == T_LESSTHAN:
+        result = left < right
+    elif op_type == T_EQGREATERTHAN:
+        result = left >= right
+    elif op_type == T_EQLESSTHAN:
+        result = left <= right
+    elif op_type == T_AND:
+        result = left if not left else right
+    elif op_type == T_OR:
+        result = left if left else right
+    return result
+
+
+def unary_operation(op_type, value):
+    if op_type == T_NOT:
+        value = not value
+    elif op_type == T_SUB:
+        value = -value
+    return value
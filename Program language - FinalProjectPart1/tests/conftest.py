@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The interpreter's modules import each other by their plain names (parser, runtime, ...), as they do when
+# interpreter.py runs from this directory
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
@@ -0,0 +1,104 @@
+import os
+import re
+
+import pytest
+
+import astcache
+import interpreter
+from astcache import cache_path, load_program, store_program
+from interpreter import compile_program, run_file
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_FILES = ('basic_tests.txt', 'function_tests.txt', 'if_tests.txt', 'lambda_tests.txt', 'recursion_tests.txt')
+
+PROGRAM = '@DEF@ f(x) @IS@\n  @IF@ x @<@ 2 @THEN@ x @ELSE@ f(x @-@ 1) @+@ f(x @-@ 2) @END@\n@END@\nf(10)\n1 @/@ 0\n'
+
+
+def sample_text(sample):
+    with open(os.path.join(PROJECT_DIR, sample)) as file:
+        return file.read()
+
+
+def file_output(path, capsys, cache=True):
+    interpreter.global_symbol_table.clear()
+    run_file(str(path), cache=cache)
+    return re.sub(r'0x[0-9a-f]+', '0x', capsys.readouterr().out)
+
+
+def fail_to_compile(fn, text, iterative=False):
+    raise AssertionError('the program was parsed again')
+
+
+@pytest.fixture
+def program(tmp_path):
+    path = tmp_path / 'program.txt'
+    path.write_text(PROGRAM)
+    return path
+
+
+@pytest.mark.parametrize('sample', SAMPLE_FILES)
+def test_trees_round_trip(sample, tmp_path):
+    text = sample_text(sample)
+    path = str(tmp_path / sample)
+    node = compile_program(path, text)
+    assert store_program(path, text, node)
+    loaded = load_program(path, text)
+    assert repr(loaded) == repr(node)
+    assert [(start.idx, end.idx) for start, end in loaded.element_spans] == \
+           [(start.idx, end.idx) for start, end in node.element_spans]
+
+
+def test_a_second_run_loads_the_tree(program, capsys, monkeypatch):
+    expected = file_output(program, capsys, cache=False)
+    assert not os.path.exists(cache_path(str(program)))
+    assert file_output(program, capsys) == expected
+    assert os.path.exists(cache_path(str(program)))
+
+    monkeypatch.setattr(interpreter, 'compile_program', fail_to_compile)
+    assert file_output(program, capsys) == expected
+
+
+def test_a_changed_source_is_parsed_again(program, capsys):
+    file_output(program, capsys)
+    changed = PROGRAM.replace('f(10)', 'f(12)')
+    assert load_program(str(program), changed) is None
+
+    program.write_text(changed)
+    assert 'Output: 144' in file_output(program, capsys)
+    assert repr(load_program(str(program), changed)) == repr(compile_program(str(program), changed))
+
+
+def test_another_interpreter_version_is_a_miss(program, monkeypatch):
+    assert store_program(str(program), PROGRAM, compile_program(str(program), PROGRAM))
+    monkeypatch.setattr(astcache, 'INTERPRETER_VERSION', 'other')
+    assert load_program(str(program), PROGRAM) is None
+
+
+def test_a_damaged_artifact_is_a_miss(program):
+    assert store_program(str(program), PROGRAM, compile_program(str(program), PROGRAM))
+    path = cache_path(str(program))
+    with open(path, 'r+b') as file:
+        file.truncate(os.path.getsize(path) - 5)
+    assert load_program(str(program), PROGRAM) is None
+
+
+def test_large_artifacts_are_memory_mapped(program, monkeypatch):
+    node = compile_program(str(program), PROGRAM)
+    assert store_program(str(program), PROGRAM, node)
+    monkeypatch.setattr(astcache, 'MMAP_THRESHOLD', 0)
+    assert repr(load_program(str(program), PROGRAM)) == repr(node)
+
+
+def test_programs_with_errors_are_not_cached(tmp_path):
+    path = str(tmp_path / 'broken.txt')
+    text = '1 @+@ 2\n3 @+@\n'
+    assert not store_program(path, text, compile_program(path, text))
+    assert load_program(path, text) is None
+
+
+def test_loaded_errors_count_lines_like_parsed_ones(program, capsys):
+    expected = file_output(program, capsys, cache=False)
+    file_output(program, capsys)
+    assert file_output(program, capsys) == expected
+    assert f'File {program}, line 1' in expected
@@ -0,0 +1,30 @@
+import pytest
+
+from batch import apply_function
+from interpreter import ENGINES, SymbolTable, compile_program, make_evaluator
+
+np = pytest.importorskip('numpy')
+
+
+def square_table(engine='tree'):
+    symbol_table = SymbolTable()
+    evaluate = make_evaluator(engine, symbol_table)
+    evaluate(compile_program('<test>', '@DEF@ square(n) @IS@ n @*@ n @END@').element_nodes[0])
+    return symbol_table
+
+
+@pytest.mark.parametrize('vectorize', (False, True))
+@pytest.mark.parametrize('make_row', (list, tuple))
+def test_numpy_scalar_rows_do_not_wrap_around(make_row, vectorize):
+    # 2 ** 32 squared does not fit in an int64
+    rows = [make_row([np.int64(n)]) for n in (3, 2 ** 32)]
+    values = list(apply_function('square', rows, square_table(), vectorize=vectorize))
+
+    assert values == [9, 2 ** 64]
+    assert all(type(value) is int for value in values)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_numpy_array_rows(engine):
+    rows = np.array([[3], [2 ** 32]], dtype=np.int64)
+    assert list(apply_function('square', rows, square_table(engine))) == [9, 2 ** 64]
@@ -0,0 +1,89 @@
+import os
+import re
+
+import pytest
+
+import interpreter
+from bytecode import OPCODE_NAMES, CodeObject, compile_statement
+from interpreter import run, run_file
+from lexer import my_RegexLexer
+from parser import Parser
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_FILES = ('basic_tests.txt', 'function_tests.txt', 'if_tests.txt', 'lambda_tests.txt', 'recursion_tests.txt')
+
+ERRORS = '1 @/@ 0\nundefined(1)\n@DEF@ f(x) @IS@ x @END@\nf(1, 2)\n' \
+         '@DEF@ g(x) @IS@ 10 @/@ x @END@\n@DEF@ h(x) @IS@ g(x @-@ 1) @END@\nh(3)\nh(1)\n(@LAMBDA@ (x) @:@ x)(1, 2)\n'
+
+DEEP_PROGRAM = '''@DEF@ s(n) @IS@ @IF@ n @==@ 0 @THEN@ 0 @ELSE@ 1 @+@ s(n @-@ 1) @END@ @END@
+s(1000)
+1 @+@ 1
+'''
+
+
+def test_max_depth_is_a_runtime_error(tmp_path, capsys):
+    # Going deeper than --max-depth fails the statement, and the program goes on with the next one
+    program = tmp_path / 'deep.txt'
+    program.write_text(DEEP_PROGRAM)
+    run_file(str(program), cache=False, engine='vm', max_depth=100)
+    out = capsys.readouterr().out
+
+    assert 'Runtime Error: Maximum recursion depth of 100 calls exceeded' in out
+    assert out.rstrip().endswith('Line 3: 1 @+@ 1\nOutput: 2')
+
+
+def test_recursion_within_max_depth(tmp_path, capsys):
+    program = tmp_path / 'deep.txt'
+    program.write_text(DEEP_PROGRAM)
+    run_file(str(program), cache=False, engine='vm', max_depth=2000)
+    out = capsys.readouterr().out
+
+    assert 'Line 2: s(1000)\nOutput: 1000' in out
+
+
+def file_output(path, capsys, engine):
+    interpreter.global_symbol_table.clear()
+    run_file(str(path), cache=False, engine=engine)
+    return re.sub(r'0x[0-9a-f]+', '0x', capsys.readouterr().out)
+
+
+def parse(text):
+    tokens, error = my_RegexLexer('<test>', text).make_tokens()
+    assert error is None
+    return Parser(tokens).parse().node
+
+
+def opcodes(code):
+    return {OPCODE_NAMES[op] for op in code.instructions[::2]}
+
+
+@pytest.mark.parametrize('sample', SAMPLE_FILES)
+def test_samples_print_like_the_tree_engine(sample, capsys):
+    path = os.path.join(PROJECT_DIR, sample)
+    assert file_output(path, capsys, 'vm') == file_output(path, capsys, 'tree')
+
+
+def test_errors_print_like_the_tree_engine(tmp_path, capsys):
+    path = tmp_path / 'errors.txt'
+    path.write_text(ERRORS)
+    assert file_output(path, capsys, 'vm') == file_output(path, capsys, 'tree')
+
+
+def test_function_bodies_are_compiled_once_onto_their_node():
+    node = parse('@DEF@ fib(n) @IS@ @IF@ n @<@ 2 @THEN@ n @ELSE@ fib(n @-@ 1) @+@ fib(n @-@ 2) @END@ @END@')
+    statement = compile_statement(node)
+    assert isinstance(node.code, CodeObject)
+    assert opcodes(statement) == {'DEFINE_FUNCTION', 'RETURN'}
+    assert {'LOAD_FUNCTION', 'CALL', 'POP_JUMP_IF_FALSE', 'COMPARE_LT', 'BINARY_ADD', 'RETURN'} <= opcodes(node.code)
+
+    code = node.code
+    compile_statement(node)
+    assert node.code is code
+
+
+def test_calls_do_not_use_the_python_stack():
+    # Far deeper than Python's recursion limit
+    interpreter.global_symbol_table.clear()
+    run('<test>', DEEP_PROGRAM.splitlines()[0], engine='vm')
+    assert run('<test>', 's(50000)', engine='vm') == (50000, None)
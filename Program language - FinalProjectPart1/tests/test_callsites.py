@@ -0,0 +1,69 @@
+import pytest
+
+import interpreter
+from callsites import call_site_stats
+from interpreter import ENGINES, run, run_file
+from runtime import SymbolTable
+
+# The tree engine caches the function of every call by a global name in a CallSite. The cache is used while
+# SymbolTable.generation is unchanged, so every engine bumps it when it rebinds a name that held a function.
+
+OTHER_ENGINES = [engine for engine in ENGINES if engine != 'tree'] + ['flat']
+
+
+def run_in(engine, text, tmp_path):
+    if engine == 'flat':
+        path = tmp_path / 'flat.txt'
+        path.write_text(text + '\n')
+        run_file(str(path), cache=False, flat=True)
+    else:
+        assert run('<test>', text, engine=engine)[1] is None
+
+
+def g_stats():
+    return call_site_stats(interpreter.global_symbol_table.get('g').body_node)
+
+
+@pytest.fixture(autouse=True)
+def clear_globals():
+    interpreter.global_symbol_table.clear()
+
+
+def test_hits_and_misses_are_counted_per_call_site():
+    run('<test>', '@DEF@ f(x) @IS@ x @END@')
+    run('<test>', '@DEF@ g(x) @IS@ f(x) @+@ f(x @+@ 1) @*@ h(x) @END@')
+    run('<test>', '@DEF@ h(x) @IS@ 2 @END@')
+    for _ in range(3):
+        assert run('<test>', 'g(1)') == (5, None)
+    assert g_stats() == [('f', 1, 2, 1), ('f', 1, 2, 1), ('h', 1, 2, 1)]
+
+    run('<test>', '@DEF@ h(x) @IS@ 3 @END@')
+    assert run('<test>', 'g(1)') == (7, None)
+    assert g_stats() == [('f', 1, 2, 2), ('f', 1, 2, 2), ('h', 1, 2, 2)]
+
+
+def test_calls_by_a_local_name_have_no_call_site():
+    run('<test>', '@DEF@ g(f) @IS@ f(1) @+@ (@LAMBDA@ (x) @:@ x)(2) @END@')
+    assert g_stats() == []
+
+
+@pytest.mark.parametrize('engine', OTHER_ENGINES)
+def test_a_function_redefined_by_another_engine_is_called(engine, tmp_path):
+    run('<test>', '@DEF@ f(x) @IS@ 1 @END@')
+    run('<test>', '@DEF@ g(x) @IS@ f(x) @+@ 0 @END@')
+    assert run('<test>', 'g(0)') == (1, None)
+
+    run_in(engine, '@DEF@ f(x) @IS@ 2 @END@', tmp_path)
+    assert run('<test>', 'g(0)') == (2, None)
+    assert g_stats() == [('f', 1, 0, 2)]
+
+
+@pytest.mark.parametrize('engine', ['tree'] + OTHER_ENGINES)
+def test_a_loop_over_a_function_name_rebinds_it(engine, tmp_path):
+    run('<test>', '@DEF@ f(x) @IS@ 1 @END@')
+    generation = SymbolTable.generation
+    run_in(engine, '@FOR@ i @IN@ @RANGE@(0, 3) @DO@ i @END@', tmp_path)
+    assert SymbolTable.generation == generation
+
+    run_in(engine, '@FOR@ f @IN@ @RANGE@(0, 3) @DO@ f @END@', tmp_path)
+    assert SymbolTable.generation != generation
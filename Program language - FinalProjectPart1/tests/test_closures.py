@@ -0,0 +1,59 @@
+import os
+import re
+
+import pytest
+
+import interpreter
+from interpreter import run, run_file
+
+# The closure engine compiles every node once into a Python closure and runs the root one; it prints what the
+# tree engine prints, errors included.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_FILES = ('basic_tests.txt', 'function_tests.txt', 'if_tests.txt', 'lambda_tests.txt', 'recursion_tests.txt')
+
+PROGRAMS = {
+    'loops': '@FOR@ i @IN@ @RANGE@(0, 5) @DO@ i @*@ i @END@\n@FOR@ i @IN@ @RANGE@(10, 0, @-@ 3) @DO@ i @END@\n',
+    'errors': '1 @/@ 0\nundefined(1)\n@DEF@ f(x) @IS@ x @END@\nf(1, 2)\n@NOT@ f\nf @==@ f\n',
+    'nested errors': '@DEF@ g(x) @IS@ 10 @/@ x @END@\n@DEF@ h(x) @IS@ g(x @-@ 1) @END@\nh(3)\nh(1)\n',
+}
+
+
+def file_output(path, capsys, engine):
+    interpreter.global_symbol_table.clear()
+    run_file(str(path), cache=False, engine=engine)
+    return re.sub(r'0x[0-9a-f]+', '0x', capsys.readouterr().out)
+
+
+def no_visiting(self, node):
+    raise AssertionError('the closure engine visited a node')
+
+
+@pytest.mark.parametrize('sample', SAMPLE_FILES)
+def test_samples_print_like_the_tree_engine(sample, capsys):
+    path = os.path.join(PROJECT_DIR, sample)
+    assert file_output(path, capsys, 'closure') == file_output(path, capsys, 'tree')
+
+
+@pytest.mark.parametrize('name', sorted(PROGRAMS))
+def test_programs_print_like_the_tree_engine(name, tmp_path, capsys):
+    path = tmp_path / 'program.txt'
+    path.write_text(PROGRAMS[name])
+    assert file_output(path, capsys, 'closure') == file_output(path, capsys, 'tree')
+
+
+@pytest.mark.parametrize('sample', SAMPLE_FILES)
+def test_samples_do_not_use_the_interpreter(sample, capsys, monkeypatch):
+    path = os.path.join(PROJECT_DIR, sample)
+    expected = file_output(path, capsys, 'tree')
+    monkeypatch.setattr(interpreter.Interpreter, 'visit', no_visiting)
+    assert file_output(path, capsys, 'closure') == expected
+
+
+def test_run_selects_the_engine():
+    interpreter.global_symbol_table.clear()
+    run('<test>', '@DEF@ fact(n) @IS@ @IF@ n @<=@ 1 @THEN@ 1 @ELSE@ n @*@ fact(n @-@ 1) @END@ @END@',
+        engine='closure')
+    assert type(interpreter.global_symbol_table.get('fact')).__name__ == 'CompiledFunction'
+    assert run('<test>', 'fact(10)', engine='closure') == (3628800, None)
@@ -0,0 +1,75 @@
+import pytest
+
+import interpreter
+from interpreter import ENGINES, run
+from runtime import SymbolTable
+
+# A call binds its parameters in a small frame linked to the environment the function was defined in, instead of
+# a copy of the globals: names are looked up frame by frame, so a call costs the same however much is defined.
+
+
+def run_all(engine, *texts):
+    interpreter.global_symbol_table.clear()
+    results = []
+    for text in texts:
+        result, error = run('<test>', text, engine=engine)
+        assert error is None, error.as_string()
+        results.append(result)
+    return results
+
+
+def name(i):
+    # Identifiers are letters only
+    return 'f' + ''.join(chr(ord('a') + int(digit)) for digit in str(i))
+
+
+def test_a_call_frame_holds_only_the_parameters(monkeypatch):
+    frames = []
+
+    class RecordingSymbolTable(SymbolTable):
+        __slots__ = ()
+
+        def __init__(self, parent=None):
+            super().__init__(parent)
+            frames.append(self)
+
+    interpreter.global_symbol_table.clear()
+    for i in range(1000):
+        run('<test>', f'@DEF@ {name(i)}(x) @IS@ x @+@ {i} @END@')
+    run('<test>', '@DEF@ add(a, b) @IS@ a @+@ b @END@')
+    monkeypatch.setattr(interpreter, 'SymbolTable', RecordingSymbolTable)
+    assert run('<test>', f'add({name(999)}(1), 2)') == (1002, None)
+
+    assert sorted(sorted(frame.symbols) for frame in frames) == [['a', 'b'], ['x']]
+    assert all(frame.parent is interpreter.global_symbol_table for frame in frames)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_parameters_do_not_leak_into_the_globals(engine):
+    assert run_all(engine, '@DEF@ f(x) @IS@ x @*@ 2 @END@', 'f(21)')[1] == 42
+    assert interpreter.global_symbol_table.get('x') is None
+    assert interpreter.global_symbol_table.get('f') is not None
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_parameters_shadow_globals(engine):
+    results = run_all(engine, '@FOR@ x @IN@ @RANGE@(0, 3) @DO@ x @END@', '@DEF@ f(x) @IS@ x @+@ 1 @END@',
+                      'f(10)', 'x')
+    assert results[2:] == [11, 2]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_calls_see_functions_defined_later(engine):
+    results = run_all(engine,
+                      '@DEF@ even(n) @IS@ @IF@ n @==@ 0 @THEN@ @TRUE@ @ELSE@ odd(n @-@ 1) @END@ @END@',
+                      '@DEF@ odd(n) @IS@ @IF@ n @==@ 0 @THEN@ @FALSE@ @ELSE@ even(n @-@ 1) @END@ @END@',
+                      'even(10)', 'odd(7)')
+    assert results[2:] == [True, True]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_lambdas_keep_the_frame_they_were_made_in(engine):
+    results = run_all(engine, '@DEF@ adder(n) @IS@ @LAMBDA@ (x) @:@ x @+@ n @END@',
+                      '@DEF@ twice(f, x) @IS@ f(f(x)) @END@', 'twice(adder(5), 1)',
+                      '(@LAMBDA@ (g) @:@ g(g(3)))(adder(2))')
+    assert results[2:] == [11, 7]
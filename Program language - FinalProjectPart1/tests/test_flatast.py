@@ -0,0 +1,71 @@
+import inspect
+import os
+import re
+
+import pytest
+
+import interpreter
+import parser
+from flatast import FlatTree
+from general import SourceFile
+from interpreter import compile_program, run_file
+
+# A FlatTree holds the same program as the node objects it was built from: it prints the same, and the
+# FlatInterpreter that walks its arrays prints the same output as the tree engine walking the nodes.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_FILES = ('basic_tests.txt', 'function_tests.txt', 'if_tests.txt', 'lambda_tests.txt', 'recursion_tests.txt')
+
+PROGRAMS = {
+    'loops': '@FOR@ i @IN@ @RANGE@(0, 5) @DO@ i @*@ i @END@\n'
+             '@DEF@ sum(n) @IS@ @IF@ n @==@ 0 @THEN@ 0 @ELSE@ n @+@ sum(n @-@ 1) @END@ @END@\nsum(50)\n',
+    'closures': '@DEF@ adder(n) @IS@ @LAMBDA@ (x) @:@ x @+@ n @END@\nadder(3)(4)\n'
+                '(@LAMBDA@ (f) @:@ f(f(1)))(adder(10))\n@NOT@ (1 @<@ 2) @|@ @FALSE@\n',
+    'errors': '1 @/@ 0\nundefined(1)\n@DEF@ f(x) @IS@ x @END@\nf(1, 2)\n1 @+@\n(2\n3 $ 4\n5\n',
+}
+
+
+def file_output(path, capsys, flat):
+    interpreter.global_symbol_table.clear()
+    run_file(str(path), cache=False, flat=flat)
+    return re.sub(r'0x[0-9a-f]+', '0x', capsys.readouterr().out)
+
+
+def flat_tree(text):
+    node = compile_program('<test>', text)
+    return node, FlatTree.from_node(node, SourceFile('<test>', text))
+
+
+@pytest.mark.parametrize('sample', SAMPLE_FILES)
+def test_flat_trees_print_like_nodes(sample):
+    with open(os.path.join(PROJECT_DIR, sample)) as file:
+        node, tree = flat_tree(file.read())
+    assert tree.repr_at(tree.root) == repr(node)
+    assert tree.spans == [(start.idx, end.idx) for start, end in node.element_spans]
+
+
+@pytest.mark.parametrize('name', sorted(PROGRAMS))
+def test_flat_evaluation_prints_like_nodes(name, tmp_path, capsys):
+    path = tmp_path / f'{name}.txt'
+    path.write_text(PROGRAMS[name])
+    assert file_output(path, capsys, True) == file_output(path, capsys, False)
+
+
+@pytest.mark.parametrize('sample', SAMPLE_FILES)
+def test_flat_evaluation_of_the_samples(sample, capsys):
+    path = os.path.join(PROJECT_DIR, sample)
+    assert file_output(path, capsys, True) == file_output(path, capsys, False)
+
+
+def test_constants_are_stored_once():
+    _, tree = flat_tree('1 @+@ 1 @+@ 1\nx @*@ x\n@TRUE@ @&@ @TRUE@\n')
+    assert sorted(map(repr, tree.consts)) == ["'x'", '1', 'True']
+    assert len(tree.ops) == len(tree.starts) == len(tree.ends) == len(tree.args) == len(tree.tok_offsets)
+
+
+def test_node_classes_have_no_instance_dict():
+    for name, cls in inspect.getmembers(parser, inspect.isclass):
+        if name.endswith('Node') and cls.__module__ == 'parser':
+            assert '__slots__' in vars(cls), name
+            assert '__dict__' not in dir(cls), name
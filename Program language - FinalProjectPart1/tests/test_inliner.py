@@ -0,0 +1,122 @@
+import os
+import re
+
+import pytest
+
+import interpreter
+from inliner import INLINE_MAX_NODES, inline_body
+from interpreter import Function, run, run_file
+from lexer import my_RegexLexer
+from parser import Parser
+
+# Under -O a call of a small @DEF@ whose body only computes a value from its parameters evaluates a copy of the
+# body in the caller's frame. Programs print exactly what they print without it, errors included, and a call
+# picks up a redefinition of the function.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_FILES = ('basic_tests.txt', 'function_tests.txt', 'if_tests.txt', 'lambda_tests.txt', 'recursion_tests.txt')
+
+PROGRAM = ('@DEF@ square(n) @IS@ n @*@ n @END@\n'
+           '@DEF@ add(x, y) @IS@ x @+@ y @END@\n'
+           '@DEF@ ratio(x, y) @IS@\n  x @/@ y\n@END@\n'
+           '@DEF@ sign(x) @IS@ @IF@ x @<@ 0 @THEN@ @-@ 1 @ELSEIF@ x @==@ 0 @THEN@ 0 @ELSE@ 1 @END@ @END@\n'
+           '@DEF@ same(x, x) @IS@ x @END@\n'
+           '@DEF@ nothing(x) @IS@ @IF@ x @THEN@ 1 @END@ @END@\n'
+           'add(square(3), square(add(1, 1)))\n'
+           'ratio(10, 0)\n'
+           'ratio(1 @/@ 0, nope)\n'
+           'add(nope, 1 @/@ 0)\n'
+           'square(1, 2)\n'
+           'same(1, 2)\n'
+           'square(nothing(@FALSE@))\n'
+           '@FOR@ i @IN@ @RANGE@(-2, 3) @DO@ sign(i) @+@ ratio(12, i @+@ 3) @*@ add(i, square(i)) @END@\n'
+           '(@LAMBDA@ (n) @:@ square(n) @+@ n)(4)\n')
+
+
+def file_output(path, capsys, optimize):
+    interpreter.global_symbol_table.clear()
+    run_file(str(path), cache=False, optimize=optimize)
+    return re.sub(r'0x[0-9a-f]+', '0x', capsys.readouterr().out)
+
+
+def run_all(*texts):
+    results = []
+    for text in texts:
+        result, error = run('<test>', text, optimize=True)
+        results.append(result if error is None else error.as_string())
+    return results
+
+
+def function_body(text):
+    tokens, _ = my_RegexLexer('<test>', text).make_tokens()
+    node = Parser(tokens).parse().node
+    return inline_body(node.body_node, [arg_tok.value for arg_tok in node.arg_name_toks])
+
+
+@pytest.fixture(autouse=True)
+def clear_globals():
+    interpreter.global_symbol_table.clear()
+
+
+@pytest.mark.parametrize('text, inlined', [
+    ('@DEF@ square(n) @IS@ n @*@ n @END@', True),
+    ('@DEF@ pick(x, y) @IS@ @IF@ x @THEN@ x @-@ y @ELSE@ @NOT@ y @END@ @END@', True),
+    ('@DEF@ one() @IS@ 1 @END@', True),
+    ('@DEF@ f(x) @IS@ x @+@ limit @END@', False),                 # reads a name of the defining frame
+    ('@DEF@ f(x) @IS@ square(x) @END@', False),                   # calls a function
+    ('@DEF@ f(n) @IS@ @IF@ n @THEN@ f(n @-@ 1) @ELSE@ 0 @END@ @END@', False),
+    ('@DEF@ f(x) @IS@ @LAMBDA@ (y) @:@ y @END@', False),
+    ('@DEF@ f(x) @IS@ @FOR@ i @IN@ @RANGE@(0, x) @DO@ i @END@ @END@', False),
+    ('@DEF@ f(x) @IS@ ' + ' @+@ '.join(['x'] * (INLINE_MAX_NODES // 2)) + ' @END@', True),
+    ('@DEF@ f(x) @IS@ ' + ' @+@ '.join(['x'] * (INLINE_MAX_NODES // 2 + 1)) + ' @END@', False),
+])
+def test_only_small_bodies_of_parameters_are_inlined(text, inlined):
+    assert (function_body(text) is not None) == inlined
+
+
+@pytest.mark.parametrize('sample', SAMPLE_FILES)
+def test_samples_print_the_same(sample, capsys):
+    path = os.path.join(PROJECT_DIR, sample)
+    assert file_output(path, capsys, True) == file_output(path, capsys, False)
+
+
+def test_results_and_errors_are_the_same(tmp_path, capsys):
+    path = tmp_path / 'inline.txt'
+    path.write_text(PROGRAM)
+    output = file_output(path, capsys, True)
+    assert output == file_output(path, capsys, False)
+    # The line within the statement that defined ratio
+    assert f'Line 10: ratio(10, 0)\nError: Division by Zero: Attempted to divide by zero\n' \
+           f'File {path}, line 2\n' in output
+
+
+def test_inlined_calls_make_no_call(monkeypatch):
+    run_all('@DEF@ square(n) @IS@ n @*@ n @END@', '@DEF@ add(x, y) @IS@ x @+@ y @END@')
+    calls = []
+    execute = Function.execute
+
+    def counting_execute(self, *args):
+        calls.append(self.name)
+        return execute(self, *args)
+    monkeypatch.setattr(Function, 'execute', counting_execute)
+
+    assert run_all('add(square(3), square(add(1, 1)))', '@FOR@ i @IN@ @RANGE@(0, 5) @DO@ square(i) @END@') == \
+           [13, [0, 1, 4, 9, 16]]
+    assert calls == []
+    assert sorted(interpreter.global_symbol_table.symbols) == ['add', 'i', 'square']
+
+
+def test_a_redefinition_is_called():
+    run_all('@DEF@ square(n) @IS@ n @*@ n @END@', '@DEF@ g(x) @IS@ square(x) @+@ 1 @END@')
+    assert run_all('g(3)', '@DEF@ square(n) @IS@ n @+@ n @END@', 'g(3)')[::2] == [10, 7]
+    assert run_all('@DEF@ square(n) @IS@ add(n, 1) @END@', '@DEF@ add(x, y) @IS@ x @-@ y @END@', 'g(3)')[2] == 3
+    assert run_all('@DEF@ square(n) @IS@ n @*@ n @*@ n @END@', 'g(3)')[1] == 28
+
+
+@pytest.mark.parametrize('engine', ('closure', 'vm', 'python'))
+def test_a_redefinition_by_another_engine_is_called(engine):
+    run_all('@DEF@ square(n) @IS@ n @*@ n @END@', '@DEF@ g(x) @IS@ square(x) @+@ 1 @END@')
+    assert run_all('g(3)') == [10]
+    assert run('<test>', '@DEF@ square(n) @IS@ n @-@ n @END@', engine=engine)[1] is None
+    assert run_all('g(3)') == [1]
@@ -0,0 +1,99 @@
+import os
+import re
+
+import pytest
+
+import interpreter
+from interpreter import ENGINES, run, run_file
+from lexer import my_RegexLexer
+from parser import IterativeParser, Parser
+
+# IterativeParser runs the same generator productions as Parser with an explicit stack instead of recursion,
+# so it builds the same trees for any input and also parses nesting far deeper than Python's recursion limit.
+# Evaluating such a tree can still run into that limit, which is a runtime error of the statement.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_FILES = ('basic_tests.txt', 'function_tests.txt', 'if_tests.txt', 'lambda_tests.txt', 'recursion_tests.txt')
+
+DEPTH = 20000
+
+SHAPES = {
+    'parens': ('(', '1', ')'),
+    'sums': ('(1 @+@ ', '1', ')'),
+    'negations': ('@-@ ', '1', ''),
+    'ifs': ('@IF@ @TRUE@ @THEN@ ', '1', ' @ELSE@ 2 @END@'),
+    'calls': ('f(', '1', ')'),
+    'lambdas': ('(@LAMBDA@ (x) @:@ ', 'x', ')'),
+}
+
+
+def nested(shape, depth):
+    prefix, middle, suffix = SHAPES[shape]
+    return prefix * depth + middle + suffix * depth
+
+
+def program_tree(parser_class, text):
+    return parser_class(my_RegexLexer('<test>', text, program=True).iter_tokens()).statements().node
+
+
+def line_tree(parser_class, text):
+    tokens, error = my_RegexLexer('<test>', text).make_tokens()
+    assert error is None
+    return parser_class(tokens).parse().node
+
+
+def test_the_grammar_is_written_once():
+    assert [name for name in vars(IterativeParser) if not name.startswith('__')] == ['run']
+
+
+@pytest.mark.parametrize('sample', SAMPLE_FILES)
+def test_samples_parse_the_same(sample):
+    with open(os.path.join(PROJECT_DIR, sample)) as file:
+        text = file.read()
+    assert repr(program_tree(IterativeParser, text)) == repr(program_tree(Parser, text))
+
+
+@pytest.mark.parametrize('shape', sorted(SHAPES))
+def test_moderate_nesting_parses_the_same(shape):
+    text = nested(shape, 100)
+    assert repr(line_tree(IterativeParser, text)) == repr(line_tree(Parser, text))
+
+
+@pytest.mark.parametrize('shape', sorted(SHAPES))
+def test_deep_nesting_only_parses_iteratively(shape):
+    text = nested(shape, DEPTH)
+    assert line_tree(IterativeParser, text) is not None
+    with pytest.raises(RecursionError):
+        line_tree(Parser, text)
+
+
+@pytest.mark.parametrize('optimize', (False, True))
+@pytest.mark.parametrize('engine', ENGINES)
+def test_evaluating_too_deep_a_tree_is_a_runtime_error(engine, optimize, tmp_path, capsys):
+    path = tmp_path / 'deep.txt'
+    path.write_text(nested('sums', DEPTH) + '\n' + nested('ifs', DEPTH) + '\n5\n')
+    interpreter.global_symbol_table.clear()
+    run_file(str(path), cache=False, iterative=True, engine=engine, optimize=optimize)
+    out = capsys.readouterr().out
+    assert out.count('Runtime Error: Maximum recursion depth exceeded') == 2
+    assert out.endswith('Line 3: 5\nOutput: 5\n\n')
+
+
+@pytest.mark.parametrize('engine', ('tree', 'closure', 'python'))
+def test_deep_recursion_is_a_runtime_error(engine):
+    interpreter.global_symbol_table.clear()
+    run('<test>', '@DEF@ f(n) @IS@ @IF@ n @==@ 0 @THEN@ 0 @ELSE@ 1 @+@ f(n @-@ 1) @END@ @END@', engine=engine)
+    result, error = run('<test>', 'f(100000)', engine=engine)
+    assert result is None
+    assert error.as_string().endswith('Runtime Error: Maximum recursion depth exceeded')
+    assert run('<test>', 'f(10)', engine=engine) == (10, None)
+
+
+def test_a_flat_tree_too_deep_to_evaluate_is_a_runtime_error(tmp_path, capsys):
+    path = tmp_path / 'deep.txt'
+    path.write_text(nested('sums', DEPTH) + '\n7\n')
+    interpreter.global_symbol_table.clear()
+    run_file(str(path), cache=False, iterative=True, flat=True)
+    out = re.sub(r'Line 1: .*', 'Line 1:', capsys.readouterr().out)
+    assert out.endswith('Runtime Error: Maximum recursion depth exceeded\n\nLine 2: 7\nOutput: 7\n\n')
@@ -0,0 +1,73 @@
+import pytest
+
+import interpreter
+from interpreter import Closure, Function, compile_program, make_evaluator, run
+from runtime import SymbolTable
+
+# A @LAMBDA@ that reads nothing but its parameters evaluates to the one Function made for its LambdaNode; one
+# that reads other names evaluates to a Closure, which only holds that Function, the frame and the context.
+
+
+@pytest.fixture(autouse=True)
+def clear_globals():
+    interpreter.global_symbol_table.clear()
+
+
+@pytest.fixture
+def made(monkeypatch):
+    # The Functions made, in order
+    functions = []
+    init = Function.__init__
+
+    def counting_init(self, *args, **kwargs):
+        functions.append(self)
+        init(self, *args, **kwargs)
+    monkeypatch.setattr(Function, '__init__', counting_init)
+    return functions
+
+
+def test_a_closed_lambda_is_made_once(made):
+    values, error = run('<test>', '@FOR@ i @IN@ @RANGE@(0, 100) @DO@ @LAMBDA@ (x) @:@ x @*@ 2 @END@')
+    assert error is None
+    assert len(made) == 1 and all(value is made[0] for value in values)
+
+    values, error = run('<test>', '@FOR@ i @IN@ @RANGE@(0, 100) @DO@ (@LAMBDA@ (x) @:@ x @*@ 2)(i) @END@')
+    assert values == list(range(0, 200, 2))
+    assert len(made) == 2
+
+
+def test_a_closed_lambda_in_a_function_is_made_once(made):
+    run('<test>', '@DEF@ make(n) @IS@ @LAMBDA@ (x) @:@ x @+@ 1 @END@')
+    first, second = run('<test>', 'make(1)')[0], run('<test>', 'make(2)')[0]
+    assert first is second
+    assert [type(function) for function in made] == [Function, Function]
+
+
+def test_a_lambda_that_reads_other_names_is_a_closure(made):
+    run('<test>', '@DEF@ adder(n) @IS@ @LAMBDA@ (x) @:@ x @+@ n @END@')
+    first, second = run('<test>', 'adder(1)')[0], run('<test>', 'adder(2)')[0]
+    assert type(first) is Closure and first is not second
+    assert first.function is second.function
+    assert not hasattr(first, '__dict__')
+    assert repr(first).startswith('<interpreter.Function object at 0x')
+
+    assert run('<test>', '(@LAMBDA@ (g) @:@ g(10))(adder(5))') == (15, None)
+    assert run('<test>', '(@LAMBDA@ (g) @:@ g(10))(adder(7))') == (17, None)
+    assert len(made) == 4  # adder, its lambda and the lambda of each statement calling g
+
+
+def test_errors_in_a_lambda_are_reported_from_its_context():
+    run('<test>', '@DEF@ divider(n) @IS@ @LAMBDA@ (x) @:@ x @/@ n @END@')
+    result, error = run('<test>', '(@LAMBDA@ (g) @:@ g(10))(divider(0))')
+    assert error.details == 'Attempted to divide by zero'
+    result, error = run('<test>', '(@LAMBDA@ (x) @:@ x)(1, 2)')
+    assert error.details == '1 arguments expected, got 2'
+
+
+def test_a_lambda_is_made_again_for_another_global_table():
+    node = compile_program('<test>', '@LAMBDA@ (x) @:@ x').element_nodes[0]
+    first_table, second_table = SymbolTable(), SymbolTable()
+    first = make_evaluator('tree', first_table)(node)[0]
+    assert make_evaluator('tree', first_table)(node)[0] is first
+    second = make_evaluator('tree', second_table)(node)[0]
+    assert second is not first and second.symbol_table is second_table
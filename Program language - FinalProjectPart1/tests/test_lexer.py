@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from lexer import my_Lexer, my_RegexLexer
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_FILES = ('basic_tests.txt', 'function_tests.txt', 'if_tests.txt', 'lambda_tests.txt', 'recursion_tests.txt')
+
+BAD_LINES = ('1 $ 2', '@FOO@ 1', 'x @+@ @', '3 @* 4', 'f(1, 2) #', '@IF@ x @THEN@ 1 @ELSE @END@')
+
+
+def sample_lines():
+    for sample in SAMPLE_FILES:
+        with open(os.path.join(PROJECT_DIR, sample)) as file:
+            yield from (line.strip() for line in file if line.strip())
+
+
+def token_list(tokens):
+    return [(tok.type, tok.value, tok.pos_start.idx, tok.pos_start.ln, tok.pos_start.col) for tok in tokens]
+
+
+@pytest.mark.parametrize('line', list(sample_lines()))
+def test_regex_lexer_matches_the_old_lexer(line):
+    old_tokens, old_error = my_Lexer('<test>', line).make_tokens()
+    new_tokens, new_error = my_RegexLexer('<test>', line).make_tokens()
+
+    assert old_error is None and new_error is None
+    assert token_list(new_tokens) == token_list(old_tokens)
+
+
+@pytest.mark.parametrize('line', BAD_LINES)
+def test_regex_lexer_reports_the_same_errors(line):
+    _, old_error = my_Lexer('<test>', line).make_tokens()
+    _, new_error = my_RegexLexer('<test>', line).make_tokens()
+
+    assert old_error is not None
+    assert new_error.as_string() == old_error.as_string()
@@ -0,0 +1,126 @@
+import os
+import tracemalloc
+
+import pytest
+
+import interpreter
+from interpreter import ENGINES, LOOP_MODES, compile_program, make_evaluator, run_file
+from runtime import LoopValues, RuntimeFailure, SymbolTable
+
+# --loops lazy leaves a @FOR@ statement's values to be produced while they are printed, --loops discard keeps
+# only the last one. Neither holds all the values of a loop at once.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_FILES = ('basic_tests.txt', 'function_tests.txt', 'if_tests.txt', 'lambda_tests.txt', 'recursion_tests.txt')
+
+PROGRAM = ('@FOR@ i @IN@ @RANGE@(0, 5) @DO@ i @*@ i @END@\n'
+           '@FOR@ i @IN@ @RANGE@(0, 5) @DO@ 10 @/@ (3 @-@ i) @END@\n'
+           '@FOR@ i @IN@ @RANGE@(0, 0) @DO@ i @END@\n'
+           'i\n'
+           '@FOR@ i @IN@ @RANGE@(0, 3) @DO@ (i @+@ 1) @*@ (i @+@ 1) @END@\n')
+
+LOOP = '@FOR@ i @IN@ @RANGE@(0, 5) @DO@ 10 @/@ (3 @-@ i) @END@'
+
+
+def file_output(path, capsys, loops, optimize=False):
+    interpreter.global_symbol_table.clear()
+    run_file(str(path), cache=False, loops=loops, optimize=optimize)
+    return capsys.readouterr().out
+
+
+def evaluator(loops, symbol_table=None):
+    return make_evaluator('tree', symbol_table if symbol_table is not None else SymbolTable(), loops=loops)
+
+
+def statement(text):
+    return compile_program('<test>', text).element_nodes[0]
+
+
+@pytest.fixture
+def program(tmp_path):
+    path = tmp_path / 'loops.txt'
+    path.write_text(PROGRAM)
+    return path
+
+
+@pytest.mark.parametrize('sample', SAMPLE_FILES)
+def test_samples_print_the_same_lazily(sample, capsys):
+    path = os.path.join(PROJECT_DIR, sample)
+    assert file_output(path, capsys, 'lazy') == file_output(path, capsys, 'list')
+
+
+def test_lazy_loops_print_their_values_up_to_an_error(program, capsys):
+    listed = file_output(program, capsys, 'list').split('\n\n')
+    lazy = file_output(program, capsys, 'lazy').split('\n\n')
+    assert lazy[1] == listed[1].replace('Error:', 'Output: [3, 5, 10\nError:')
+    assert lazy[:1] + lazy[2:] == listed[:1] + listed[2:]
+
+
+def test_discarded_loops_print_their_last_value(program, capsys):
+    outputs = [block.splitlines()[1] for block in file_output(program, capsys, 'discard').split('\n\n') if block]
+    assert outputs == ['Output: 16', 'Error: Division by Zero: Attempted to divide by zero', 'Output: None',
+                       'Output: 3', 'Output: 9']
+
+
+@pytest.mark.parametrize('loops', LOOP_MODES)
+def test_optimized_loops_print_the_same(program, capsys, loops):
+    # -O wraps the last loop in the scope of its shared value
+    assert file_output(program, capsys, loops, optimize=True) == file_output(program, capsys, loops)
+
+
+def test_a_lazy_loop_runs_when_it_is_iterated():
+    symbol_table = SymbolTable()
+    value, error = evaluator('lazy', symbol_table)(statement(LOOP))
+    assert error is None and isinstance(value, LoopValues)
+    assert symbol_table.get('i') is None
+
+    values = iter(value)
+    assert [next(values), next(values)] == [3, 5]
+    assert symbol_table.get('i') == 1
+    assert next(values) == 10
+    with pytest.raises(RuntimeFailure) as failure:
+        next(values)
+    assert failure.value.error.error_name == 'Division by Zero'
+
+
+def test_errors_of_the_range_are_raised_when_iterated():
+    value, error = evaluator('lazy')(statement('@FOR@ i @IN@ @RANGE@(0, nope) @DO@ i @END@'))
+    assert error is None
+    with pytest.raises(RuntimeFailure):
+        list(value)
+
+
+@pytest.mark.parametrize('loops', ('lazy', 'discard'))
+def test_other_statements_are_not_affected(loops):
+    evaluate = evaluator(loops)
+    assert evaluate(statement('@DEF@ f(n) @IS@ @FOR@ i @IN@ @RANGE@(0, n) @DO@ i @END@ @END@'))[1] is None
+    assert evaluate(statement('f(3)')) == ([0, 1, 2], None)
+    assert evaluate(statement('1 @+@ 1')) == (2, None)
+
+
+def peak_memory(loops):
+    evaluate = evaluator(loops)
+    node = statement('@FOR@ i @IN@ @RANGE@(0, 50000) @DO@ i @*@ 1000 @END@')
+    tracemalloc.start()
+    try:
+        value, error = evaluate(node)
+        if loops == 'lazy':
+            for _ in value:
+                pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_lazy_and_discarded_loops_keep_constant_memory():
+    listed = peak_memory('list')
+    assert listed > 1000000
+    assert peak_memory('lazy') < listed / 10
+    assert peak_memory('discard') < listed / 10
+
+
+@pytest.mark.parametrize('engine', [engine for engine in ENGINES if engine != 'tree'])
+def test_loop_modes_are_only_for_the_tree_engine(engine):
+    with pytest.raises(ValueError):
+        make_evaluator(engine, SymbolTable(), loops='lazy')
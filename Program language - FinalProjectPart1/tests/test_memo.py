@@ -0,0 +1,112 @@
+import pytest
+
+import interpreter
+from interpreter import run
+from lexer import my_RegexLexer
+from memo import memo_stats, pure_callees
+from parser import Parser
+
+# With memo_size, a pure @DEF@ function (see memo.py) answers repeated calls from an LRU cache of its results.
+# The results are exactly those without the cache, also after a function it depends on is redefined.
+
+FIB = '@DEF@ fib(n) @IS@ @IF@ n @<@ 2 @THEN@ n @ELSE@ fib(n @-@ 1) @+@ fib(n @-@ 2) @END@ @END@'
+
+
+def run_all(*texts, memo_size=1024):
+    results = []
+    for text in texts:
+        result, error = run('<test>', text, memo_size=memo_size)
+        assert error is None, error.as_string()
+        results.append(result)
+    return results
+
+
+def stats(name):
+    return memo_stats(interpreter.global_symbol_table).get(name)
+
+
+@pytest.fixture(autouse=True)
+def clear_globals():
+    interpreter.global_symbol_table.clear()
+
+
+def body_callees(text):
+    tokens, _ = my_RegexLexer('<test>', text).make_tokens()
+    node = Parser(tokens).parse().node
+    return pure_callees(node.body_node, [arg_tok.value for arg_tok in node.arg_name_toks])
+
+
+@pytest.mark.parametrize('text, callees', [
+    (FIB, ['fib']),
+    ('@DEF@ f(x, y) @IS@ @IF@ x @THEN@ g(y) @ELSEIF@ y @THEN@ h(x) @ELSE@ @-@ g(1) @END@ @END@', ['g', 'h']),
+    ('@DEF@ f(x) @IS@ x @+@ limit @END@', None),
+    ('@DEF@ f(x) @IS@ @FOR@ i @IN@ @RANGE@(0, x) @DO@ i @END@ @END@', None),
+    ('@DEF@ f(x) @IS@ @LAMBDA@ (y) @:@ y @END@', None),
+    ('@DEF@ f(g) @IS@ g(1) @END@', None),
+])
+def test_purity_of_a_body(text, callees):
+    assert body_callees(text) == callees
+
+
+def test_fibonacci_counts_each_argument_once():
+    assert run_all(FIB, 'fib(30)')[1] == 832040
+    assert stats('fib') == (28, 31, 31)
+    assert run_all('fib(30)') == [832040]
+    assert stats('fib') == (29, 31, 31)
+
+
+def test_results_are_the_same_without_the_cache():
+    texts = (FIB, '@DEF@ both(n) @IS@ fib(n) @*@ fib(n @+@ 1) @END@', 'both(10)', 'both(15)', 'fib(1)',
+             'fib(@TRUE@)', 'fib(@FALSE@)')
+    expected = run_all(*texts, memo_size=0)
+    interpreter.global_symbol_table.clear()
+    assert run_all(*texts) == expected
+
+
+def test_true_and_one_are_different_arguments():
+    run_all('@DEF@ same(x) @IS@ x @END@')
+    assert run_all('same(1)', 'same(@TRUE@)', 'same(0)', 'same(@FALSE@)') == [1, True, 0, False]
+    assert [type(value) for value in run_all('same(@TRUE@)', 'same(1)')] == [bool, int]
+
+
+def test_least_recently_used_results_are_dropped():
+    run_all('@DEF@ square(x) @IS@ x @*@ x @END@', 'square(1)', 'square(2)', 'square(1)', 'square(3)', memo_size=2)
+    assert stats('square') == (1, 3, 2)
+    run_all('square(1)', 'square(2)', memo_size=2)  # 2 was the least recently used one
+    assert stats('square') == (2, 4, 2)
+
+
+def test_tail_calls_store_every_result_on_the_way():
+    run_all('@DEF@ down(n) @IS@ @IF@ n @==@ 0 @THEN@ 0 @ELSE@ down(n @-@ 1) @END@ @END@', 'down(100)')
+    assert stats('down') == (0, 101, 101)
+    run_all('down(50)')
+    assert stats('down') == (1, 101, 101)
+
+
+def test_redefining_a_callee_drops_the_results():
+    run_all('@DEF@ g(x) @IS@ x @+@ 1 @END@', '@DEF@ f(x) @IS@ g(x) @*@ 10 @END@')
+    assert run_all('f(1)', 'f(1)') == [20, 20]
+    assert stats('f') == (1, 1, 1)
+
+    assert run_all('@DEF@ g(x) @IS@ x @+@ 2 @END@', 'f(1)')[1] == 30
+    assert stats('f') == (1, 2, 1)
+
+
+def test_a_callee_that_reads_globals_is_not_memoized():
+    run_all('@DEF@ g(x) @IS@ x @+@ n @END@', '@DEF@ f(x) @IS@ g(x) @END@', '@FOR@ n @IN@ @RANGE@(0, 2) @DO@ n @END@')
+    assert run_all('f(1)', '@FOR@ n @IN@ @RANGE@(0, 5) @DO@ n @END@', 'f(1)')[::2] == [2, 5]
+    assert stats('f') == (0, 0, 0)
+    assert stats('g') is None
+
+
+def test_redefining_a_callee_as_impure_stops_memoizing():
+    run_all('@DEF@ g(x) @IS@ x @END@', '@DEF@ f(x) @IS@ g(x) @END@', 'f(1)', 'f(1)')
+    assert stats('f') == (1, 1, 1)
+    run_all('@DEF@ g(x) @IS@ x @+@ n @END@', '@FOR@ n @IN@ @RANGE@(0, 4) @DO@ n @END@')
+    assert run_all('f(1)') == [4]
+    assert stats('f') == (1, 1, 0)
+
+
+def test_memoization_is_only_for_the_tree_engine():
+    with pytest.raises(ValueError):
+        run('<test>', FIB, engine='vm', memo_size=16)
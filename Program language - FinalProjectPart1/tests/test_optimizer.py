@@ -0,0 +1,116 @@
+import os
+import random
+import re
+
+import pytest
+
+import interpreter
+from interpreter import ENGINES, run, run_file
+from lexer import my_RegexLexer
+from optimizer import Optimizer
+from parser import Parser
+
+# Differential test of -O: every program must print the same with and without the optimizer, on every engine.
+# The programs are the sample files and small random ones built from what the optimizer rewrites: constant
+# operands, @IF@ branches that can never be taken, repeated subexpressions and calls of small functions.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_FILES = ('basic_tests.txt', 'function_tests.txt', 'if_tests.txt', 'lambda_tests.txt', 'recursion_tests.txt')
+
+OPERATORS = ('@+@', '@-@', '@*@', '@/@', '@%@', '@<@', '@>@', '@==@', '@!=@', '@&@', '@|@')
+
+
+def random_expression(rng, depth, names):
+    choice = rng.random()
+    if depth == 0 or choice < 0.3:
+        return rng.choice(names + ['0', '1', '3', '@TRUE@', '@FALSE@'])
+    if choice < 0.4:
+        return f'(@-@ {random_expression(rng, depth - 1, names)})'
+    if choice < 0.5:
+        return (f'@IF@ {random_expression(rng, depth - 1, names)} @THEN@ {random_expression(rng, depth - 1, names)} '
+                f'@ELSE@ {random_expression(rng, depth - 1, names)} @END@')
+    if choice < 0.55:
+        return f'(@LAMBDA@ (x) @:@ x @+@ {random_expression(rng, depth - 1, names)})(2)'
+    left = random_expression(rng, depth - 1, names)
+    return f'({left} {rng.choice(OPERATORS)} {left if rng.random() < 0.2 else random_expression(rng, depth - 1, names)})'
+
+
+def random_program(seed):
+    rng = random.Random(seed)
+    lines = [
+        f"@DEF@ f(a, b) @IS@ {random_expression(rng, 3, ['a', 'b'])} @END@",
+        f"@DEF@ g(c) @IS@ {random_expression(rng, 2, ['c'])} @END@",
+    ]
+    calls = ['f(1, 2)', 'g(3)', '2']
+    for _ in range(6):
+        if rng.random() < 0.2:
+            lines.append(f"@FOR@ i @IN@ @RANGE@(0, 4) @DO@ {random_expression(rng, 2, calls + ['i'])} @END@")
+        elif rng.random() < 0.5:
+            lines.append(f"f({random_expression(rng, 2, calls)}, {random_expression(rng, 2, calls)})")
+        else:
+            lines.append(f"g({random_expression(rng, 2, calls)})")
+    return '\n'.join(lines) + '\n'
+
+
+def run_output(filename, engine, optimize, capsys):
+    interpreter.global_symbol_table.clear()
+    try:
+        run_file(filename, cache=False, engine=engine, optimize=optimize)
+        crash = ''
+    except ZeroDivisionError as e:
+        crash = f'{type(e).__name__}: {e}'  # @%@ by zero is not an @ error yet, in any engine
+    # Function values print with their address
+    return re.sub(r'0x[0-9a-f]+', '0x', capsys.readouterr().out) + crash
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('sample', SAMPLE_FILES)
+def test_samples_print_the_same_with_and_without_optimize(sample, engine, capsys):
+    filename = os.path.join(PROJECT_DIR, sample)
+    assert run_output(filename, engine, True, capsys) == run_output(filename, engine, False, capsys)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_random_programs_print_the_same_with_and_without_optimize(engine, tmp_path, capsys):
+    for seed in range(40):
+        program = tmp_path / f'program_{seed}.txt'
+        program.write_text(random_program(seed))
+        expected = run_output(str(program), engine, False, capsys)
+        assert run_output(str(program), engine, True, capsys) == expected, program.read_text()
+
+
+# The rewrites themselves, on the trees of single statements
+
+@pytest.mark.parametrize('text, expected', [
+    ('3 @*@ 3 @==@ 9', 'T_BOOLEAN:True'),
+    ('@-@ (2 @+@ 3)', 'T_INT:-5'),
+    ('7 @/@ 2', 'T_INT:3'),
+    ('x @+@ 2 @*@ 3', '(T_IDENTIFIER:x T_PLUS T_INT:6)'),
+    ('@NOT@ (1 @<@ 2) @|@ x', '(T_BOOLEAN T_OR T_IDENTIFIER:x)'),
+    ('1 @/@ 0', '(T_INT:1 T_DIV T_INT)'),
+    ('@IF@ 3 @*@ 3 @==@ 9 @THEN@ 5 @/@ 1 @ELSE@ 0 @END@', 'T_INT:5'),
+    ('@IF@ @FALSE@ @THEN@ 1 @ELSE@ x @END@', 'T_IDENTIFIER:x'),
+    ('@IF@ x @THEN@ 1 @ELSEIF@ @FALSE@ @THEN@ 2 @ELSEIF@ @TRUE@ @THEN@ 3 @ELSEIF@ y @THEN@ 4 @ELSE@ 5 @END@',
+     '@IF@ T_IDENTIFIER:x @THEN@ T_INT:1 @ELSE@ T_INT:3 @END@'),
+    ('@IF@ x @THEN@ 1 @ELSEIF@ @FALSE@ @THEN@ 2 @END@', '@IF@ T_IDENTIFIER:x @THEN@ T_INT:1 @END@'),
+    ('@DEF@ f(a) @IS@ a @*@ (2 @+@ 2) @END@',
+     '@DEF@ T_IDENTIFIER:f(T_IDENTIFIER:a) @IS@ (T_IDENTIFIER:a T_MUL T_INT:4) @END@'),
+])
+def test_constants_are_folded_and_dead_branches_dropped(text, expected):
+    tokens, _ = my_RegexLexer('<test>', text).make_tokens()
+    assert repr(Optimizer().optimize(Parser(tokens).parse().node)) == expected
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('text', ['2 @*@ 3 @/@ (1 @-@ 1)', '@IF@ @TRUE@ @THEN@ 5 @/@ 0 @END@',
+                                  '@DEF@ f(x) @IS@ @IF@ 1 @>@ 2 @THEN@ x @ELSE@ 1 @/@ 0 @END@ @END@\nf(1)'])
+def test_constant_division_by_zero_is_reported_the_same(engine, text):
+    errors = []
+    for optimize in (False, True):
+        interpreter.global_symbol_table.clear()
+        for line in text.splitlines():
+            result, error = run('<test>', line, engine=engine, optimize=optimize)
+        errors.append(error.as_string())
+    assert errors[0] == errors[1]
+    assert errors[0].startswith('Division by Zero')
@@ -0,0 +1,92 @@
+import pytest
+
+import interpreter
+from interpreter import ENGINES, Function, Interpreter, compile_program, make_evaluator, run
+from parallel import PARALLEL_MIN_LENGTH, parallel_loop
+from runtime import SymbolTable
+
+# With workers, a @FOR@ loop with a pure body is split into chunks that run in worker processes; its values come
+# back in order, and an error stops the loop where it would have stopped without workers.
+
+WORKERS = 2
+
+FIB = '@DEF@ fib(n) @IS@ @IF@ n @<@ 2 @THEN@ n @ELSE@ fib(n @-@ 1) @+@ fib(n @-@ 2) @END@ @END@'
+
+LOOPS = (
+    '@FOR@ i @IN@ @RANGE@(0, 200) @DO@ fib(i @%@ 12) @*@ scale @END@',
+    '@FOR@ i @IN@ @RANGE@(-100, 300, 3) @DO@ @IF@ i @>@ 0 @THEN@ i @*@ i @ELSE@ @-@ i @END@ @END@',
+    '@FOR@ i @IN@ @RANGE@(0, 100) @DO@ 1000 @/@ (i @-@ 70) @END@',  # fails at i = 70
+    '@FOR@ i @IN@ @RANGE@(0, 100) @DO@ i @+@ nope @END@',
+    '@FOR@ i @IN@ @RANGE@(0, 100) @DO@ wrap(i) @END@',
+    'total(100)',
+    'i',
+)
+
+
+def outcomes(workers):
+    interpreter.global_symbol_table.clear()
+    results = []
+    for text in (FIB, '@FOR@ scale @IN@ @RANGE@(3, 4) @DO@ scale @END@', '@DEF@ wrap(x) @IS@ [x, fib(5)] @END@',
+                 '@DEF@ total(n) @IS@ @FOR@ j @IN@ @RANGE@(0, n) @DO@ j @*@ scale @END@ @END@') + LOOPS:
+        result, error = run('<test>', text, workers=workers)
+        results.append(result if error is None else error.as_string())
+    return results
+
+
+def loop_in(symbol_table, text):
+    node = compile_program('<test>', text).element_nodes[0]
+    start, end = node.start_value_node.tok.value, node.end_value_node.tok.value
+    return parallel_loop(Interpreter(symbol_table), Function, node.var_name_tok.value, node.body_node,
+                         start, end, 1, WORKERS)
+
+
+def test_values_are_the_serial_values_in_order():
+    assert outcomes(WORKERS) == outcomes(0)
+
+
+def test_the_loop_variable_is_left_as_without_workers():
+    for workers in (0, WORKERS):
+        interpreter.global_symbol_table.clear()
+        run('<test>', '@FOR@ i @IN@ @RANGE@(0, 100) @DO@ i @*@ 2 @END@', workers=workers)
+        assert interpreter.global_symbol_table.get('i') == 99
+        run('<test>', '@FOR@ i @IN@ @RANGE@(0, 100) @DO@ 10 @/@ (i @-@ 70) @END@', workers=workers)
+        assert interpreter.global_symbol_table.get('i') == 70
+
+
+def test_a_pure_loop_is_sent_to_the_workers():
+    symbol_table = SymbolTable()
+    make_evaluator('tree', symbol_table)(compile_program('<test>', FIB).element_nodes[0])
+    values, next_value = loop_in(symbol_table, '@FOR@ i @IN@ @RANGE@(0, 100) @DO@ fib(i @%@ 10) @END@')
+    assert next_value == 100
+    assert values[:12] == [0, 1, 1, 2, 3, 5, 8, 13, 21, 34, 0, 1]
+
+
+@pytest.mark.parametrize('definition, text', [
+    ('', '@FOR@ i @IN@ @RANGE@(0, 100) @DO@ @FOR@ j @IN@ @RANGE@(0, i) @DO@ j @END@ @END@'),
+    ('', '@FOR@ i @IN@ @RANGE@(0, 100) @DO@ (@LAMBDA@ (x) @:@ x)(i) @END@'),
+    ('@DEF@ f(x) @IS@ x @END@', '@FOR@ i @IN@ @RANGE@(0, 100) @DO@ f @END@'),         # a function as a value
+    ('@DEF@ f(x) @IS@ @LAMBDA@ (y) @:@ y @END@', '@FOR@ i @IN@ @RANGE@(0, 100) @DO@ f(i) @END@'),
+    ('@DEF@ f(g) @IS@ g(1) @END@', '@FOR@ i @IN@ @RANGE@(0, 100) @DO@ f(i) @END@'),
+    ('', f'@FOR@ i @IN@ @RANGE@(0, {PARALLEL_MIN_LENGTH - 1}) @DO@ i @END@'),     # too short
+])
+def test_other_loops_run_serially(definition, text):
+    symbol_table = SymbolTable()
+    if definition:
+        make_evaluator('tree', symbol_table)(compile_program('<test>', definition).element_nodes[0])
+    assert loop_in(symbol_table, text) is None
+
+
+@pytest.mark.parametrize('engine', [engine for engine in ENGINES if engine != 'tree'])
+def test_functions_of_other_engines_run_serially(engine):
+    symbol_table = SymbolTable()
+    make_evaluator(engine, symbol_table)(compile_program('<test>', '@DEF@ f(x) @IS@ x @END@').element_nodes[0])
+    assert loop_in(symbol_table, '@FOR@ i @IN@ @RANGE@(0, 100) @DO@ f(i) @END@') is None
+
+
+def test_workers_are_checked():
+    with pytest.raises(ValueError):
+        make_evaluator('tree', SymbolTable(), workers=-1)
+    for engine in ENGINES:
+        if engine != 'tree':
+            with pytest.raises(ValueError):
+                make_evaluator(engine, SymbolTable(), workers=WORKERS)
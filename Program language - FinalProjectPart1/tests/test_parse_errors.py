@@ -0,0 +1,71 @@
+import pytest
+
+from lexer import my_Lexer, my_RegexLexer
+from parser import ErrorNode, IterativeParser, ParseError, Parser
+
+# Productions raise ParseError and parse() hands the error back in a ParseResult. The messages and positions
+# are the ones the ParseResult-per-production parser reported; they were recorded from it.
+
+ERRORS = {
+    '1 @+@': ('Invalid Syntax', 'Expected expression after operator', 2, 3),
+    '1 @+@ 2 3': ('Invalid Syntax', "Expected '+', '-', '*', '/', '%', '==', '!=', '<', '>', '<=', '>=', 'AND' or 'OR'",
+                  8, 9),
+    '(1 @+@ 2': ('Invalid Syntax', "Expected ')'", 0, 8),
+    '@DEF@ f(x) @IS@ x': ('Invalid Syntax', "Expected '@END@'", 17, 17),
+    '@DEF@ (x) @IS@ x @END@': ('Invalid Syntax', 'Expected identifier', 6, 7),
+    '@DEF@ f x @IS@ x @END@': ('Invalid Syntax', "Expected '('", 8, 9),
+    '@DEF@ f(x) x @END@': ('Invalid Syntax', "Expected '@IS@'", 11, 12),
+    '@DEF@ f(x @IS@ x @END@': ('Invalid Syntax', "Expected ')'", 10, 11),
+    '@IF@': ('Invalid Syntax', "Unexpected end of input after '@IF@'. Expected a condition.", 1, 1),
+    '@IF@ 1': ('Invalid Syntax', "Unexpected end of input. Expected '@THEN@' and an expression after the condition.",
+               6, 6),
+    '@IF@ 1 @THEN@ 2': ('Invalid Syntax', "Expected '@END@' at the end of IF expression", 15, 15),
+    '@IF@ 1 @THEN@ 2 @ELSE@ 3': ('Invalid Syntax', "Expected '@END@' at the end of IF expression", 24, 24),
+    '@FOR@ i @IN@ @RANGE@(0, 3) @DO@ i': ('Invalid Syntax', "Unexpected end of input. Expected '@END@'.", 33, 33),
+    '@FOR@ @IN@': ('Invalid Syntax', 'Expected identifier', 6, 7),
+    '@FOR@ i @IN@ @RANGE@(0 3) @DO@ i @END@': ('Illegal Character', "Expected ','", 23, 24),
+    '@LAMBDA@ (x) x': ('Invalid Syntax', "Expected '@:@'", 13, 14),
+    '@LAMBDA@ x @:@ x': ('Invalid Syntax', "Expected '('", 9, 10),
+    '@*@ 2': ('Invalid Syntax', "Expected INT, IDENTIFIER, '+', '-', '(', or 'LAMBDA'", 0, 1),
+    ')': ('Invalid Syntax', "Expected INT, IDENTIFIER, '+', '-', '(', or 'LAMBDA'", 0, 1),
+    '(@LAMBDA@ (x) @:@ x)(1 2)': ('Illegal Character', "Expected ',' or ')'", 23, 24),
+    '1 @==@': ('Invalid Syntax', 'Unexpected end of input', 3, 3),
+    # The old parser crashed on this one
+    'f(1,': ('Invalid Syntax', 'Unexpected end of input', 4, 4),
+}
+
+
+def describe(error):
+    return error.error_name, error.details, error.pos_start.idx, error.pos_end.idx
+
+
+@pytest.mark.parametrize('parser_class', (Parser, IterativeParser))
+@pytest.mark.parametrize('lexer_class', (my_Lexer, my_RegexLexer))
+@pytest.mark.parametrize('text', sorted(ERRORS))
+def test_parse_reports_the_same_errors(text, lexer_class, parser_class):
+    tokens, error = lexer_class('<test>', text).make_tokens()
+    assert error is None
+    result = parser_class(tokens).parse()
+    assert result.node is None
+    assert describe(result.error) == ERRORS[text]
+
+
+def test_productions_raise_parse_error():
+    tokens, _ = my_RegexLexer('<test>', '1 @+@').make_tokens()
+    parser = Parser(tokens)
+    with pytest.raises(ParseError) as raised:
+        parser.run(parser.expr())
+    assert describe(raised.value.error) == ERRORS['1 @+@']
+
+
+@pytest.mark.parametrize('parser_class', (Parser, IterativeParser))
+def test_failed_statements_become_error_nodes(parser_class):
+    texts = ['1 @+@ 2', '@LAMBDA@ (x) x', '4', ')']
+    text = '\n'.join(texts)
+    node = parser_class(my_RegexLexer('<test>', text, program=True).iter_tokens()).statements().node
+    assert [type(statement) is ErrorNode for statement in node.element_nodes] == [False, True, False, True]
+
+    offset = len(texts[0]) + 1
+    name, details, start, end = describe(node.element_nodes[1].error)
+    assert (name, details, start - offset, end - offset) == ERRORS['@LAMBDA@ (x) x']
+    assert repr(node.element_nodes[2]) == 'T_INT:4'
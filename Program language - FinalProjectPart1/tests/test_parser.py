@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from lexer import my_RegexLexer
+from parser import Parser
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_FILES = ('basic_tests.txt', 'function_tests.txt', 'if_tests.txt', 'lambda_tests.txt', 'recursion_tests.txt')
+
+
+def sample_text(sample):
+    with open(os.path.join(PROJECT_DIR, sample)) as file:
+        return file.read()
+
+
+def counted(tokens, pulled):
+    for tok in tokens:
+        pulled.append(tok)
+        yield tok
+
+
+@pytest.mark.parametrize('sample', SAMPLE_FILES)
+def test_streamed_tokens_parse_like_a_token_list(sample):
+    text = sample_text(sample)
+    tokens, error = my_RegexLexer(sample, text, program=True).make_tokens()
+    assert error is None
+
+    from_list = Parser(tokens).statements().node
+    from_stream = Parser(my_RegexLexer(sample, text, program=True).iter_tokens()).statements().node
+    assert repr(from_stream) == repr(from_list)
+
+
+def test_parser_pulls_tokens_as_it_goes():
+    pulled = []
+    lexer = my_RegexLexer('<test>', '1 @+@ 2\n3 @*@ 4\n5', program=True)
+    parser = Parser(counted(lexer.iter_tokens(), pulled))
+    assert len(pulled) == 1
+
+    first = parser.statement()
+    assert repr(first) == repr(Parser(my_RegexLexer('<test>', '1 @+@ 2').iter_tokens()).parse().node)
+    assert len(pulled) == 4  # the three tokens of the statement and the newline after it
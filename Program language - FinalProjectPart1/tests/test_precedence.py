@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+import interpreter
+from interpreter import run
+from lexer import my_RegexLexer
+from parser import Parser
+
+# The precedence climbing in Parser.climb against a plain one-function-per-level reference, written out
+# here from the language's operator table: every binary operator is left associative, unary operators bind
+# tighter than any of them.
+
+LEVELS = (
+    ('@|@',),
+    ('@&@',),
+    ('@==@', '@!=@', '@<@', '@>@', '@<=@', '@>=@'),
+    ('@+@', '@-@'),
+    ('@*@', '@/@', '@%@'),
+)
+
+UNARY = ('@-@', '@+@', '@NOT@')
+
+
+def parse(text):
+    tokens, error = my_RegexLexer('<test>', text).make_tokens()
+    assert error is None
+    result = Parser(tokens).parse()
+    assert result.error is None, result.error.as_string()
+    return result.node
+
+
+def reference(words, level=0):
+    # Fully parenthesizes a list of operand and operator words; consumes them from the front
+    if level == len(LEVELS):
+        if words[0] in UNARY:
+            op = words.pop(0)
+            return f'({op} {reference(words, level)})'
+        return words.pop(0)
+    left = reference(words, level + 1)
+    while words and words[0] in LEVELS[level]:
+        op = words.pop(0)
+        left = f'({left} {op} {reference(words, level + 1)})'
+    return left
+
+
+def random_chain(rng, length):
+    words = []
+    for i in range(length):
+        if i:
+            words.append(rng.choice(rng.choice(LEVELS)))
+        if rng.random() < 0.2:
+            words.append(rng.choice(UNARY))
+        words.append(rng.choice(('1', '2', '3', 'x', 'y')))
+    return words
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('1 @+@ 2 @*@ 3', '(T_INT:1 T_PLUS (T_INT:2 T_MUL T_INT:3))'),
+    ('1 @*@ 2 @+@ 3', '((T_INT:1 T_MUL T_INT:2) T_PLUS T_INT:3)'),
+    ('1 @-@ 2 @-@ 3', '((T_INT:1 T_SUB T_INT:2) T_SUB T_INT:3)'),
+    ('8 @/@ 4 @%@ 3', '((T_INT:8 T_DIV T_INT:4) T_MODULO T_INT:3)'),
+    ('@-@ 1 @*@ 2', '((T_SUBT_INT:1) T_MUL T_INT:2)'),
+    ('1 @+@ 2 @==@ 3 @*@ 4', '((T_INT:1 T_PLUS T_INT:2) T_EQEQ (T_INT:3 T_MUL T_INT:4))'),
+    ('x @|@ y @&@ x', '(T_IDENTIFIER:x T_OR (T_IDENTIFIER:y T_AND T_IDENTIFIER:x))'),
+    ('1 @<@ 2 @&@ @NOT@ x @|@ y',
+     '(((T_INT:1 T_LESSTHAN T_INT:2) T_AND (T_NOTT_IDENTIFIER:x)) T_OR T_IDENTIFIER:y)'),
+])
+def test_precedence_and_associativity(text, expected):
+    assert repr(parse(text)) == expected
+
+
+def test_random_chains_group_like_the_reference():
+    rng = random.Random(5)
+    for _ in range(500):
+        words = random_chain(rng, rng.randint(1, 8))
+        text = ' '.join(words)
+        # The reference's text uses the @ spellings; parse it again so both sides print as nodes
+        assert repr(parse(text)) == repr(parse(reference(list(words)))), text
+
+
+def test_long_chains_evaluate_like_python():
+    rng = random.Random(7)
+    for _ in range(200):
+        operands = [str(rng.randint(0, 9)) for _ in range(rng.randint(2, 12))]
+        ops = [rng.choice(('+', '-', '*')) for _ in operands[1:]]
+        python_text = operands[0] + ''.join(f' {op} {operand}' for op, operand in zip(ops, operands[1:]))
+        text = operands[0] + ''.join(f' @{op}@ {operand}' for op, operand in zip(ops, operands[1:]))
+        interpreter.global_symbol_table.clear()
+        result, error = run('<test>', text)
+        assert error is None
+        assert result == eval(python_text), text
+
+
+def test_a_long_sum_parses_without_deep_recursion():
+    node = parse(' @+@ '.join(['1'] * 20000))
+    depth = 0
+    while hasattr(node, 'left_node'):
+        assert repr(node.right_node) == 'T_INT:1'
+        node = node.left_node
+        depth += 1
+    assert depth == 19999
+
+
+def test_an_operator_without_a_right_operand_is_reported():
+    tokens, _ = my_RegexLexer('<test>', '1 @+@ 2 @*@').make_tokens()
+    error = Parser(tokens).parse().error
+    assert error.details == 'Expected expression after operator'
@@ -0,0 +1,97 @@
+import os
+import random
+import re
+
+import pytest
+
+import interpreter
+from interpreter import run_file
+
+# Program mode reads a file as a whole, so a statement may span lines. On a file where every statement fits on
+# its line it must print what --line-mode prints, also when some of those lines do not parse: a block or a
+# parenthesis left open on one line ends with that line, and the lines after it still run.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_FILES = ('basic_tests.txt', 'function_tests.txt', 'if_tests.txt', 'lambda_tests.txt', 'recursion_tests.txt')
+
+BROKEN_FILES = {
+    'unclosed_def': '@DEF@ f(x) @IS@ x @+@ 1\n2 @+@ 3\n4 @*@ 5\n',
+    'unclosed_def_before_def': '@DEF@ f(x) @IS@ x\n@DEF@ g(x) @IS@ x @*@ 2 @END@\ng(4)\nf(1)\n',
+    'unclosed_if': '@IF@ 1 @<@ 2 @THEN@ 3\n7\n@FOR@ i @IN@ @RANGE@(0, 3) @DO@ i @END@\n',
+    'unclosed_for': '@FOR@ i @IN@ @RANGE@(0, 3) @DO@ i\n1 @+@ 1\n',
+    'unclosed_paren': '(1 @+@ 2\n3\n\n@DEF@ sq(x) @IS@ x @*@ x @END@\nsq(5\nsq(6)\n',
+    'unclosed_call_at_end': '1\nsq(1, 2',
+    'illegal_characters': '1 $ 2\n(3 @+@\n4 # 5\n@FOO@ 6\n7 @+\n8\n',
+    'unclosed_call_in_def': '@DEF@ k(x) @IS@ k(x @END@\n5 @/@ 0\nk(\n3\n',
+}
+
+
+def file_output(path, program, capsys, iterative=False):
+    interpreter.global_symbol_table.clear()
+    run_file(str(path), program=program, cache=False, iterative=iterative)
+    # Function values print with their address
+    return re.sub(r'0x[0-9a-f]+', '0x', capsys.readouterr().out)
+
+
+def truncated_file(seed):
+    # A few lines of the sample files, about half of them cut short
+    rng = random.Random(seed)
+    lines = []
+    for sample in SAMPLE_FILES:
+        with open(os.path.join(PROJECT_DIR, sample)) as file:
+            lines.extend(line.strip() for line in file if line.strip())
+    chosen = []
+    for _ in range(rng.randint(2, 6)):
+        line = rng.choice(lines)
+        if rng.random() < 0.5:
+            line = line[:rng.randint(1, len(line))]
+        chosen.append(line)
+    return '\n'.join(chosen) + '\n'
+
+
+def test_statements_after_an_unclosed_block_still_run(tmp_path, capsys):
+    path = tmp_path / 'program.txt'
+    path.write_text(BROKEN_FILES['unclosed_def'])
+    assert file_output(path, True, capsys) == (
+        "Line 1: @DEF@ f(x) @IS@ x @+@ 1\n"
+        "Error: Invalid Syntax: Expected '@END@'\n"
+        f"File {path}, line 1\n\n"
+        "Line 2: 2 @+@ 3\n"
+        "Output: 5\n\n"
+        "Line 3: 4 @*@ 5\n"
+        "Output: 20\n\n"
+    )
+
+
+@pytest.mark.parametrize('iterative', (False, True))
+@pytest.mark.parametrize('name', sorted(BROKEN_FILES))
+def test_broken_files_print_like_line_mode(name, iterative, tmp_path, capsys):
+    path = tmp_path / f'{name}.txt'
+    path.write_text(BROKEN_FILES[name])
+    assert file_output(path, True, capsys, iterative) == file_output(path, False, capsys, iterative)
+
+
+@pytest.mark.parametrize('sample', SAMPLE_FILES)
+def test_samples_print_like_line_mode(sample, capsys):
+    path = os.path.join(PROJECT_DIR, sample)
+    assert file_output(path, True, capsys) == file_output(path, False, capsys)
+
+
+def test_truncated_lines_print_like_line_mode(tmp_path, capsys):
+    for seed in range(60):
+        path = tmp_path / f'truncated_{seed}.txt'
+        path.write_text(truncated_file(seed))
+        assert file_output(path, True, capsys) == file_output(path, False, capsys), path.read_text()
+
+
+def test_a_statement_still_spans_lines(tmp_path, capsys):
+    path = tmp_path / 'program.txt'
+    path.write_text('@DEF@ f(x) @IS@\n  x @/@ 0\n@END@\nf(1)\n')
+    assert file_output(path, True, capsys) == (
+        "Line 1: @DEF@ f(x) @IS@ x @/@ 0 @END@\n"
+        "Output: Function 'f' defined successfully\n\n"
+        "Line 4: f(1)\n"
+        "Error: Division by Zero: Attempted to divide by zero\n"
+        f"File {path}, line 2\n\n"
+    )
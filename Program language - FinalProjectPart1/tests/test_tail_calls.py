@@ -0,0 +1,84 @@
+import pytest
+
+import interpreter
+from interpreter import run
+
+# A call that is the whole result of a function body, directly or as a branch of an @IF@, is made by the
+# caller's Function.execute loop (tree) or by reusing the frame (vm), so tail recursion goes far deeper than
+# Python's recursion limit. The benchmark runs it a million calls deep; these tests stay at DEPTH.
+
+DEPTH = 20000
+
+TAIL_ENGINES = ('tree', 'vm')
+
+DEFINITIONS = (
+    '@DEF@ sumto(n, acc) @IS@ @IF@ n @==@ 0 @THEN@ acc @ELSE@ sumto(n @-@ 1, acc @+@ n) @END@ @END@',
+    '@DEF@ count(n) @IS@ @IF@ n @<@ 0 @THEN@ @FALSE@ @ELSEIF@ n @==@ 0 @THEN@ @TRUE@ @ELSE@ count(n @-@ 1) @END@ @END@',
+    '@DEF@ even(n) @IS@ @IF@ n @==@ 0 @THEN@ @TRUE@ @ELSE@ odd(n @-@ 1) @END@ @END@',
+    '@DEF@ odd(n) @IS@ @IF@ n @==@ 0 @THEN@ @FALSE@ @ELSE@ even(n @-@ 1) @END@ @END@',
+    '@DEF@ gcd(a, b) @IS@ @IF@ b @==@ 0 @THEN@ a @ELSE@ gcd(b, a @%@ b) @END@ @END@',
+    '@DEF@ down(n) @IS@ @IF@ n @==@ 0 @THEN@ 0 @ELSE@ step(n) @END@ @END@',
+    '@DEF@ step(n) @IS@ down(n @-@ 1) @END@',
+    '@DEF@ total(n) @IS@ @IF@ n @==@ 0 @THEN@ 0 @ELSE@ n @+@ total(n @-@ 1) @END@ @END@',
+)
+
+
+def define(engine):
+    interpreter.global_symbol_table.clear()
+    for text in DEFINITIONS:
+        assert run('<test>', text, engine=engine)[1] is None
+
+
+@pytest.mark.parametrize('text, expected', [
+    (f'sumto({DEPTH}, 0)', DEPTH * (DEPTH + 1) // 2),
+    (f'count({DEPTH})', True),
+    (f'even({DEPTH})', True),
+    (f'odd({DEPTH})', False),
+    (f'down({DEPTH})', 0),
+    ('gcd(1071, 462)', 21),
+])
+@pytest.mark.parametrize('engine', TAIL_ENGINES)
+def test_tail_recursion_goes_deep(engine, text, expected):
+    define(engine)
+    assert run('<test>', text, engine=engine) == (expected, None)
+
+
+def test_other_recursion_still_uses_the_stack():
+    define('tree')
+    result, error = run('<test>', f'total({DEPTH})')
+    assert error.details == 'Maximum recursion depth exceeded'
+    assert run('<test>', 'total(100)') == (5050, None)
+
+
+def test_tail_calls_do_not_count_towards_max_depth():
+    define('vm')
+    assert run('<test>', f'sumto({DEPTH}, 0)', engine='vm', max_depth=10) == (DEPTH * (DEPTH + 1) // 2, None)
+    result, error = run('<test>', 'total(100)', engine='vm', max_depth=10)
+    assert error.details == 'Maximum recursion depth of 10 calls exceeded'
+
+
+@pytest.mark.parametrize('engine', TAIL_ENGINES)
+def test_errors_after_a_tail_call_are_reported_as_after_any_call(engine):
+    define(engine)
+    run('<test>', '@DEF@ g(x) @IS@ 10 @/@ x @END@', engine=engine)
+    run('<test>', '@DEF@ tail(x) @IS@ @IF@ x @>@ 5 @THEN@ 1 @ELSE@ g(x) @END@ @END@', engine=engine)
+    run('<test>', '@DEF@ nontail(x) @IS@ @IF@ x @>@ 5 @THEN@ 1 @ELSE@ 0 @+@ g(x) @END@ @END@', engine=engine)
+    run('<test>', '@DEF@ arity(x) @IS@ g(x, 1) @END@', engine=engine)
+    run('<test>', '@DEF@ undefined(x) @IS@ nope(x) @END@', engine=engine)
+
+    assert run('<test>', 'tail(0)', engine=engine)[1].as_string() == \
+           run('<test>', 'nontail(0)', engine=engine)[1].as_string()
+    assert run('<test>', 'arity(0)', engine=engine)[1].as_string() == \
+           'Traceback (most recent call last):\n  File <test>, line 1, in <program>\n' \
+           'Runtime Error: 1 arguments expected, got 2'
+    assert run('<test>', 'undefined(0)', engine=engine)[1].as_string() == \
+           "Traceback (most recent call last):\n  File <test>, line 1, in undefined\n" \
+           "Runtime Error: 'nope'  is not defined"
+
+
+@pytest.mark.parametrize('engine', ('closure', 'vm', 'python'))
+def test_a_tail_call_into_another_engine(engine):
+    define('tree')
+    run('<test>', '@DEF@ twice(x) @IS@ x @*@ 2 @END@', engine=engine)
+    run('<test>', '@DEF@ caller(x) @IS@ @IF@ x @<@ 0 @THEN@ 0 @ELSE@ twice(x) @END@ @END@')
+    assert run('<test>', 'caller(21)') == (42, None)
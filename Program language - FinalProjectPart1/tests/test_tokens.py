@@ -0,0 +1,32 @@
+import pytest
+
+from lexer import my_RegexLexer
+from tokens import T_INT, T_NEWLINE, my_CompactToken
+
+PROGRAM = 'x @+@ 1\n\n  @DEF@ f(a) @IS@\n    a @*@ 2\n  @END@\n'
+
+
+def test_compact_tokens_have_no_dict():
+    tok = my_CompactToken(T_INT, 1, 0, None)
+    with pytest.raises(AttributeError):
+        tok.extra = True
+
+
+def test_line_index_is_built_on_first_use():
+    lexer = my_RegexLexer('<test>', PROGRAM, program=True)
+    tokens = list(lexer.iter_tokens())
+    assert lexer.src._line_starts is None
+
+    positions = [(tok.pos_start.ln, tok.pos_start.col) for tok in tokens if tok.type != T_NEWLINE]
+    assert lexer.src._line_starts is not None
+    assert positions == [(0, 0), (0, 2), (0, 6), (2, 2), (2, 8), (2, 9), (2, 10), (2, 11), (2, 13),
+                         (3, 4), (3, 6), (3, 10), (4, 2)]
+
+
+def test_positions_point_into_the_source():
+    lexer = my_RegexLexer('<test>', PROGRAM, program=True)
+    for tok in lexer.iter_tokens():
+        pos = tok.pos_start
+        assert pos.fn == '<test>'
+        assert PROGRAM.splitlines(keepends=True)[pos.ln][pos.col] == PROGRAM[pos.idx]
+        assert tok.pos_end.idx == pos.idx + 1
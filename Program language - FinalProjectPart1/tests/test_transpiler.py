@@ -0,0 +1,93 @@
+import os
+import re
+
+import pytest
+
+import interpreter
+import transpiler
+from interpreter import ENGINES, compile_program, run, run_file
+from transpiler import transpile_statement
+
+# The python engine translates every statement into Python code; it prints what the tree engine prints, errors
+# and their lines included, and its functions live in the shared symbol table next to those of the other engines.
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_FILES = ('basic_tests.txt', 'function_tests.txt', 'if_tests.txt', 'lambda_tests.txt', 'recursion_tests.txt')
+
+ERRORS = ('1 @/@ 0\nundefined(1)\n@DEF@ f(x) @IS@ x @END@\nf(1, 2)\n'
+          '@DEF@ g(x) @IS@\n  10 @/@ x\n@END@\n@DEF@ h(x) @IS@ g(x @-@ 1) @+@ nope @END@\nh(3)\nh(1)\nh(2)\n'
+          '(@LAMBDA@ (x) @:@ x)(1, 2)\nlen(1)\n')
+
+DEFINITIONS = ('@DEF@ f(x) @IS@ x @+@ 1 @END@', '@DEF@ d(x) @IS@ 10 @/@ x @END@', '@DEF@ u(x) @IS@ x @+@ nope @END@',
+               '@DEF@ adder(n) @IS@ @LAMBDA@ (x) @:@ x @/@ n @END@')
+
+CALLS = ('f(1)', 'f(1, 2)', 'd(0)', 'd(5)', 'u(1)', '(@LAMBDA@ (g) @:@ g(50))(adder(5))',
+         '(@LAMBDA@ (g) @:@ g(5))(adder(0))', '@DEF@ h(x) @IS@ d(x) @+@ 1 @END@', 'h(0)', 'h(2)')
+
+
+def file_output(path, capsys, engine):
+    interpreter.global_symbol_table.clear()
+    run_file(str(path), cache=False, engine=engine)
+    return re.sub(r'0x[0-9a-f]+', '0x', capsys.readouterr().out)
+
+
+def results(define_engine, call_engine):
+    interpreter.global_symbol_table.clear()
+    for text in DEFINITIONS:
+        run('<test>', text, engine=define_engine)
+    outcomes = []
+    for text in CALLS:
+        result, error = run('<test>', text, engine=call_engine)
+        outcomes.append(result if error is None else re.sub(r'lambda_\d+', 'lambda', error.as_string()))
+    return outcomes
+
+
+@pytest.mark.parametrize('sample', SAMPLE_FILES)
+def test_samples_print_like_the_tree_engine(sample, capsys):
+    path = os.path.join(PROJECT_DIR, sample)
+    assert file_output(path, capsys, 'python') == file_output(path, capsys, 'tree')
+
+
+def test_errors_print_like_the_tree_engine(tmp_path, capsys):
+    path = tmp_path / 'errors.txt'
+    path.write_text(ERRORS)
+    output = file_output(path, capsys, 'python')
+    assert output == file_output(path, capsys, 'tree')
+    # The line within the statement that defined g
+    assert f'Line 10: h(1)\nError: Division by Zero: Attempted to divide by zero\nFile {path}, line 2\n' in output
+
+
+@pytest.mark.parametrize('define_engine, call_engine', [(define_engine, call_engine) for define_engine in ENGINES
+                                                         for call_engine in ENGINES
+                                                         if 'python' in (define_engine, call_engine)])
+def test_functions_are_shared_between_engines(define_engine, call_engine):
+    assert results(define_engine, call_engine) == results('tree', 'tree')
+
+
+def test_the_symbol_table_holds_only_program_names():
+    interpreter.global_symbol_table.clear()
+    run('<test>', '@DEF@ f(x) @IS@ x @END@', engine='python')
+    run('<test>', '@FOR@ i @IN@ @RANGE@(0, 3) @DO@ f(i) @END@', engine='python')
+    assert sorted(interpreter.global_symbol_table.symbols) == ['f', 'i']
+    assert hasattr(interpreter.global_symbol_table.get('f'), 'execute')
+
+
+def test_python_builtins_are_not_visible():
+    interpreter.global_symbol_table.clear()
+    result, error = run('<test>', 'len', engine='python')
+    assert error.details == "'len' is not defined"
+    result, error = run('<test>', 'print(1)', engine='python')
+    assert error.details == "'print'  is not defined"
+
+
+def test_code_is_shared_by_statements_of_the_same_shape():
+    transpiler.code_cache.clear()
+    first, second, other = compile_program('<test>', 'f(1) @+@ x\nf(2) @+@ x\nf(2) @-@ x\n').element_nodes
+    assert transpile_statement(first).python_code is transpile_statement(first).python_code
+    assert transpile_statement(second).python_code is not transpile_statement(first).python_code
+    assert transpile_statement(other).python_code is not transpile_statement(first).python_code
+    assert len(transpiler.code_cache) == 3
+
+    again = compile_program('<test>', '\n\nf(1)   @+@ x\n').element_nodes[0]
+    assert transpile_statement(again).python_code is transpile_statement(first).python_code
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+import interpreter
+from interpreter import run
+from lexer import my_RegexLexer
+from parser import Parser
+from runtime import SymbolTable
+from vectorize import vectorized_loop
+
+np = pytest.importorskip('numpy')
+
+# With --vectorize an arithmetic @FOR@ loop is computed with NumPy when the result is certain to be the
+# Interpreter's: same values, same types, same errors. Everything else runs one iteration at a time.
+
+OPERATORS = ('@+@', '@-@', '@*@', '@/@', '@%@', '@<@', '@>@', '@==@', '@!=@', '@<=@', '@>=@', '@&@', '@|@')
+
+
+def body(text):
+    tokens, error = my_RegexLexer('<test>', text).make_tokens()
+    assert error is None
+    return Parser(tokens).parse().node
+
+
+def random_body(rng, depth):
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice(('i', 'i', 'k', str(rng.randint(0, 9)), '@TRUE@', '@FALSE@'))
+    if rng.random() < 0.15:
+        return f'{rng.choice(("@-@", "@NOT@"))} ({random_body(rng, depth - 1)})'
+    return f'({random_body(rng, depth - 1)} {rng.choice(OPERATORS)} {random_body(rng, depth - 1)})'
+
+
+def loop_result(text, vectorize):
+    interpreter.global_symbol_table.clear()
+    run('<test>', '@FOR@ k @IN@ @RANGE@(3, 4) @DO@ k @END@')
+    try:
+        result, error = run('<test>', text, vectorize=vectorize)
+    except ZeroDivisionError as e:
+        return f'{type(e).__name__}: {e}'  # @%@ by zero is not an @ error yet, in any engine
+    return (result, None if result is None else [type(value) for value in result],
+            error and error.as_string(), interpreter.global_symbol_table.get('i'))
+
+
+def test_random_loops_compute_the_same():
+    rng = random.Random(11)
+    for _ in range(300):
+        start, length, step = rng.randint(-50, 50), rng.randint(0, 200), rng.randint(1, 4)
+        text = f'@FOR@ i @IN@ @RANGE@({start}, {start + length}, {step}) @DO@ {random_body(rng, 3)} @END@'
+        assert loop_result(text, True) == loop_result(text, False), text
+
+
+@pytest.mark.parametrize('text', [
+    'i @*@ i @%@ 7',
+    'i @*@ i @%@ 7 @==@ 1',
+    '(i @>@ 50) @&@ (i @<@ 70)',
+    '@-@ i @/@ 3',
+    'k @*@ 2',
+])
+def test_arithmetic_bodies_are_vectorized(text):
+    symbol_table = SymbolTable()
+    symbol_table.set('k', 5)
+    values = vectorized_loop('i', body(text), 0, 100, 1, symbol_table)
+    assert values is not None and len(values) == 100
+    assert symbol_table.get('i') == 99
+    assert not any(isinstance(value, np.generic) for value in values)
+
+
+@pytest.mark.parametrize('text, start, end, step', [
+    ('i @*@ i @*@ i @*@ i', 0, 1000000, 1),  # could overflow 64 bits
+    ('100 @/@ (i @-@ 50)', 0, 100, 1),         # divides by zero at i = 50
+    ('i @%@ (i @-@ 50)', 0, 100, 1),
+    ('f(i)', 0, 100, 1),                       # calls a function
+    ('i @+@ undefined', 0, 100, 1),
+    ('i @+@ 1', 0, 10, 1),                     # too short to be worth it
+    ('i @+@ 1', 100, 0, -1),
+    ('(i @>@ 3) @|@ i', 0, 100, 1),            # @|@ of a boolean and a number
+])
+def test_other_loops_run_one_iteration_at_a_time(text, start, end, step):
+    symbol_table = SymbolTable()
+    assert vectorized_loop('i', body(text), start, end, step, symbol_table) is None
+    assert symbol_table.get('i') is None
+
+
+def test_big_results_are_exact():
+    text = '@FOR@ i @IN@ @RANGE@(0, 100000, 997) @DO@ i @*@ i @*@ i @*@ i @*@ i @END@'
+    result, error = run('<test>', text, vectorize=True)
+    assert result == [i ** 5 for i in range(0, 100000, 997)]
+
+
+def test_a_division_by_zero_is_reported_as_without_numpy():
+    assert loop_result('@FOR@ i @IN@ @RANGE@(0, 100) @DO@ 100 @/@ (i @-@ 50) @END@', True) == \
+           loop_result('@FOR@ i @IN@ @RANGE@(0, 100) @DO@ 100 @/@ (i @-@ 50) @END@', False)
@@ -1,41 +1,139 @@
+from general import SourcePosition
+
+
 ##############################################
 # TOKENS
 ##############################################
 
-T_INT = 'T_INT'
-T_BOOLEAN = 'T_BOOLEAN'
-T_IDENTIFIER = 'T_IDENTIFIER'
-T_PLUS = 'T_PLUS'
-T_SUB = 'T_SUB'
-T_MUL = 'T_MUL'
-T_DIV = 'T_DIV'
-T_MODULO = 'T_MODULO'
-T_AND = 'T_AND'
-T_OR = 'T_OR'
-T_NOT = 'T_NOT'
-T_EQEQ = 'T_EQEQ'
-T_NEQ = 'T_NEQ'
-T_GREATERTHAN = 'T_GREATERTHAN'
-T_LESSTHAN = 'T_LESSTHAN'
-T_EQGREATERTHAN = 'T_EQGREATERTHAN'
-T_EQLESSTHAN = 'T_EQLESSTHAN'
-T_LPAREN = 'T_LPAREN'
-T_RPAREN = 'T_RPAREN'
-T_IF = 'T_IF'
-T_IS = 'T_IS'
-T_THEN = 'T_THEN'
-T_ELSE = 'T_ELSE'
-T_ELSEIF = 'T_ELSEIF'
-T_FOR = 'T_FOR'
-T_IN = 'T_IN'
-T_RANGE = 'T_RANGE'
-T_END = 'T_END'
-T_STEP = 'T_STEP'
-T_DO = 'T_DO'
-T_DEF = 'T_DEF'
-T_COLON = 'T_COLON'
-T_COMMA = 'T_COMMA'
-T_LAMBDA = 'T_LAMBDA'
+# Token types are small integer constants so that the parser and interpreter
+# compare ints instead of strings; TOKEN_NAMES maps them back for printing.
+
+T_INT = 0
+T_BOOLEAN = 1
+T_IDENTIFIER = 2
+T_PLUS = 3
+T_SUB = 4
+T_MUL = 5
+T_DIV = 6
+T_MODULO = 7
+T_AND = 8
+T_OR = 9
+T_NOT = 10
+T_EQEQ = 11
+T_NEQ = 12
+T_GREATERTHAN = 13
+T_LESSTHAN = 14
+T_EQGREATERTHAN = 15
+T_EQLESSTHAN = 16
+T_LPAREN = 17
+T_RPAREN = 18
+T_IF = 19
+T_IS = 20
+T_THEN = 21
+T_ELSE = 22
+T_ELSEIF = 23
+T_FOR = 24
+T_IN = 25
+T_RANGE = 26
+T_END = 27
+T_STEP = 28
+T_DO = 29
+T_DEF = 30
+T_COLON = 31
+T_COMMA = 32
+T_LAMBDA = 33
+T_NEWLINE = 34
+T_ERROR = 35
+
+TOKEN_NAMES = [
+    'T_INT',
+    'T_BOOLEAN',
+    'T_IDENTIFIER',
+    'T_PLUS',
+    'T_SUB',
+    'T_MUL',
+    'T_DIV',
+    'T_MODULO',
+    'T_AND',
+    'T_OR',
+    'T_NOT',
+    'T_EQEQ',
+    'T_NEQ',
+    'T_GREATERTHAN',
+    'T_LESSTHAN',
+    'T_EQGREATERTHAN',
+    'T_EQLESSTHAN',
+    'T_LPAREN',
+    'T_RPAREN',
+    'T_IF',
+    'T_IS',
+    'T_THEN',
+    'T_ELSE',
+    'T_ELSEIF',
+    'T_FOR',
+    'T_IN',
+    'T_RANGE',
+    'T_END',
+    'T_STEP',
+    'T_DO',
+    'T_DEF',
+    'T_COLON',
+    'T_COMMA',
+    'T_LAMBDA',
+    'T_NEWLINE',
+    'T_ERROR',
+]
+
+
+##############################################
+# SPELLINGS
+##############################################
+
+# Lookup tables from source spelling to (token type, token value).
+# The table-driven lexer resolves every @...@ span with a single dict lookup.
+
+KEYWORDS = {
+    '@TRUE@': (T_BOOLEAN, True),
+    '@FALSE@': (T_BOOLEAN, False),
+    '@DEF@': (T_DEF, None),
+    '@IS@': (T_IS, None),
+    '@END@': (T_END, None),
+    '@LAMBDA@': (T_LAMBDA, None),
+    '@:@': (T_COLON, None),
+    '@IF@': (T_IF, None),
+    '@THEN@': (T_THEN, None),
+    '@ELSEIF@': (T_ELSEIF, None),
+    '@ELSE@': (T_ELSE, None),
+    '@FOR@': (T_FOR, None),
+    '@IN@': (T_IN, None),
+    '@RANGE@': (T_RANGE, None),
+    '@DO@': (T_DO, None),
+}
+
+OPERATORS = {
+    '@+@': (T_PLUS, None),
+    '@-@': (T_SUB, None),
+    '@*@': (T_MUL, None),
+    '@/@': (T_DIV, None),
+    '@%@': (T_MODULO, None),
+    '@==@': (T_EQEQ, None),
+    '@!=@': (T_NEQ, None),
+    '@NOT@': (T_NOT, None),
+    '@<@': (T_LESSTHAN, None),
+    '@<=@': (T_EQLESSTHAN, None),
+    '@>@': (T_GREATERTHAN, None),
+    '@>=@': (T_EQGREATERTHAN, None),
+    '@&@': (T_AND, None),
+    '@|@': (T_OR, None),
+}
+
+AT_SPELLINGS = {**KEYWORDS, **OPERATORS}
+
+SYMBOLS = {
+    '(': T_LPAREN,
+    ')': T_RPAREN,
+    ',': T_COMMA,
+}
 
 
 ##############################################
@@ -64,7 +162,39 @@ class my_Token:
         return self.type == type_ and (self.value == value or value is None)
 
     def __repr__(self):
-        if self.value: return f'{self.type}:{self.value}'
-        return f'{self.type}'
+        if self.value: return f'{TOKEN_NAMES[self.type]}:{self.value}'
+        return f'{TOKEN_NAMES[self.type]}'
+
+
+##############################################
+# COMPACT TOKEN
+##############################################
+
+# my_CompactToken is the memory-light token produced by my_RegexLexer.
+# It keeps only the type, the value, the start offset and a shared SourceFile,
+# and builds SourcePosition objects on demand for error reporting.
+class my_CompactToken:
+    __slots__ = ('type', 'value', 'offset', 'src')
+
+    def __init__(self, type_, value, offset, src):
+        self.type = type_
+        self.value = value
+        self.offset = offset
+        self.src = src
+
+    @property
+    def pos_start(self):
+        return SourcePosition(self.offset, self.src)
+
+    @property
+    def pos_end(self):
+        return SourcePosition(self.offset + 1, self.src)
+
+    def matches(self, type_, value=None):
+        return self.type == type_ and (self.value == value or value is None)
+
+    def __repr__(self):
+        if self.value: return f'{TOKEN_NAMES[self.type]}:{self.value}'
+        return f'{TOKEN_NAMES[self.type]}'
 
 
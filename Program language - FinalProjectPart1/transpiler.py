@@ -0,0 +1,503 @@
+import hashlib
+import keyword
+import marshal
+import re
+from types import CodeType, FunctionType
+
+from parser import *
+from general import *
+from runtime import *
+from astcache import child_nodes
+
+#######################################
+# TRANSPILER
+#######################################
+
+# The transpiler translates every statement into Python source, compiles that with compile() and runs the
+# resulting code object, so an @ program runs at the speed of the equivalent Python.
+#
+# A statement becomes one Python expression, which keeps the @ evaluation order for free:
+#
+#   @DEF@ f(x) @IS@ ...       (f := _function(lambda x=_MISSING, *_e: ...)), a TranspiledFunction bound with :=,
+#                             then _invalidate() (see SymbolTable.generation)
+#   @LAMBDA@ (x) @:@ ...      _function(lambda x=_MISSING, *_e: ...)
+#   @FOR@ i @IN@ @RANGE@(...) a list comprehension over range(), which binds i with :=
+#   @IF@ ... @ELSEIF@ ...     nested conditional expressions
+#   a shared value (-O)       a local _h variable, set with := the first time and reset to _MISSING by its scope
+#
+# The @ global frame is the Python global namespace: the generated function runs with the global
+# SymbolTable's dict as its globals, so @ names are plain Python variables. Identifiers that are Python
+# keywords get a trailing underscore, which no @ identifier can contain. The values bound there are the
+# ones every engine understands: a function is a TranspiledFunction, and a call site calls the Python
+# function inside it directly, or a function of another engine through its execute().
+#
+# Errors are reported with the same Error objects as the Interpreter. Every place that can fail gets an
+# entry in the statement's error table, and the generated code calls _s.fail(entry) when a check fails.
+# Undefined global names are left to Python's own NameError: every identifier is written on its own line
+# with a "#<entry>" comment, and the line in the traceback tells which @ identifier was missing.
+#
+# The generated code only depends on the shape of the statement, not on where it is in the source, so
+# code objects are cached by a hash of that shape and shared by identical statements. The error table
+# refers to nodes by their pre-order index; the nodes themselves come from the statement being run.
+
+FILENAME_PREFIX = '<@ '
+NAME_ERROR = 0      # an undefined identifier
+CALLEE_ERROR = 1    # calling something that is not a function
+DIVISION_ERROR = 2  # @/@ by zero
+ARITY_ERROR = 3     # a function called with the wrong number of arguments
+NODE_ERROR = 4      # an ErrorNode left by the parser
+
+MARKER = re.compile(r'  #(\d+)$')
+
+PYTHON_OPERATORS = {
+    T_PLUS: '+',
+    T_SUB: '-',
+    T_MUL: '*',
+    T_MODULO: '%',
+    T_EQEQ: '==',
+    T_NEQ: '!=',
+    T_GREATERTHAN: '>',
+    T_LESSTHAN: '<',
+    T_EQGREATERTHAN: '>=',
+    T_EQLESSTHAN: '<=',
+}
+
+code_cache = {}
+
+
+def python_name(name):
+    return f'{name}_' if keyword.iskeyword(name) else name
+
+
+#######################################
+# RUN-TIME SUPPORT
+#######################################
+
+# The generated code sees only these names besides the @ globals: they are its builtins, so an @ name
+# such as 'len' or 'print' is undefined rather than a Python builtin. They are not put into the @ globals
+# as '__builtins__' (see make_statement).
+
+MISSING = object()  # the default of every parameter, to tell a missing argument from a None one
+
+
+def for_range(start, end, step):
+    if type(start) is int and type(end) is int and type(step) is int and step > 0:
+        return range(start, end, step)
+    return while_range(start, end, step)
+
+
+def while_range(i, end, step):
+    # Exactly the Interpreter's loop, for booleans and steps that range() does not take
+    while i < end:
+        yield i
+        i += step
+
+
+def logical_and(left, right):
+    # Both operands are evaluated before the operator is applied, exactly as in the Interpreter
+    return left if not left else right
+
+
+def logical_or(left, right):
+    return left if left else right
+
+
+# A TranspiledFunction is the value of a @DEF@ or @LAMBDA@ in transpiled code. Transpiled call sites call its
+# function, the generated Python function, directly; execute() gives the Interpreter's Function interface, so
+# functions can be shared between engines through a symbol table.
+class TranspiledFunction:
+    __slots__ = ('function',)
+
+    def __init__(self, function):
+        self.function = function
+
+    def execute(self, args):
+        res = RTResult()
+        try:
+            return res.success(self.function(*args))
+        except RuntimeFailure as e:
+            return res.failure(e.error)
+        except NameError as e:
+            error = undefined_name_error(e)
+            if error is None:
+                raise
+            return res.failure(error)
+
+
+def foreign_function(function):
+    # A function of another engine, as a Python function for a transpiled call site
+    def call(*args):
+        res = function.execute(list(args))
+        if res.error:
+            raise RuntimeFailure(res.error)
+        return res.value
+    return call
+
+
+BUILTINS = {
+    '_MISSING': MISSING,
+    '_range': for_range,
+    '_and': logical_and,
+    '_or': logical_or,
+    '_function': TranspiledFunction,
+    '_foreign': foreign_function,
+    '_invalidate': SymbolTable.invalidate,
+}
+
+
+# The _s of the generated code: it turns an entry of the error table into the Error the Interpreter would report
+class StatementErrors:
+    __slots__ = ('python_code', 'nodes', 'context')
+
+    def __init__(self, python_code, nodes, context):
+        self.python_code = python_code
+        self.nodes = nodes
+        self.context = context
+
+    def fail(self, entry):
+        raise RuntimeFailure(self.error(entry))
+
+    def arity(self, entry, args):
+        kind, index, scopes = self.python_code.entries[entry]
+        node = self.nodes[index]
+        given = sum(1 for arg in args if arg is not MISSING)
+        raise RuntimeFailure(RTError(
+            node.body_node.pos_start, node.body_node.pos_end,
+            f"{len(node.arg_name_toks)} arguments expected, got {given}",
+            self.context_in(scopes)
+        ))
+
+    def error(self, entry):
+        kind, index, scopes = self.python_code.entries[entry]
+        node = self.nodes[index]
+
+        if kind == NAME_ERROR:
+            return RTError(node.pos_start, node.pos_end, f"'{node.tok.value}' is not defined", self.context_in(scopes))
+        if kind == CALLEE_ERROR:
+            name = node.name_tok.tok.value if isinstance(node.name_tok, IdentifierNode) else '<anonymous>'
+            return RTError(node.pos_start, node.pos_end, f"'{name}'  is not defined", self.context_in(scopes))
+        if kind == DIVISION_ERROR:
+            pos_start = node.op_tok.pos_start if node.op_tok.pos_start else node.left_node.pos_start
+            pos_end = node.op_tok.pos_end if node.op_tok.pos_end else node.right_node.pos_end
+            return DivisionByZeroError(pos_start, pos_end)
+        return node.error
+
+    def context_in(self, scopes):
+        # The Context the Interpreter would be in: one per enclosing @ function, around the program's
+        context = self.context
+        for index in scopes:
+            node = self.nodes[index]
+            name = node.name_tok.value if isinstance(node, FunctionDefNode) else f"<lambda_{id(node)}>"
+            context = Context(name, context)
+        return context
+
+
+#######################################
+# CODE GENERATION
+#######################################
+
+# What the cache keeps for one statement shape
+class PythonCode:
+    __slots__ = ('code', 'entries', 'lines', 'source', 'loop_names')
+
+    def __init__(self, code, entries, lines, source, loop_names):
+        self.code = code        # the code object of _statement(_s)
+        self.entries = entries  # the error table: (kind, node index, indices of the enclosing function nodes)
+        self.lines = lines      # line number -> entry, for the identifiers
+        self.source = source
+        self.loop_names = loop_names  # the global names a @FOR@ binds, checked for rebinding by run_transpiled
+
+
+# One @ function being generated: its node index and its parameter names
+class Scope:
+    __slots__ = ('index', 'params')
+
+    def __init__(self, index, params):
+        self.index = index
+        self.params = params
+
+
+class Transpiler:
+    def __init__(self, nodes):
+        self.indices = {id(node): i for i, node in enumerate(nodes)}
+        self.entries = []
+        self.scopes = []
+        self.global_names = set()
+        self.loop_names = set()
+        self.temp_count = 0
+        self.shared_names = {}  # slot: the local variable holding its value
+
+    def transpile(self, node):
+        method_name = f'transpile_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_transpile_method)
+        return method(node)
+
+    def no_transpile_method(self, node):
+        raise Exception(f'No transpile_{type(node).__name__} method')
+
+    def entry(self, kind, node):
+        self.entries.append((kind, self.indices[id(node)], tuple(scope.index for scope in self.scopes)))
+        return len(self.entries) - 1
+
+    def temp(self, prefix):
+        self.temp_count += 1
+        return f'{prefix}{self.temp_count}'
+
+    def bind(self, name):
+        # FOR variables and DEF names are bound in the current frame; at the top level that is the global one
+        if not self.scopes:
+            self.global_names.add(python_name(name))
+
+    def is_param(self, name):
+        return any(name in scope.params for scope in self.scopes)
+
+    def marked(self, text, entry):
+        # text on a line of its own, so that a NameError raised by it can be traced back to the entry
+        return f'(\n{text}  #{entry}\n)'
+
+    def transpile_NumberNode(self, node):
+        return repr(node.tok.value)
+
+    transpile_BooleanNode = transpile_NumberNode
+
+    def transpile_IdentifierNode(self, node):
+        name = python_name(node.tok.value)
+        entry = self.entry(NAME_ERROR, node)
+        if self.is_param(node.tok.value):
+            # An argument can be None, which the Interpreter reports as undefined
+            return self.marked(f'{name} if {name} is not None else _s.fail({entry})', entry)
+        return self.marked(name, entry)
+
+    def transpile_BinOpNode(self, node):
+        left = self.transpile(node.left_node)
+        right = self.transpile(node.right_node)
+        op_type = node.op_tok.type
+
+        if op_type == T_DIV:
+            entry = self.entry(DIVISION_ERROR, node)
+            divisor = self.temp('_d')
+            return f'({left} // ({divisor} if ({divisor} := {right}) != 0 else _s.fail({entry})))'
+        if op_type == T_AND:
+            return f'_and({left}, {right})'
+        if op_type == T_OR:
+            return f'_or({left}, {right})'
+        return f'({left} {PYTHON_OPERATORS[op_type]} {right})'
+
+    def transpile_UnaryOpNode(self, node):
+        operand = self.transpile(node.node)
+        if node.op_tok.type == T_NOT:
+            return f'(not {operand})'
+        if node.op_tok.type == T_SUB:
+            return f'(-{operand})'
+        return operand
+
+    def transpile_IfNode(self, node):
+        cases = [(self.transpile(condition), self.transpile(expr)) for condition, expr in node.cases]
+        text = self.transpile(node.else_case) if node.else_case else 'None'
+        for condition, expr in reversed(cases):
+            text = f'({expr} if {condition} else {text})'
+        return text
+
+    def transpile_ForNode(self, node):
+        start = self.transpile(node.start_value_node)
+        end = self.transpile(node.end_value_node)
+        step = self.transpile(node.step_value_node) if node.step_value_node else '1'
+        self.bind(node.var_name_tok.value)
+        var_name = python_name(node.var_name_tok.value)
+        if not self.scopes:
+            self.loop_names.add(var_name)
+        body = self.transpile(node.body_node)
+
+        # The range is evaluated outside the comprehension, where := may be used
+        values, value = self.temp('_r'), self.temp('_i')
+        return (f'(({values} := _range({start}, {end}, {step})), '
+                f'[{body} for {value} in {values} if ({var_name} := {value}) is {value}])[1]')
+
+    def transpile_FunctionDefNode(self, node):
+        func_name = node.name_tok.value
+        self.bind(func_name)
+        function = self.function(node)
+        message = repr(f"Function '{func_name}' defined successfully")
+        return f'(({python_name(func_name)} := {function}), _invalidate(), {message})[2]'
+
+    def transpile_LambdaNode(self, node):
+        return self.function(node)
+
+    def function(self, node):
+        # Every parameter defaults to _MISSING and extra arguments go to *_e, so a call with the wrong
+        # number of arguments reaches the body and reports the Interpreter's error
+        arg_names = [arg_tok.value for arg_tok in node.arg_name_toks]
+        entry = self.entry(ARITY_ERROR, node)
+        params = [python_name(arg_name) for arg_name in arg_names]
+        for i, param in enumerate(params):
+            if param in params[i + 1:]:
+                params[i] = self.temp('_unused')  # the last of repeated parameters is the one that is bound
+
+        self.scopes.append(Scope(self.indices[id(node)], set(arg_names)))
+        body = self.transpile(node.body_node)
+        self.scopes.pop()
+
+        if params:
+            signature = ', '.join(f'{param}=_MISSING' for param in params) + ', *_e'
+            check = f'_e or {params[-1]} is _MISSING'
+            args = f'({", ".join(params)},) + _e'
+        else:
+            signature, check, args = '*_e', '_e', '_e'
+        return f'_function(lambda {signature}: (_s.arity({entry}, {args}) if {check} else {body}))'
+
+    def transpile_FunctionCallNode(self, node):
+        entry = self.entry(CALLEE_ERROR, node)
+        if isinstance(node.name_tok, IdentifierNode):
+            # An undefined function is reported by the call, like a defined name that is not a function
+            callee = self.marked(f'{python_name(node.name_tok.tok.value)} or _s.fail({entry})', entry)
+        else:
+            callee = f'({self.transpile(node.name_tok)} or _s.fail({entry}))'
+        args = [self.transpile(arg_node) for arg_node in node.arg_nodes]
+        function = self.temp('_f')
+        return (f'({function}.function if ({function} := {callee}).__class__ is _function else _foreign({function}))'
+                f'({", ".join(args)})')
+
+    def transpile_SharedNode(self, node):
+        name = self.shared_name(node.slot)
+        return f'({name} if {name} is not _MISSING else ({name} := {self.transpile(node.node)}))'
+
+    def transpile_ScopeNode(self, node):
+        resets = ''.join(f'({self.shared_name(slot)} := _MISSING), ' for slot in node.slots)
+        return f'({resets}{self.transpile(node.node)})[-1]'
+
+    def shared_name(self, slot):
+        # Slots are numbered across the whole program; the names only depend on the order within the statement
+        if slot not in self.shared_names:
+            self.shared_names[slot] = f'_h{len(self.shared_names)}'
+        return self.shared_names[slot]
+
+    def transpile_ListNode(self, node):
+        return f'[{", ".join(self.transpile(element_node) for element_node in node.element_nodes)}]'
+
+    def transpile_ErrorNode(self, node):
+        return f'_s.fail({self.entry(NODE_ERROR, node)})'
+
+
+def statement_nodes(node):
+    # The nodes of a statement in pre-order, and a hash of its shape: everything but the source positions
+    nodes = []
+    shape = []
+    slots = {}  # slot numbers in order of appearance, so that they do not change the hash
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        children = child_nodes(node) or ()
+        stack.extend(reversed(children))
+
+        if isinstance(node, (NumberNode, BooleanNode, IdentifierNode)):
+            fields = (node.tok.value,)
+        elif isinstance(node, (BinOpNode, UnaryOpNode)):
+            fields = (node.op_tok.type,)
+        elif isinstance(node, IfNode):
+            fields = (len(node.cases), node.else_case is not None)
+        elif isinstance(node, ForNode):
+            fields = (node.var_name_tok.value, node.step_value_node is not None)
+        elif isinstance(node, FunctionDefNode):
+            fields = (node.name_tok.value, tuple(arg_tok.value for arg_tok in node.arg_name_toks))
+        elif isinstance(node, LambdaNode):
+            fields = tuple(arg_tok.value for arg_tok in node.arg_name_toks)
+        elif isinstance(node, SharedNode):
+            fields = (slots.setdefault(node.slot, len(slots)),)
+        elif isinstance(node, ScopeNode):
+            fields = tuple(slots.setdefault(slot, len(slots)) for slot in node.slots)
+        else:
+            fields = (len(children),)
+        shape.append((type(node).__name__, fields))
+
+    return nodes, hashlib.sha256(marshal.dumps(shape)).hexdigest()
+
+
+def generate(root, nodes, key):
+    transpiler = Transpiler(nodes)
+    expr = transpiler.transpile(root)
+
+    lines = ['def _statement(_s):']
+    if transpiler.global_names:
+        lines.append(f'    global {", ".join(sorted(transpiler.global_names))}')
+    lines.append(f'    return {expr}')
+    source = '\n'.join(lines) + '\n'
+
+    markers = {}
+    for lineno, line in enumerate(source.splitlines(), 1):
+        match = MARKER.search(line)
+        if match:
+            markers[lineno] = int(match.group(1))
+
+    module = compile(source, f'{FILENAME_PREFIX}{key[:16]}>', 'exec')
+    code = next(const for const in module.co_consts if isinstance(const, CodeType))
+    return PythonCode(code, transpiler.entries, markers, source, tuple(sorted(transpiler.loop_names)))
+
+
+# A statement ready to run: the cached code for its shape and its own nodes
+class TranspiledStatement:
+    __slots__ = ('python_code', 'nodes')
+
+    def __init__(self, python_code, nodes):
+        self.python_code = python_code
+        self.nodes = nodes
+
+
+def transpile_statement(node):
+    nodes, key = statement_nodes(node)
+    python_code = code_cache.get(key)
+    if python_code is None:
+        python_code = code_cache[key] = generate(node, nodes, key)
+    return TranspiledStatement(python_code, nodes)
+
+
+#######################################
+# RUNNING
+#######################################
+
+# Makes the function of a statement's code with the @ globals as its globals. Python gives a function whose
+# globals have no '__builtins__' the builtins of the frame that makes it, and this lambda's are BUILTINS; the
+# functions the statement makes inherit them in turn.
+make_statement = eval('lambda code, symbols: FunctionType(code, symbols)',
+                      {'__builtins__': BUILTINS, 'FunctionType': FunctionType})
+
+
+def run_transpiled(statement, symbol_table, context):
+    errors = StatementErrors(statement.python_code, statement.nodes, context)
+    # Only a whole statement is a @DEF@, so nothing in a statement binds a function before its loops do
+    for var_name in statement.python_code.loop_names:
+        symbol_table.check_rebinding(var_name)
+    try:
+        return make_statement(statement.python_code.code, symbol_table.symbols)(errors), None
+    except RuntimeFailure as e:
+        return None, e.error
+    except NameError as e:
+        error = undefined_name_error(e)
+        if error is None:
+            raise
+        return None, error
+
+
+def undefined_name_error(exception):
+    # The innermost frame of the traceback is the generated code that read the name; its line number
+    # gives the entry, and the _s of that code (a local of every generated function) gives the nodes
+    frames = []
+    tb = exception.__traceback__
+    while tb is not None:
+        frames.append((tb.tb_frame, tb.tb_lineno))
+        tb = tb.tb_next
+
+    frame, lineno = frames[-1]
+    if not frame.f_code.co_filename.startswith(FILENAME_PREFIX):
+        return None
+    for outer_frame, _ in reversed(frames):
+        errors = outer_frame.f_locals.get('_s')
+        if isinstance(errors, StatementErrors):
+            break
+    else:
+        return None
+
+    entry = errors.python_code.lines.get(lineno)
+    if entry is None:
+        return None
+    return errors.error(entry)
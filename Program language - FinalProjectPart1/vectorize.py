@@ -0,0 +1,213 @@
+import operator
+
+from parser import *
+from runtime import *
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for --vectorize
+    np = None
+
+NUMPY_AVAILABLE = np is not None
+
+#######################################
+# VECTORIZED LOOPS
+#######################################
+
+# A @FOR@ loop whose body is plain arithmetic on the loop variable, for example i @*@ i @%@ 7, computes the same
+# expression for every value of the range. With --vectorize the Interpreter hands such a loop to
+# vectorized_loop(), which evaluates the body once over a NumPy array of all the values instead of once per
+# value. The body may only hold numbers, booleans, names, and unary and binary operators; names other than the
+# loop variable must be bound to numbers or booleans, and are constants for the whole loop.
+#
+# The result must be exactly what the Interpreter computes, so a loop is only vectorized when that is certain:
+#
+#   - @ integers are unbounded and NumPy's are 64 bits, so the range of every subexpression is worked out from
+#     the range of its operands before it is computed, and a loop whose values could overflow is not vectorized
+#   - a division or modulo by zero anywhere in the loop leaves it to the Interpreter, which reports the error
+#     at the iteration where it happens
+#   - TRUE and 1 are different values in @, so booleans are tracked as NumPy bool arrays, are turned into
+#     integers before arithmetic as Python does, and @&@ / @|@ are only vectorized between values of one kind
+#
+# Parts of the body that do not involve the loop variable are computed once with binary_operation and
+# unary_operation, the Interpreter's own operators. The same VectorBody evaluates a function body over columns
+# of arguments for batch.py.
+
+VECTOR_MIN_LENGTH = 32  # shorter loops are faster one iteration at a time
+INT64_MAX = 2 ** 63 - 1
+
+ARRAY_FUNCTIONS = {
+    T_PLUS: operator.add,
+    T_SUB: operator.sub,
+    T_MUL: operator.mul,
+    T_DIV: operator.floordiv,
+    T_MODULO: operator.mod,
+    T_EQEQ: operator.eq,
+    T_NEQ: operator.ne,
+    T_GREATERTHAN: operator.gt,
+    T_LESSTHAN: operator.lt,
+    T_EQGREATERTHAN: operator.ge,
+    T_EQLESSTHAN: operator.le,
+}
+
+COMPARISONS = {T_EQEQ, T_NEQ, T_GREATERTHAN, T_LESSTHAN, T_EQGREATERTHAN, T_EQLESSTHAN}
+
+
+class NotVectorizable(Exception):
+    pass
+
+
+def vectorized_loop(var_name, body_node, start_value, end_value, step_value, symbol_table):
+    # Runs the loop with NumPy and returns its values, or returns None without running anything when the loop
+    # has to be run one iteration at a time. Like the Interpreter, leaves the loop variable at its last value.
+    if np is None or not (type(start_value) is int and type(end_value) is int and type(step_value) is int):
+        return None
+    if step_value <= 0:
+        return None  # the Interpreter's loop never ends, or ends at once; either way it is not worth it
+    values = range(start_value, end_value, step_value)
+    if len(values) < VECTOR_MIN_LENGTH or not (-INT64_MAX <= values[0] and values[-1] <= INT64_MAX):
+        return None
+
+    loop_values = np.arange(values.start, values.stop, values.step, dtype=np.int64)
+    body = VectorBody({var_name: (loop_values, values[0], values[-1])}, symbol_table)
+    try:
+        result, _, _ = body.evaluate(body_node)
+    except NotVectorizable:
+        return None
+
+    symbol_table.set(var_name, values[-1])
+    if isinstance(result, np.ndarray):
+        return result.tolist()
+    return [result] * len(values)  # the body does not depend on the loop variable
+
+
+# Evaluates an expression for many values of some of its names at once. arrays maps each of those names to
+# (array, low, high), other names are looked up in symbol_table. Every evaluate_* method returns
+# (value, low, high): the value is an array with one element per iteration, or a Python value when it is the
+# same for every iteration, and low and high bound its elements as integers.
+class VectorBody:
+    def __init__(self, arrays, symbol_table):
+        self.arrays = arrays
+        self.symbol_table = symbol_table
+
+    def evaluate(self, node):
+        method = self.VECTOR_EVALUATORS.get(type(node))
+        if method is None:
+            raise NotVectorizable()  # @IF@, @FOR@, calls, functions and lists
+        return method(self, node)
+
+    def evaluate_constant(self, node):
+        value = node.tok.value
+        return value, int(value), int(value)
+
+    def evaluate_identifier(self, node):
+        var_name = node.tok.value
+        if var_name in self.arrays:
+            return self.arrays[var_name]
+
+        value = self.symbol_table.get(var_name)
+        if type(value) is not int and type(value) is not bool:
+            raise NotVectorizable()  # undefined, a function or a list
+        return value, int(value), int(value)
+
+    def evaluate_inner(self, node):
+        # Shared values of the optimizer are simply computed again
+        return self.evaluate(node.node)
+
+    def evaluate_binop(self, node):
+        op_type = node.op_tok.type
+        left, left_low, left_high = self.evaluate(node.left_node)
+        right, right_low, right_high = self.evaluate(node.right_node)
+
+        if not isinstance(left, np.ndarray) and not isinstance(right, np.ndarray):
+            if op_type in (T_DIV, T_MODULO) and right == 0:
+                raise NotVectorizable()
+            value = binary_operation(op_type, left, right)
+            return value, int(value), int(value)
+
+        check_bounds(left_low, left_high)
+        check_bounds(right_low, right_high)
+
+        if op_type in COMPARISONS:
+            return ARRAY_FUNCTIONS[op_type](left, right), 0, 1
+
+        if op_type in (T_AND, T_OR):
+            if is_bool(left) != is_bool(right):
+                raise NotVectorizable()  # each iteration's value would be a boolean or a number depending on left
+            if not isinstance(left, np.ndarray):
+                # left is the same every time, so is the choice of operand
+                if (not left) == (op_type == T_AND):
+                    return left, left_low, left_high
+                return right, right_low, right_high
+            if is_bool(left):
+                logical = np.logical_and if op_type == T_AND else np.logical_or
+                return logical(left, right), 0, 1
+            keep_left = left == 0 if op_type == T_AND else left != 0
+            return np.where(keep_left, left, right), min(left_low, right_low), max(left_high, right_high)
+
+        if op_type in (T_DIV, T_MODULO) and np.any(right == 0):
+            raise NotVectorizable()
+
+        if op_type == T_PLUS:
+            low, high = left_low + right_low, left_high + right_high
+        elif op_type == T_SUB:
+            low, high = left_low - right_high, left_high - right_low
+        elif op_type == T_MUL:
+            products = (left_low * right_low, left_low * right_high, left_high * right_low, left_high * right_high)
+            low, high = min(products), max(products)
+        elif op_type == T_DIV:
+            # A quotient of integers is never further from zero than the dividend
+            high = max(abs(left_low), abs(left_high))
+            low = -high
+        elif op_type == T_MODULO:
+            # A remainder is always closer to zero than the divisor
+            high = max(abs(right_low), abs(right_high))
+            low = -high
+        else:
+            raise NotVectorizable()
+        check_bounds(low, high)
+
+        return ARRAY_FUNCTIONS[op_type](as_int(left), as_int(right)), low, high
+
+    def evaluate_unaryop(self, node):
+        op_type = node.op_tok.type
+        value, low, high = self.evaluate(node.node)
+
+        if not isinstance(value, np.ndarray):
+            value = unary_operation(op_type, value)
+            return value, int(value), int(value)
+
+        if op_type == T_NOT:
+            return np.logical_not(value), 0, 1
+        if op_type == T_SUB:
+            return -as_int(value), -high, -low
+        return value, low, high
+
+    VECTOR_EVALUATORS = {
+        NumberNode: evaluate_constant,
+        BooleanNode: evaluate_constant,
+        IdentifierNode: evaluate_identifier,
+        SharedNode: evaluate_inner,
+        ScopeNode: evaluate_inner,
+        BinOpNode: evaluate_binop,
+        UnaryOpNode: evaluate_unaryop,
+    }
+
+
+def check_bounds(low, high):
+    # Every element between low and high fits in 64 bits
+    if low < -INT64_MAX or high > INT64_MAX:
+        raise NotVectorizable()
+
+
+def is_bool(value):
+    if isinstance(value, np.ndarray):
+        return value.dtype == np.bool_
+    return type(value) is bool
+
+
+def as_int(value):
+    # Python adds and multiplies booleans as the integers 0 and 1; NumPy would keep them booleans
+    if isinstance(value, np.ndarray):
+        return value.astype(np.int64) if value.dtype == np.bool_ else value
+    return int(value)